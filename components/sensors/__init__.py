@@ -1 +1 @@
-from .ultrasonic_sensor import get_distance()
\ No newline at end of file
+from .ultrasonic_sensor import get_distance
@@ -0,0 +1,150 @@
+"""
+distance_service.py
+Gefilterter Abstandssensor (HC-SR04) als Hintergrunddienst
+- Misst mit festem Takt in einen vorab angelegten Ringpuffer
+- Median über die letzten Messungen, Werte außerhalb des Messbereichs werden
+  begrenzt, fehlgeschlagene Messungen verworfen
+- Einzelne Timeouts zählen als "frei bis Messbereich", eine lange Folge davon
+  (z.B. Echo-Leitung getrennt) als Sensorausfall
+- read() blockiert nie: liefert den zuletzt gefilterten Wert ohne Trigger/Echo-Wartezeit
+Autor: Shivang Soni
+"""
+
+import math
+import threading
+import time
+from array import array
+
+
+class DistanceService:
+    """
+    ping: eine Rohmessung in cm. Negativ = Timeout ohne Echo (nichts im
+          Messbereich), None = Messung fehlgeschlagen.
+    Ist länger als stale_after Sekunden keine gültige Messung gekommen oder
+    folgen mehr als max_timeouts Timeouts aufeinander, liefert read() None,
+    der Aufrufer entscheidet über den sicheren Zustand.
+    """
+
+    def __init__(self, ping, rate_hz=20, window=5, min_range_cm=2.0, max_range_cm=400.0,
+                 stale_after=0.5, max_timeouts=None):
+        self.ping = ping
+        self.period = 1.0 / rate_hz
+        self.window = window
+        self.min_range_cm = min_range_cm
+        self.max_range_cm = max_range_cm
+        self.stale_after = stale_after
+        # Standard: ein Median-Fenster voller Timeouts
+        self.max_timeouts = window if max_timeouts is None else max_timeouts
+
+        # Ringpuffer der gültigen Messungen, fest angelegt
+        self.samples = array("f", [math.nan]) * window
+        self.head = 0
+        self.count = 0
+        self.invalid = 0       # verworfene Messungen (None, NaN, Fehler)
+        self.timeouts = 0      # kein Echo, als max_range_cm gewertet
+        self.timeout_run = 0   # Timeouts in Folge seit dem letzten Echo
+        self.overruns = 0      # Messung länger als eine Periode
+
+        self._filtered = None
+        self._last_valid = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, wait: float = 0.5):
+        """Startet die Messschleife, wartet höchstens wait Sekunden auf den ersten Wert"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="distance-service", daemon=True)
+            self._thread.start()
+        if wait:
+            self._ready.wait(wait)
+        return self
+
+    def close(self, timeout: float = 1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def read(self):
+        """Zuletzt gefilterter Abstand in cm, None wenn noch keiner oder veraltet"""
+        if self._last_valid is None or time.monotonic() - self._last_valid > self.stale_after:
+            return None
+        if self.timeout_run > self.max_timeouts:
+            return None
+        return self._filtered
+
+    def add(self, raw):
+        """Rohwert übernehmen, Rückgabe: neuer gefilterter Wert oder None bei verworfener Messung"""
+        if raw is None or raw != raw:
+            self.invalid += 1
+            return None
+        if raw < 0:
+            self.timeouts += 1
+            self.timeout_run += 1
+            if self.timeout_run > self.max_timeouts:
+                # Dauerhaft kein Echo: nicht als frei werten, read() meldet den Ausfall,
+                # nach dem nächsten Echo beginnt der Median ohne die alten Werte
+                self.count = self.head = 0
+                return None
+            raw = self.max_range_cm
+        else:
+            self.timeout_run = 0
+        value = min(max(raw, self.min_range_cm), self.max_range_cm)
+
+        self.samples[self.head] = value
+        self.head = (self.head + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+        # Median über die vorhandenen Werte, einzelne Ausreißer fallen heraus
+        ordered = sorted(self.samples if self.count == self.window else self.samples[:self.count])
+        mid = self.count // 2
+        median = ordered[mid] if self.count % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+        self._filtered = round(median, 1)
+        self._last_valid = time.monotonic()
+        self._ready.set()
+        return self._filtered
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                raw = self.ping()
+            except Exception:
+                raw = None
+            self.add(raw)
+
+            next_tick += self.period
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # Takt nicht nachholen, sonst misst der Sensor ohne Pause
+                self.overruns += 1
+                next_tick = time.monotonic()
+            elif self._stop.wait(delay):
+                break
+
+
+# ====================== TESTLAUF ======================
+if __name__ == "__main__":
+    import random
+
+    def noisy_ping():
+        # 50 cm mit Rauschen, gelegentlich Ausreißer, Timeouts und Fehlmessungen
+        r = random.random()
+        if r < 0.05:
+            return -1
+        if r < 0.08:
+            return None
+        if r < 0.15:
+            return random.uniform(0, 400)
+        return random.gauss(50, 1.5)
+
+    service = DistanceService(noisy_ping, rate_hz=100).start()
+    readings = []
+    for _ in range(50):
+        start = time.perf_counter()
+        readings.append(service.read())
+        latency = time.perf_counter() - start
+        time.sleep(0.02)
+    service.close()
+    print(f"Letzte Werte: {readings[-5:]} | read(): {latency * 1e6:.1f} us")
+    print(f"verworfen: {service.invalid} | Timeouts: {service.timeouts} | Überläufe: {service.overruns}")
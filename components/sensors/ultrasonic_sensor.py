@@ -2,12 +2,16 @@
 ultrasonic_sensor.py
 Hardware-unabhängiger Ultraschall-Sensor (HC-SR04) für ESP32
 Dummy-Modus für Simulation ohne Sensoren
+Messung läuft mit festem Takt im Hintergrund (distance_service.py), get_distance
+liefert den Median der letzten Messungen ohne auf das Echo zu warten
 Autor: Shivang Soni
 """
 
 import time
 import random  # Für Dummy-Daten
 
+from .distance_service import DistanceService
+
 # ====================== KONFIGURATION ======================
 USE_HARDWARE = False  # True = echte Sensoren, False = Dummy-Modus
 
@@ -22,9 +26,16 @@ if USE_HARDWARE:
     echo = Pin(ECHO_PIN, Pin.IN)
 
 # ====================== ABSTANDSMESSUNG ======================
-def get_distance():
+SAMPLE_RATE_HZ = 20   # Messtakt des Hintergrunddienstes (HC-SR04: max. ca. 40 Hz)
+MEDIAN_WINDOW = 5     # Anzahl Messungen im Median
+
+_service = None
+
+
+def ping():
     """
-    Misst den Abstand in cm mit HC-SR04 oder liefert Dummy-Wert.
+    Eine Rohmessung in cm (blockiert bis Echo oder Timeout).
+    Negativ = kein Echo innerhalb von 30 ms.
     """
     if USE_HARDWARE:
         # Sensor initialisieren
@@ -36,15 +47,26 @@ def get_distance():
 
         duration = time_pulse_us(echo, 1, 30000)  # Timeout 30ms
         if duration < 0:
-            return None  # Kein Echo empfangen
+            return -1  # Kein Echo empfangen
 
-        distance_cm = (duration / 2) / 29.1
-        return round(distance_cm, 1)
+        return (duration / 2) / 29.1
     else:
         # Dummy: zufälliger Abstand zwischen 5 und 100 cm
-        distance_cm = random.uniform(5, 100)
+        return random.uniform(5, 100)
+
+
+def get_distance():
+    """
+    Gefilterter Abstand in cm aus dem Hintergrunddienst, blockiert nicht
+    (nur beim ersten Aufruf bis zur ersten Messung). None = keine aktuelle Messung.
+    """
+    global _service
+    if _service is None:
+        _service = DistanceService(ping, rate_hz=SAMPLE_RATE_HZ, window=MEDIAN_WINDOW).start()
+    distance_cm = _service.read()
+    if not USE_HARDWARE and distance_cm is not None:
         print(f"[Dummy] get_distance -> {distance_cm:.1f} cm")
-        return round(distance_cm, 1)
+    return distance_cm
 
 # ====================== TESTLAUF ======================
 if __name__ == "__main__":
@@ -14,6 +14,7 @@ from google import genai
 
 from scripts.load_docs import load_documents
 from scripts.speech import speak, speech_to_text
+from scripts.latency import timed
 from scripts.config import GOOGLE_API_KEY, USE_GEMINI, GEMINI_MODEL_NAME
 
 logging.basicConfig(level=logging.INFO)
@@ -78,10 +79,14 @@ def create_rag_chain(
             full_prompt = f"Kontext:\n{context}\n\nBenutzeranfrage:\n{query}"
             return llm.invoke(full_prompt)
 
+    # Latenz getrennt nach Retrieval und LLM-Aufruf
+    similarity_search = timed("rag_retrieval", vector_db.similarity_search_with_score)
+    llm_call = timed("llm_call", llm_call)
+
     def rag_pipeline(query: str):
         if not query:
             return ""
-        docs = vector_db.similarity_search_with_score(query, k=3)
+        docs = similarity_search(query, k=3)
         filtered_docs = [d for d, s in docs if s >= 0.6]
         context = "\n".join([d.page_content for d in filtered_docs])
         logger.info(f"[INFO] Verwendeter Kontext: {context[:200]}...")
@@ -0,0 +1,111 @@
+"""
+actuator.py
+- Zeitgesteuerte Motorbefehle ohne blockierendes sleep
+- Jeder Befehl hat eine Dauer bzw. Deadline, danach stoppt ein Watchdog-Thread
+  die Motoren automatisch (Sicherheitsstopp bleibt erhalten)
+- Gleiche Aktion erneut -> laufende Bewegung wird nur verlängert, kein Stopp/Neustart
+- Abschluss wird asynchron über on_complete gemeldet (z.B. als MQTT-Ack)
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import threading
+import time
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+# Status in on_complete(command_id, action, status)
+DONE = "done"              # Deadline erreicht, Motoren gestoppt
+SUPERSEDED = "superseded"  # durch eine andere Aktion abgelöst
+ABORTED = "aborted"        # per stop_now()/close() abgebrochen
+
+
+class TimedActuator:
+    """
+    apply(action) setzt die Motoren für action, stop() schaltet sie ab.
+    command() kehrt sofort zurück; der Watchdog ruft stop() zur Deadline auf,
+    sofern bis dahin kein weiterer Befehl kam.
+    """
+
+    def __init__(self, apply, stop, duration: float = 0.3, on_complete=None):
+        """
+        duration: Standarddauer eines Befehls in Sekunden
+        on_complete: optional Callback (command_id, action, status), läuft im aufrufenden bzw. Watchdog-Thread
+        """
+        self._apply = apply
+        self._stop = stop
+        self.duration = duration
+        self.on_complete = on_complete
+        self.current = None   # (command_id, action) der laufenden Bewegung
+        self.deadline = None  # time.monotonic(), zu der gestoppt wird
+        self.commands = 0
+        self.extensions = 0   # Befehle, die nur eine laufende Bewegung verlängert haben
+
+        self._next_id = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._watchdog, name="motor-watchdog", daemon=True)
+        self._thread.start()
+
+    def command(self, action, duration: float | None = None) -> int:
+        """Startet oder verlängert eine Bewegung, Rückgabe: ID des (laufenden) Befehls"""
+        deadline = time.monotonic() + (self.duration if duration is None else duration)
+        replaced = None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Aktuator wurde bereits geschlossen")
+            self.commands += 1
+            if self.current is not None and self.current[1] == action:
+                self.deadline = max(self.deadline, deadline)
+                self.extensions += 1
+                command_id = self.current[0]
+            else:
+                replaced = self.current
+                self._next_id += 1
+                command_id = self._next_id
+                self._apply(action)
+                self.current, self.deadline = (command_id, action), deadline
+            self._cond.notify()
+        if replaced is not None:
+            self._report(replaced, SUPERSEDED)
+        return command_id
+
+    def stop_now(self):
+        """Sofortiger Stopp, die laufende Bewegung gilt als abgebrochen"""
+        with self._cond:
+            stopped, self.current, self.deadline = self.current, None, None
+            self._stop()
+            self._cond.notify()
+        if stopped is not None:
+            self._report(stopped, ABORTED)
+
+    def close(self, timeout: float | None = None):
+        """Stoppt die Motoren und beendet den Watchdog"""
+        with self._cond:
+            self._closed = True
+        self.stop_now()
+        self._thread.join(timeout)
+
+    @property
+    def busy(self) -> bool:
+        return self.current is not None
+
+    def _watchdog(self):
+        while True:
+            with self._cond:
+                while not self._closed and (self.current is None or time.monotonic() < self.deadline):
+                    self._cond.wait(None if self.current is None else self.deadline - time.monotonic())
+                if self.current is None:
+                    return
+                finished, self.current, self.deadline = self.current, None, None
+                self._stop()
+            self._report(finished, DONE)
+
+    def _report(self, command, status: str):
+        if self.on_complete is None:
+            return
+        try:
+            self.on_complete(command[0], command[1], status)
+        except Exception as e:
+            logging.warning(f"[WARN] Rückmeldung für Motorbefehl {command[0]} fehlgeschlagen: {e}")
@@ -1,32 +1,84 @@
 # autonomous_drive.py
+import os
 import time
 from env import RobotEnv, USE_HARDWARE
 from q_learning_agent import QLearningAgent
+from scripts.dyna import DynaQAgent
+from scripts.q_lambda import QLambdaAgent
+from scripts.policy import FrozenPolicy, Discretizer
+from scripts.latency import timed, report as report_latency
+from scripts.config import (
+    POLICY_FILE, EXPLORATION, DYNA_REPLAY_UPDATES, DYNA_PLANNING_STEPS, Q_LAMBDA,
+    STATE_ENCODING, MAX_DISTANCE_CM, DISTANCE_BINS, ROBOT_Q_TABLE_FILES
+)
 
 
-def drive(num_episodes=500, max_steps=50):
+def drive(num_episodes=500, max_steps=50,
+          replay_updates=DYNA_REPLAY_UPDATES, planning_steps=DYNA_PLANNING_STEPS,
+          explore=EXPLORATION.lower() == "true", trace_lambda=Q_LAMBDA,
+          state_encoding=STATE_ENCODING):
+    """
+    explore=False: reine Inferenz mit der eingefrorenen Policy (POLICY_FILE,
+    sonst aus der geladenen Q-Tabelle kompiliert), kein Lernen, kein Speichern.
+    trace_lambda > 0: Watkins Q(lambda) mit Eligibility Traces
+    state_encoding: "raw" (jeder Abstand ein Zustand), "bins" (Discretizer) oder
+                    "tiles" (Tile Coding, nur mit dem einfachen QLearningAgent)
+    """
     actions = [0, 1, 2, 3]
-    agent = QLearningAgent(actions)
+    if state_encoding not in ROBOT_Q_TABLE_FILES:
+        raise ValueError(f"Unbekanntes state_encoding: {state_encoding}")
+    if state_encoding == "tiles":
+        # Dyna-Q und Q(lambda) arbeiten auf Tabellenzeilen, Tile Coding hat keine
+        agent = QLearningAgent(actions, backend="tiles")
+    elif trace_lambda > 0:
+        agent = QLambdaAgent(actions, trace_lambda=trace_lambda)
+    elif replay_updates or planning_steps:
+        # Jeder echte Schritt kostet einen Motorimpuls -> mehrfach verwerten
+        agent = DynaQAgent(actions, replay_updates=replay_updates, planning_steps=planning_steps)
+    else:
+        agent = QLearningAgent(actions)
+    if state_encoding == "bins":
+        agent.state_encoder = Discretizer.uniform(0.0, MAX_DISTANCE_CM, DISTANCE_BINS)
+    q_table_file = ROBOT_Q_TABLE_FILES[state_encoding]
 
     # Q-Table laden
     try:
-        agent.load_q_table("q_table.pkl")
+        # Inferenz: Tabelle wird nur gelesen und kann gemappt bleiben
+        agent.load_q_table(q_table_file, read_only=not explore)
         print("[INFO] Q-Table geladen")
     except:
         print("[INFO] Keine Q-Table gefunden, Training startet von Null")
 
+    policy = None
+    if not explore:
+        if os.path.exists(POLICY_FILE):
+            policy = FrozenPolicy.load(POLICY_FILE, encoder=agent.state_encoder,
+                                        encoding=state_encoding, kind="scalar")
+        else:
+            policy = agent.freeze()
+        print("[INFO] Inferenz-Modus: feste greedy Policy")
+
+    # Latenzmessung je Stufe, ausgeschaltet sind das die unveränderten Methoden
+    choose_action = timed("choose_action", policy.act if policy is not None else agent.choose_action)
+    learn = timed("learn", agent.learn)
+
     for episode in range(num_episodes):
         env = RobotEnv()
         state = env.reset()
         total_reward = 0
+        agent.start_episode()
 
         # Epsilon Decay
-        agent.epsilon = max(0.05, agent.epsilon * 0.995)
+        agent.decay_epsilon()
 
         for step in range(max_steps):
-            action = agent.choose_action(state, actions)
-            next_state, reward, done = env.step(action)
-            agent.learn(state, action, reward, next_state, actions)
+            if policy is not None:
+                action = choose_action(state)
+                next_state, reward, done = env.step(action)
+            else:
+                action = choose_action(state, actions)
+                next_state, reward, done = env.step(action)
+                learn(state, action, reward, next_state, actions)
             total_reward += reward
             state = next_state
 
@@ -35,10 +87,14 @@ def drive(num_episodes=500, max_steps=50):
                 print(f"[Episode {episode}] Hindernis erkannt, Stop")
                 break
 
+        # Motoren stoppen, sonst laufen sie bis zum Auto-Stopp in die nächste Episode
+        env.close()
         print(f"[Episode {episode}] Total Reward: {total_reward}")
+    report_latency()
 
-    agent.save_q_table("q_table.pkl")
-    print("[INFO] Q-Table gespeichert, Training beendet")
+    if policy is None:
+        agent.save_q_table(q_table_file)
+        print("[INFO] Q-Table gespeichert, Training beendet")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,257 @@
+"""
+benchmark.py
+- Durchsatz-Benchmark der heißen Schleifen im Training:
+  SimEnv.step, QLearningAgent.learn und ganze Episoden (run_episodes wie in train)
+- Je Grid-Größe und Hindernisdichte: Env-Schritte/s, Updates/s, Episoden/s,
+  Peak-Speicher und Größe der Q-Tabelle
+- Ergebnisse als JSON, Vergleichsmodus meldet Regressionen gegenüber einer Basis
+Aufruf:
+    python -m scripts.benchmark                         # messen, nach BENCHMARK_FILE schreiben
+    python -m scripts.benchmark --compare basis.json    # messen und mit basis.json vergleichen
+    python -m scripts.benchmark --compare alt.json neu.json   # nur zwei Dateien vergleichen
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from scripts.generate_sim_env import SimEnv
+from scripts.layouts import layout_pool
+from scripts.q_learning_agent import QLearningAgent
+from scripts.train_sim_env import run_episodes
+from scripts.config import BENCHMARK_FILE
+
+logging.basicConfig(level=logging.INFO)
+
+GRID_SIZES = (5, 10, 20, 40)
+DENSITIES = (0.0, 0.1, 0.25)
+ACTIONS = [0, 1, 2, 3]
+
+# Metrik -> +1 = größer ist besser (Durchsatz), -1 = kleiner ist besser (Speicher)
+METRICS = {
+    "env_steps_per_s": 1,
+    "learn_per_s": 1,
+    "episodes_per_s": 1,
+    "peak_memory_kib": -1,
+    "q_table_states": -1,
+}
+
+
+def _env(size: int, density: float, random_layouts: bool) -> SimEnv:
+    """
+    SimEnv wie in train(): lösbare Layouts aus dem LayoutPool der Stufe.
+    random_layouts=False: festes Layout pool.layout(0) mit der vollen Hindernisdichte
+    """
+    grid_size = (size, size)
+    num_obstacles = int(density * size * size)
+    pool = layout_pool(grid_size, num_obstacles) if num_obstacles else None
+    if pool is not None and not random_layouts:
+        return SimEnv(grid_size=grid_size, obstacles=sorted(pool.layout(0)[0]))
+    return SimEnv(grid_size=grid_size, random_obstacles=pool is not None,
+                  num_random_obstacles=num_obstacles, layout_pool=pool)
+
+
+def _best_rate(run, count: int, repeat: int) -> float:
+    """count / kürzeste Laufzeit aus repeat Läufen (robust gegen Störungen durch andere Prozesse)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def bench_env_steps(env: SimEnv, steps: int, repeat: int) -> float:
+    """SimEnv.step auf festem Layout mit zufälligen Aktionen, Rücksprung zum Start bei done"""
+    actions = random.choices(ACTIONS, k=steps)
+    start = env.random_start()
+
+    def run():
+        env.position = start
+        step = env.step
+        for action in actions:
+            if step(action)[2]:
+                env.position = start
+
+    return _best_rate(run, steps, repeat)
+
+
+def _transitions(env: SimEnv, steps: int) -> list:
+    """Zufallspfad durch env als (state, action, reward, next_state, valid_next_actions)"""
+    transitions = []
+    env.position = state = env.random_start()
+    for _ in range(steps):
+        action = random.choice(env.get_valid_actions() or ACTIONS)
+        next_state, reward, done = env.step(action)
+        transitions.append((state, action, reward, next_state, env.get_valid_actions()))
+        state = next_state
+        if done:
+            env.position = state = env.random_start()
+    return transitions
+
+
+def bench_learn(env: SimEnv, steps: int, repeat: int) -> float:
+    """QLearningAgent.learn auf aufgezeichneten Übergängen, je Lauf mit frischem Agenten"""
+    transitions = _transitions(env, steps)
+
+    def run():
+        learn = QLearningAgent(ACTIONS).learn
+        for state, action, reward, next_state, valid in transitions:
+            learn(state, action, reward, next_state, valid)
+
+    return _best_rate(run, steps, repeat)
+
+
+def bench_episodes(size: int, density: float, episodes: int, repeat: int) -> dict:
+    """
+    run_episodes wie in train() (Layoutwechsel je Episode bei Hindernissen).
+    Speicher wird in einem eigenen Lauf mit tracemalloc gemessen, das die Zeit verfälschen würde.
+    """
+    max_steps = 4 * size
+    seed = random.getrandbits(32)
+
+    def run():
+        random.seed(seed)
+        run_episodes(QLearningAgent(ACTIONS), _env(size, density, True), episodes, ACTIONS, max_steps)
+
+    rate = _best_rate(run, episodes, repeat)
+
+    random.seed(seed)
+    env = _env(size, density, True)
+    tracemalloc.start()
+    agent = QLearningAgent(ACTIONS)
+    run_episodes(agent, env, episodes, ACTIONS, max_steps)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "episodes_per_s": rate,
+        "peak_memory_kib": peak / 1024,
+        "q_table_states": len(agent.q_table),
+        "q_table_bytes": int(agent.q_table.values.nbytes + agent.q_table.counts.nbytes),
+    }
+
+
+def run_suite(grid_sizes=GRID_SIZES, densities=DENSITIES, steps: int = 20000,
+              episodes: int = 200, repeat: int = 3, seed: int = 0) -> dict:
+    """Alle Kombinationen aus grid_sizes und densities, Rückgabe im JSON-Format von save_results"""
+    logging.disable(logging.INFO)  # train_sim_env loggt je Episode/Sample
+    try:
+        results = []
+        for size in grid_sizes:
+            for density in densities:
+                random.seed(seed)
+                env = _env(size, density, False)
+                case = {
+                    "grid": size,
+                    "density": density,
+                    "obstacles": len(env.obstacles),
+                    "env_steps_per_s": bench_env_steps(env, steps, repeat),
+                    "learn_per_s": bench_learn(env, steps, repeat),
+                }
+                case.update(bench_episodes(size, density, episodes, repeat))
+                results.append(case)
+                print(_format_case(case), flush=True)
+    finally:
+        logging.disable(logging.NOTSET)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "steps": steps,
+            "episodes": episodes,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def _format_case(case: dict) -> str:
+    return (f"{case['grid']:3d}x{case['grid']:<3d} Dichte {case['density']:4.2f} | "
+            f"Env-Schritte/s: {case['env_steps_per_s']:9.0f} | Updates/s: {case['learn_per_s']:9.0f} | "
+            f"Episoden/s: {case['episodes_per_s']:8.1f} | Peak: {case['peak_memory_kib']:8.1f} KiB | "
+            f"Zustände: {case['q_table_states']:5d}")
+
+
+# ---------------------- Speichern / Vergleich ----------------------
+def save_results(results: dict, filepath: str):
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filepath, "w") as f:
+        json.dump(results, f, indent=2)
+    logging.info(f"[INFO] Benchmark gespeichert in: {filepath}")
+
+
+def load_results(filepath: str) -> dict:
+    with open(filepath) as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.1) -> list:
+    """
+    Vergleicht gleiche (grid, density)-Fälle. Regression: Durchsatz um mehr als
+    tolerance gefallen bzw. Speicher/Tabellengröße um mehr als tolerance gestiegen.
+    Rückgabe: Liste (grid, density, Metrik, alt, neu, relative Änderung) der Regressionen
+    """
+    old_cases = {(c["grid"], c["density"]): c for c in baseline["results"]}
+    regressions = []
+    for case in current["results"]:
+        old = old_cases.get((case["grid"], case["density"]))
+        if old is None:
+            continue
+        cells = []
+        for metric, direction in METRICS.items():
+            if metric not in old or metric not in case or not old[metric]:
+                continue
+            change = case[metric] / old[metric] - 1
+            cells.append(f"{metric}: {change:+6.1%}")
+            if direction * change < -tolerance:
+                regressions.append((case["grid"], case["density"], metric, old[metric], case[metric], change))
+        print(f"{case['grid']:3d}x{case['grid']:<3d} Dichte {case['density']:4.2f} | " + " | ".join(cells))
+    for grid, density, metric, old_value, new_value, change in regressions:
+        logging.warning(f"[REGRESSION] {grid}x{grid} Dichte {density}: {metric} "
+                        f"{old_value:.1f} -> {new_value:.1f} ({change:+.1%})")
+    return regressions
+
+
+# ==================== Kommandozeile ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Durchsatz-Benchmark für SimEnv und Q-Learning")
+    parser.add_argument("--grids", type=int, nargs="+", default=list(GRID_SIZES), help="Kantenlängen der Grids")
+    parser.add_argument("--densities", type=float, nargs="+", default=list(DENSITIES),
+                        help="Anteil der Zellen mit Hindernissen")
+    parser.add_argument("--steps", type=int, default=20000, help="Env-Schritte bzw. Updates je Messung")
+    parser.add_argument("--episodes", type=int, default=200, help="Episoden je Messung")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen, gewertet wird der schnellste Lauf")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=BENCHMARK_FILE, help="Zieldatei der Messung (JSON)")
+    parser.add_argument("--compare", nargs="+", metavar="JSON",
+                        help="Basisdatei; mit zweiter Datei werden nur die beiden Dateien verglichen")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Erlaubte relative Verschlechterung")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare erwartet eine oder zwei Dateien")
+    if args.compare and len(args.compare) == 2:
+        current = load_results(args.compare[1])
+    else:
+        current = run_suite(args.grids, args.densities, args.steps, args.episodes, args.repeat, args.seed)
+        save_results(current, args.output)
+
+    if args.compare:
+        regressions = compare(load_results(args.compare[0]), current, args.tolerance)
+        sys.exit(1 if regressions else 0)
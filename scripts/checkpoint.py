@@ -0,0 +1,102 @@
+"""
+checkpoint.py
+- Speichert Q-Tabellen im Hintergrund, ohne den Control-Loop zu blockieren
+- Im Loop wird nur ein Snapshot (Kopie der Arrays) gezogen, das Schreiben
+  übernimmt ein eigener Thread
+- Atomar über temporäre Datei + os.replace, begrenzte Historie (.1, .2, ...)
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+import logging
+
+from scripts.q_table import ArrayQTable
+from scripts.q_table_io import write_binary
+
+logging.basicConfig(level=logging.INFO)
+
+
+def snapshot_table(table):
+    """
+    Unabhängige Kopie (actions, keys, values, counts) einer Q-Tabelle.
+    Für ArrayQTable nur eine Listen- und zwei Array-Kopien, kein Neuaufbau des Index.
+    Bei einer BoundedQTable landen kalte Zustände (save_min_visits) nicht im
+    Checkpoint, die laufende Tabelle behält sie.
+    """
+    if not isinstance(table, ArrayQTable):
+        table = ArrayQTable.from_dict(table if isinstance(table, dict) else table.to_dict(), [])
+    return (list(table.actions),) + tuple(table.export_arrays())
+
+
+class QTableCheckpointer:
+    def __init__(self, filepath: str, history: int = 3):
+        """
+        filepath: Ziel im Binärformat (.qtb)
+        history: Anzahl älterer Checkpoints, die als filepath.1 ... filepath.N erhalten bleiben
+        """
+        self.filepath = filepath
+        self.history = int(history)
+        self.saves = 0
+        self.last_duration = 0.0
+
+        self._pending = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="qtable-checkpoint", daemon=True)
+        self._thread.start()
+
+    def save(self, table):
+        """
+        Zieht einen Snapshot und übergibt ihn dem Hintergrund-Thread.
+        Liegt noch ein ungeschriebener Snapshot vor, wird er ersetzt.
+        """
+        snapshot = snapshot_table(table)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Checkpointer wurde bereits geschlossen")
+            self._pending = snapshot
+            self._cond.notify()
+
+    def close(self, timeout: float | None = None):
+        """Schreibt einen noch offenen Snapshot und beendet den Thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                snapshot, self._pending = self._pending, None
+            try:
+                start = time.perf_counter()
+                self._write(snapshot)
+                self.last_duration = time.perf_counter() - start
+                self.saves += 1
+            except Exception as e:
+                logging.warning(f"[WARN] Q-Tabelle konnte nicht gespeichert werden: {e}")
+
+    def _write(self, snapshot):
+        # Historie rotieren: .N-1 -> .N, ..., aktuelle Datei -> .1
+        if self.history > 0 and os.path.exists(self.filepath):
+            for i in range(self.history - 1, 0, -1):
+                older = f"{self.filepath}.{i}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.filepath}.{i + 1}")
+            newest = f"{self.filepath}.1"
+            try:
+                # Hardlink: filepath existiert weiterhin, bis die neue Datei sie ersetzt
+                if os.path.exists(newest):
+                    os.remove(newest)
+                os.link(self.filepath, newest)
+            except OSError:
+                shutil.copyfile(self.filepath, newest)
+        write_binary(self.filepath, *snapshot)
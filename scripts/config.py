@@ -20,9 +20,48 @@ MIN_DISTANCE_CM = 20  # Mindestabstand zum Hindernis in cm
 # ====================== Logging & State ======================
 LOG_FILE = "memory/robot_log.json"   # JSON-Log für Events
 STATE_FILE = "memory/state.json"     # JSON-Datei für Robot-Zustand
+Q_TABLE_FILE = "q_table.qtb"         # Q-Tabelle im Binärformat (siehe q_table_io.py)
+LOCAL_Q_TABLE_FILE = "q_table_local.qtb"  # Q-Tabelle auf lokalen Merkmalen (siehe state_encoders.py)
+POLICY_FILE = "policy.npz"           # Eingefrorene greedy Policy (siehe policy.py)
+BENCHMARK_FILE = "memory/benchmark.json"  # Ergebnisse von scripts/benchmark.py
+METRICS_LOG_DIR = "memory/metrics"    # Metriken je Trainingsepisode (siehe metrics_log.py)
+SWEEP_RESULTS_FILE = "memory/sweep.csv"  # Rangliste von scripts/sweep.py
+EXPLORATION = os.getenv("EXPLORATION", "True")  # False = nur Inferenz mit POLICY_FILE
+
+# ====================== Zustände RobotEnv ======================
+STATE_ENCODING = os.getenv("STATE_ENCODING", "bins")  # raw | bins | tiles (siehe tile_coding.py)
+MAX_DISTANCE_CM = 400      # Messbereich HC-SR04
+DISTANCE_BINS = 40         # Anzahl Abstands-Bins bei STATE_ENCODING = "bins"
+ROBOT_Q_TABLE_FILES = {    # Eigene Datei je Kodierung, die Zustandsschlüssel passen nicht zueinander
+    "raw": Q_TABLE_FILE,
+    "bins": "q_table_bins.qtb",
+    "tiles": "q_table_tiles.qtb",
+}
+
+# ====================== Speichergrenze Q-Tabelle ======================
+Q_TABLE_MAX_STATES = 50000     # Obergrenze Zustände in main.py (0 = unbegrenzt), siehe BoundedQTable
+Q_TABLE_EVICTION = "lru"       # "lru" oder "value" (kleinstes max |Q| unter den älteren Zuständen)
+Q_TABLE_SAVE_MIN_VISITS = 0    # Beim Speichern Zustände mit weniger Zugriffen verwerfen
+
+# ====================== Dyna-Q ======================
+DYNA_REPLAY_UPDATES = 8    # Replay-Updates pro echtem Schritt (0 = aus)
+DYNA_PLANNING_STEPS = 16   # Modell-Planungsschritte pro echtem Schritt (0 = aus)
+
+# ====================== Q(lambda) ======================
+Q_LAMBDA = 0.0             # > 0: Watkins Q(lambda) statt Dyna-Q in autonomous_drive
+
+# ====================== Latenzmessung ======================
+LATENCY_TRACING = os.getenv("LATENCY_TRACING", "False")  # True = Histogramme je Stufe (siehe latency.py)
+LATENCY_REPORT_INTERVAL_S = 60  # p50/p99 je Stufe alle N Sekunden ins Log
 
 # ====================== Hardware / Dummy ======================
 USE_HARDWARE = False  # True = echte Motoren/Sensoren, False = Dummy-Modus
+CONTROL_RATE_HZ = 5           # Takt des Control-Loops in main.py (siehe control_loop.py)
+CHECKPOINT_INTERVAL_S = 10    # Q-Tabelle und Log im Control-Loop alle N Sekunden speichern
+MOTOR_COMMAND_DURATION_S = 0.3  # Laufzeit eines Motorbefehls, danach Auto-Stopp (> 1 / CONTROL_RATE_HZ)
+SENSOR_RATE_HZ = 20           # Messtakt HC-SR04 im Hintergrund (siehe distance_service.py)
+SENSOR_MEDIAN_WINDOW = 5      # Median über die letzten N Messungen
+SENSOR_STALE_S = 0.5          # Ohne gültige Messung so lange -> Sicherheitsstopp
 
 # ======================= Gemini API =======================
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")  # Google Gemini API-Schlüssel
@@ -0,0 +1,293 @@
+"""
+control_loop.py
+- Asyncio-Laufzeit für den Hardware-Loop in main.py mit festem Takt
+- Eigene Coroutinen für Sensing, Entscheiden, Aktuieren und Speichern, verbunden
+  über Queues mit nur dem jeweils neuesten Wert (veraltete Messungen werden verworfen)
+- Blockierende Aufrufe (Sensor, Motorbefehl) laufen in Threads, der Takt bleibt stabil
+- Deadline-Statistik: Zyklen länger als eine Periode, ausgefallene Ticks
+- LocalMQTTClient: MQTT-Ersatz im Prozess (gleiche Methoden wie paho Client) für Tests ohne Broker
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from memory.log import log_event
+from scripts.latency import timed
+from scripts.config import CONTROL_RATE_HZ, CHECKPOINT_INTERVAL_S
+
+logging.basicConfig(level=logging.INFO)
+
+# Reihenfolge wie die Motorfunktionen in main.py (Index = Aktion)
+MOTOR_COMMANDS = ("forward", "backward", "left", "right", "stop")
+
+
+class ControlStats:
+    """Zähler und Latenzen des Control-Loops (Latenz = geplanter Tick bis Befehl abgesetzt)"""
+
+    def __init__(self, period: float):
+        self.period = period
+        self.ticks = 0             # ausgeführte Sensor-Ticks
+        self.actions = 0           # abgesetzte Motorbefehle
+        self.deadline_misses = 0   # Zyklen, deren Latenz länger als eine Periode war
+        self.skipped_ticks = 0     # Ticks ausgelassen, weil der Takt eine Periode oder mehr zurücklag
+        self.dropped = 0           # Messungen/Befehle verworfen, weil die nächste Stufe noch beschäftigt war
+        self.max_latency = 0.0
+        self._latency_sum = 0.0
+
+    def record_cycle(self, latency: float):
+        self.actions += 1
+        self._latency_sum += latency
+        self.max_latency = max(self.max_latency, latency)
+        if latency > self.period:
+            self.deadline_misses += 1
+
+    @property
+    def mean_latency(self) -> float:
+        return self._latency_sum / self.actions if self.actions else 0.0
+
+    def summary(self) -> str:
+        return (f"Ticks: {self.ticks} | Befehle: {self.actions} | Deadline verpasst: {self.deadline_misses}"
+                f" | Ticks ausgelassen: {self.skipped_ticks} | verworfen: {self.dropped}"
+                f" | Latenz Mittel/Max: {1000 * self.mean_latency:.1f}/{1000 * self.max_latency:.1f} ms")
+
+
+class ControlRuntime:
+    """
+    Fester Takt rate_hz: pro Tick eine Messung (sense), daraus Reward des
+    vorherigen Befehls, Lern-Update und nächste Aktion (decide), dann Motorbefehl
+    (actuate). persist speichert unabhängig davon alle save_interval Sekunden.
+    Der Lauf endet bei done (Hindernis zu nah), nach max_running_time Sekunden
+    oder mit stop().
+
+    env: RobotEnv-Schnittstelle (read_distance, execute_action, outcome, render)
+    send_command: Callable(action), z.B. MQTT-Publish des Motorbefehls
+    """
+
+    def __init__(self, env, agent, send_command, policy=None, rate_hz: float = CONTROL_RATE_HZ,
+                 checkpointer=None, save_interval: float = CHECKPOINT_INTERVAL_S,
+                 max_running_time: float | None = None, render_every: int = 100):
+        self.env = env
+        self.agent = agent
+        self.send_command = send_command
+        self.policy = policy
+        self.period = 1.0 / rate_hz
+        self.checkpointer = checkpointer
+        self.save_interval = save_interval
+        self.max_running_time = max_running_time
+        self.render_every = render_every
+
+        self.stats = ControlStats(self.period)
+        self.total_reward = 0.0
+        self.steps = 0
+        self.done = False
+        self._last = None  # (state, action) des zuletzt abgesetzten Befehls, wartet auf den Reward
+        self._choose = timed("choose_action", policy.act if policy else agent.choose_action)
+        self._learn = timed("learn", agent.learn)
+        self._stop = None
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self) -> ControlStats:
+        """Startet alle Stufen und wartet auf das Ende. Fehler einer Stufe werden weitergereicht"""
+        self._stop = asyncio.Event()
+        self._readings = asyncio.Queue(maxsize=1)
+        self._commands = asyncio.Queue(maxsize=1)
+        stages = [
+            asyncio.create_task(self._sense(), name="sense"),
+            asyncio.create_task(self._decide(), name="decide"),
+            asyncio.create_task(self._actuate(), name="actuate"),
+            asyncio.create_task(self._persist(), name="persist"),
+        ]
+        stopper = asyncio.create_task(self._stop.wait())
+        try:
+            finished, _ = await asyncio.wait(stages + [stopper], timeout=self.max_running_time,
+                                             return_when=asyncio.FIRST_COMPLETED)
+            if not finished:
+                logging.info("[INFO] Maximale Grenze eines Laufs erreicht...wird beendet")
+        finally:
+            for task in stages + [stopper]:
+                task.cancel()
+            await asyncio.gather(*stages, stopper, return_exceptions=True)
+        for task in stages:
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        return self.stats
+
+    def _offer(self, queue: asyncio.Queue, item):
+        """Legt item ab, ein noch nicht abgeholter älterer Wert wird ersetzt"""
+        if queue.full():
+            queue.get_nowait()
+            self.stats.dropped += 1
+        queue.put_nowait(item)
+
+    # ---------------------- Stufen ----------------------
+    async def _sense(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif -delay >= self.period:
+                # Takt liegt zurück (z.B. langsame Messung): verpasste Ticks nicht nachholen
+                missed = int(-delay // self.period)
+                self.stats.skipped_ticks += missed
+                next_tick += missed * self.period
+            tick = next_tick
+            next_tick += self.period
+
+            distance = await asyncio.to_thread(self.env.read_distance)
+            self.stats.ticks += 1
+            self._offer(self._readings, (tick, distance))
+
+    async def _decide(self):
+        while True:
+            tick, state = await self._readings.get()
+            if self._last is not None:
+                # Die Messung ist der Folgezustand des letzten Befehls
+                last_state, last_action = self._last
+                reward, done = self.env.outcome(state)
+                self.total_reward += reward
+                self.steps += 1
+                if self.policy is None:
+                    self._learn(last_state, last_action, reward, state)
+                if self.render_every and self.steps % self.render_every == 0:
+                    self.env.render()
+                if done:
+                    self.done = True
+                    logging.info(f"[INFO] Hindernis zu nah ({state}), Lauf wird beendet")
+                    self._stop.set()
+                    return
+
+            action = self._choose(state)
+            # _last setzt erst actuate: ein hier verworfener Befehl bekommt keinen Reward
+            self._offer(self._commands, (tick, state, action))
+
+    async def _actuate(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            tick, state, action = await self._commands.get()
+            self.send_command(action)
+            self._last = (state, action)
+            self.stats.record_cycle(loop.time() - tick)
+            # RobotEnv kehrt sofort zurück (TimedActuator), andere envs dürfen blockieren
+            await asyncio.to_thread(self.env.execute_action, action)
+
+    async def _persist(self):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        while True:
+            await asyncio.sleep(self.save_interval)
+            message = (
+                f"[INFO] Time elapsed: {loop.time() - start:.1f}"
+                f" | Total_reward: {self.total_reward}"
+                f" | Steps: {self.steps}"
+                f" | {self.stats.summary()}"
+            )
+            logging.info(message)
+            await asyncio.to_thread(log_event, message)
+            if self.checkpointer is not None and self.policy is None:
+                try:
+                    # Snapshot im Loop-Thread, decide kann die Tabelle währenddessen nicht ändern
+                    self.checkpointer.save(self.agent.q_table)
+                except Exception as e:
+                    logging.warning(f"[WARN] Q-Tabelle konnte nicht gespeichert werden: {e}")
+
+
+# ==================== MQTT-Ersatz ====================
+def topic_matches(subscription: str, topic: str) -> bool:
+    """MQTT-Topic-Filter mit den Platzhaltern + (eine Ebene) und # (Rest)"""
+    sub_parts, topic_parts = subscription.split("/"), topic.split("/")
+    for i, part in enumerate(sub_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts) or (part != "+" and part != topic_parts[i]):
+            return False
+    return len(sub_parts) == len(topic_parts)
+
+
+class LocalMQTTClient:
+    """
+    Ersatz für paho.mqtt.client.Client ohne Broker: publish stellt Nachrichten
+    an passende Abos des eigenen Clients sofort per on_message zu und merkt
+    sich alle gesendeten Nachrichten in published.
+    """
+
+    def __init__(self, userdata=None):
+        self.on_message = None
+        self.userdata = userdata
+        self.subscriptions = []
+        self.published = []  # (topic, payload) in Sende-Reihenfolge
+
+    def connect(self, host: str = "localhost", port: int = 1883, keepalive: int = 60):
+        return 0
+
+    def subscribe(self, topic: str, qos: int = 0):
+        self.subscriptions.append(topic)
+        return 0, len(self.subscriptions)
+
+    def loop_start(self):
+        pass
+
+    def loop_stop(self):
+        pass
+
+    def publish(self, topic: str, payload=None, qos: int = 0, retain: bool = False):
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        self.published.append((topic, payload))
+        if self.on_message is not None and any(topic_matches(s, topic) for s in self.subscriptions):
+            self.on_message(self, self.userdata, SimpleNamespace(topic=topic, payload=payload or b""))
+
+
+def mqtt_sender(client, topic: str = "esp32/motors", names=MOTOR_COMMANDS):
+    """send_command für ControlRuntime: Aktion -> Befehlsname per MQTT"""
+    def send(action):
+        client.publish(topic, names[action])
+    return send
+
+
+# ==================== Testlauf ====================
+if __name__ == "__main__":
+    import random
+    import time
+
+    from scripts.q_learning_agent import QLearningAgent
+
+    class DummyRobot:
+        """RobotEnv im Dummy-Modus mit langsamem Sensor (blockierende Messung)"""
+        critical_distance = 10
+
+        def __init__(self):
+            self.distance = 300
+
+        def read_distance(self):
+            time.sleep(0.01)
+            return self.distance
+
+        def execute_action(self, action):
+            time.sleep(0.02)
+            if action == 1:
+                self.distance -= random.randint(5, 15)
+            elif action in [2, 3]:
+                self.distance += random.randint(0, 5)
+
+        def outcome(self, distance):
+            return (-10, True) if distance < self.critical_distance else (1, False)
+
+        def render(self):
+            logging.info(f"Distance: {self.distance:.1f} cm")
+
+    client = LocalMQTTClient()
+    client.on_message = lambda c, u, msg: None
+    client.subscribe("esp32/#")
+    runtime = ControlRuntime(DummyRobot(), QLearningAgent([0, 1, 2, 3]), mqtt_sender(client),
+                             rate_hz=20, save_interval=1.0, max_running_time=3.0)
+    stats = asyncio.run(runtime.run())
+    logging.info(f"[INFO] {stats.summary()}")
+    logging.info(f"[INFO] MQTT-Nachrichten: {len(client.published)} | done: {runtime.done}")
@@ -0,0 +1,138 @@
+"""
+curriculum.py
+- Adaptiver Curriculum-Scheduler für train_sim_env.train
+- Beobachtet je Episode Erfolg (Ziel erreicht) und Änderung der Q-Werte in
+  einem gleitenden Fenster; eine Stufe gilt als gelernt, sobald Erfolgsquote
+  und Q-Änderung die Schwellen erreichen, dann folgt die nächste Stufe
+- Stagniert die Erfolgsquote über mehrere Fenster, wird ebenfalls
+  weitergeschaltet, statt das Episodenbudget der Stufe auszuschöpfen
+- Nach der letzten gelernten Stufe endet das Training vorzeitig
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import logging
+from collections import deque
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+
+
+class CurriculumScheduler:
+    """
+    Stufen mit steigender Hindernisanzahl (wie bisher linear bis max_obstacles,
+    doppelte Anzahlen werden zu einer Stufe zusammengefasst, repeats[i] zählt,
+    wie vielen der num_levels Samples Stufe i entspricht). Pro Episode record() aufrufen,
+    bei True ist die aktuelle Stufe gelernt (oder stagniert) und advance()
+    schaltet weiter.
+
+    Erfolgsquote: Anteil der Episoden, die das Ziel erreicht haben. Episoden,
+    deren Start weiter als max_steps (Manhattan) vom Ziel entfernt liegt,
+    können das Ziel nicht erreichen und zählen nicht mit.
+    Q-Änderung: größte absolute Änderung eines Q-Werts je Episode, gemittelt
+    über das Fenster (nur für Tabellen mit values-Array, sonst ignoriert).
+    Stagnation: Erfolgsquote seit patience vollen Fenstern nicht um mindestens
+    min_improvement gestiegen.
+    """
+
+    def __init__(self, max_obstacles: int, num_levels: int, window: int = 100,
+                 success_threshold: float = 0.9, delta_threshold: float = 0.5,
+                 patience: int = 3, min_improvement: float = 0.02):
+        """
+        num_levels: Anzahl Curriculum-Stufen (entspricht num_samples in train)
+        window: Fenstergröße in Episoden, frühestens nach so vielen Episoden wird weitergeschaltet
+        success_threshold: geforderte Erfolgsquote im Fenster
+        delta_threshold: geforderte mittlere maximale Q-Änderung je Episode im Fenster
+        patience: Anzahl Fenster ohne Verbesserung bis zur Stagnation (0 = aus)
+        min_improvement: Mindestanstieg der Erfolgsquote, der als Verbesserung zählt
+        """
+        counts = [int((level / num_levels) * max_obstacles) for level in range(num_levels)]
+        self.levels = sorted(set(counts))
+        self.repeats = [counts.count(level) for level in self.levels]
+        self.window = int(window)
+        self.success_threshold = success_threshold
+        self.delta_threshold = delta_threshold
+        self.patience = int(patience)
+        self.min_improvement = min_improvement
+        self.level = 0
+        self.episodes = 0  # Episoden in der aktuellen Stufe
+        self._successes = deque(maxlen=self.window)
+        self._deltas = deque(maxlen=self.window)
+        self._snapshot = None  # (Tabelle, evictions, Kopie der Q-Werte) der letzten Episode
+        self._best_rate = -1.0
+        self._stalled_windows = 0
+
+    @property
+    def num_obstacles(self) -> int:
+        return self.levels[self.level]
+
+    @property
+    def finished(self) -> bool:
+        return self.level >= len(self.levels)
+
+    def budget(self, episodes_per_sample: int) -> int:
+        """Episodenbudget der aktuellen Stufe: das aller zusammengefassten Samples"""
+        return episodes_per_sample * self.repeats[self.level]
+
+    @property
+    def success_rate(self) -> float:
+        return float(np.mean(self._successes)) if self._successes else 0.0
+
+    @property
+    def q_delta(self) -> float:
+        return float(np.mean(self._deltas)) if self._deltas else float("inf")
+
+    def _q_change(self, table) -> float | None:
+        """Größte Änderung eines Q-Werts seit der letzten Episode"""
+        values = getattr(table, "values", None)
+        if values is None:
+            return None
+        n = len(table)
+        snapshot = self._snapshot
+        self._snapshot = (table, table.evictions, values[:n].copy())
+        if snapshot is None or snapshot[0] is not table or snapshot[1] != table.evictions:
+            # Erste Episode oder Zeilen verschoben (BoundedQTable): kein Vergleich möglich
+            return float("inf")
+        old = snapshot[2]
+        delta = float(np.abs(values[:len(old)] - old).max()) if len(old) else 0.0
+        if n > len(old):
+            # Neue Zustände starten bei 0
+            delta = max(delta, float(np.abs(values[len(old):n]).max()))
+        return delta
+
+    def record(self, table, start, goal, max_steps: int, done: bool) -> bool:
+        """Wertet eine abgeschlossene Episode aus. True = Stufe gelernt oder stagniert"""
+        self.episodes += 1
+        delta = self._q_change(table)
+        if delta is not None:
+            self._deltas.append(delta)
+        if abs(goal[0] - start[0]) + abs(goal[1] - start[1]) <= max_steps:
+            self._successes.append(bool(done))
+        if self.episodes % self.window == 0 and self._successes:
+            if self.success_rate >= self._best_rate + self.min_improvement:
+                self._best_rate = self.success_rate
+                self._stalled_windows = 0
+            else:
+                self._stalled_windows += 1
+        return self.converged() or self.stalled()
+
+    def converged(self) -> bool:
+        if self.episodes < self.window or not self._successes:
+            return False
+        if self.success_rate < self.success_threshold:
+            return False
+        return not self._deltas or self.q_delta <= self.delta_threshold
+
+    def stalled(self) -> bool:
+        return self.patience > 0 and self._stalled_windows >= self.patience
+
+    def advance(self):
+        """Nächste Stufe, Fenster beginnen neu"""
+        self.level += 1
+        self.episodes = 0
+        self._successes.clear()
+        self._deltas.clear()
+        self._snapshot = None
+        self._best_rate = -1.0
+        self._stalled_windows = 0
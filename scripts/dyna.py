@@ -0,0 +1,152 @@
+"""
+dyna.py
+- Experience Replay und Dyna-Q Planung für den QLearningAgent
+- Jeder echte Schritt (auf Hardware ein 0.2 s Motorimpuls) wird zusätzlich
+  in einem Ringpuffer und einem tabellarischen Umgebungsmodell gespeichert
+  und für weitere Updates wiederverwendet
+- Puffer und Modell liegen in vorallokierten NumPy-Arrays
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from scripts.q_learning_agent import QLearningAgent
+
+
+class ReplayBuffer:
+    """Ringpuffer für Übergänge, Zustände als Zeilenindizes der ArrayQTable"""
+
+    def __init__(self, capacity: int, n_actions: int):
+        self.capacity = int(capacity)
+        self.size = 0
+        self._next = 0
+        self.states = np.zeros(self.capacity, dtype=np.int64)
+        self.actions = np.zeros(self.capacity, dtype=np.int64)
+        self.rewards = np.zeros(self.capacity, dtype=np.float64)
+        self.next_states = np.zeros(self.capacity, dtype=np.int64)
+        self.next_valid = np.zeros((self.capacity, n_actions), dtype=bool)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state_row, action_col, reward, next_row, next_valid):
+        i = self._next
+        self.states[i] = state_row
+        self.actions[i] = action_col
+        self.rewards[i] = reward
+        self.next_states[i] = next_row
+        self.next_valid[i] = next_valid
+        self._next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size: int, rng: np.random.Generator):
+        """Gleichverteilte Stichprobe (mit Zurücklegen) aus dem Puffer"""
+        idx = rng.integers(0, self.size, batch_size)
+        return (self.states[idx], self.actions[idx], self.rewards[idx],
+                self.next_states[idx], self.next_valid[idx])
+
+
+class TabularModel:
+    """
+    Deterministisches Umgebungsmodell: (state, action) -> zuletzt beobachtetes
+    (reward, next_state, gültige Folgeaktionen).
+    """
+
+    def __init__(self, n_actions: int, capacity: int = 1024):
+        self.n_actions = n_actions
+        self.next_states = np.full((capacity, n_actions), -1, dtype=np.int64)
+        self.rewards = np.zeros((capacity, n_actions), dtype=np.float64)
+        self.next_valid = np.zeros((capacity, n_actions, n_actions), dtype=bool)
+        # Flache Indizes (row * n_actions + col) aller beobachteten Paare
+        self._observed = np.zeros(capacity * n_actions, dtype=np.int64)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, rows: int):
+        capacity = self.next_states.shape[0]
+        while capacity <= rows:
+            capacity *= 2
+        n = self.next_states.shape[0]
+        for name, fill in (("next_states", -1), ("rewards", 0.0), ("next_valid", False)):
+            old = getattr(self, name)
+            grown = np.full((capacity,) + old.shape[1:], fill, dtype=old.dtype)
+            grown[:n] = old
+            setattr(self, name, grown)
+        observed = np.zeros(capacity * self.n_actions, dtype=np.int64)
+        observed[:self.size] = self._observed[:self.size]
+        self._observed = observed
+
+    def observe(self, state_row, action_col, reward, next_row, next_valid):
+        if state_row >= self.next_states.shape[0]:
+            self._grow(state_row)
+        if self.next_states[state_row, action_col] < 0:
+            self._observed[self.size] = state_row * self.n_actions + action_col
+            self.size += 1
+        self.next_states[state_row, action_col] = next_row
+        self.rewards[state_row, action_col] = reward
+        self.next_valid[state_row, action_col] = next_valid
+
+    def sample(self, batch_size: int, rng: np.random.Generator):
+        """Gleichverteilte Stichprobe beobachteter (state, action)-Paare samt Modellvorhersage"""
+        flat = self._observed[rng.integers(0, self.size, batch_size)]
+        rows, cols = np.divmod(flat, self.n_actions)
+        return (rows, cols, self.rewards[rows, cols],
+                self.next_states[rows, cols], self.next_valid[rows, cols])
+
+
+class DynaQAgent(QLearningAgent):
+    def __init__(self, actions, alpha=0.1, gamma=0.9, epsilon=0.2,
+                 replay_updates=4, planning_steps=8, buffer_size=10000):
+        """
+        replay_updates: Updates aus dem Replay-Puffer pro echtem Schritt
+        planning_steps: Dyna-Q Planungs-Updates aus dem Modell pro echtem Schritt
+        buffer_size: Kapazität des Replay-Puffers
+        """
+        super().__init__(actions, alpha=alpha, gamma=gamma, epsilon=epsilon, backend="array")
+        self.replay_updates = int(replay_updates)
+        self.planning_steps = int(planning_steps)
+        self.buffer_size = int(buffer_size)
+        self._reset_memory()
+
+    def _reset_memory(self):
+        """Puffer und Modell gehören zu den Zeilen genau einer Q-Tabelle"""
+        self.buffer = ReplayBuffer(self.buffer_size, len(self.actions))
+        self.model = TabularModel(len(self.actions))
+        self._memory_table = self._q_table
+        self._memory_evictions = self._q_table.evictions
+
+    def _valid_mask(self, valid_actions) -> np.ndarray:
+        if not valid_actions:
+            return np.ones(len(self.actions), dtype=bool)
+        return np.isin(self.actions, list(valid_actions))
+
+    def learn(self, state, action, reward, next_state, valid_next_actions=None):
+        """Echtes Update, danach Replay- und Planungs-Updates"""
+        super().learn(state, action, reward, next_state, valid_next_actions)
+        row, col = self._remember(state, action, reward, next_state, valid_next_actions)
+        self._plan(row, col)
+
+    def _remember(self, state, action, reward, next_state, valid_next_actions):
+        """Legt den Übergang in Puffer und Modell ab, gibt (row, col) zurück"""
+        table = self._batch_table()
+        # Folgezustand zuerst: eine Verdrängung (BoundedQTable) verschiebt Zeilen,
+        # der gerade benutzte Zustand selbst wird dabei nicht verdrängt
+        next_row = table.row_of(next_state, create=True)
+        row = table.row_of(state, create=True)
+        col = table.column_of(action)
+        if table is not self._memory_table or table.evictions != self._memory_evictions:
+            # Q-Tabelle ersetzt (z.B. load_q_table) oder Zeilen verschoben -> Indizes ungültig
+            self._reset_memory()
+        valid = self._valid_mask(valid_next_actions)
+        self.buffer.add(row, col, reward, next_row, valid)
+        self.model.observe(row, col, reward, next_row, valid)
+        return row, col
+
+    def _plan(self, row, col):
+        if self.replay_updates > 0:
+            self.update_rows(*self.buffer.sample(self.replay_updates, self.np_rng))
+        if self.planning_steps > 0:
+            self.update_rows(*self.model.sample(self.planning_steps, self.np_rng))
@@ -1,22 +1,43 @@
 # env.py
 """
 RobotEnv für Daisy – ESP32-tauglich
+- Motorbefehle laufen zeitgesteuert über TimedActuator (actuator.py): execute_action
+  blockiert nicht, gleiche Aktionen verlängern die laufende Bewegung, ohne neuen
+  Befehl stoppen die Motoren nach MOTOR_COMMAND_DURATION_S automatisch
+- Abstand kommt aus DistanceService: Messung mit festem Takt im Hintergrund,
+  read_distance liefert den Median der letzten Messungen ohne Echo-Wartezeit
 """
 
 import random
 import time
 import machine
 import logging
-from scripts.config import USE_HARDWARE
+from components.sensors.distance_service import DistanceService
+from scripts.actuator import TimedActuator
+from scripts.latency import timed
+from scripts.config import (
+    USE_HARDWARE, CONTROL_RATE_HZ, MOTOR_COMMAND_DURATION_S, MAX_DISTANCE_CM,
+    SENSOR_RATE_HZ, SENSOR_MEDIAN_WINDOW, SENSOR_STALE_S
+)
 
 # Logging Konfiguration
 logging.basicConfig(level=logging.INFO)
 
 
 class RobotEnv:
-    def __init__(self):
+    def __init__(self, on_command_complete=None, step_interval: float = 1.0 / CONTROL_RATE_HZ):
+        """
+        on_command_complete: optional Callback (command_id, action, status) bei Ende eines Motorbefehls
+        step_interval: Mindestabstand zweier step()-Aufrufe im Hardware-Modus in Sekunden
+        """
         self.critical_distance = 10  # cm
         self.distance = 300
+        self.step_interval = step_interval
+        self.actuator = None
+        self.sensor = None
+        self._last_step = None
+        # Latenzmessung je Messung (ausgeschaltet bleibt die Methode unverändert)
+        self.read_distance = timed("read_distance", self.read_distance)
 
         if USE_HARDWARE:
             # Pins anpassen für dein Board
@@ -24,63 +45,91 @@ class RobotEnv:
             self.echo = machine.Pin(18, machine.Pin.IN)
             self.motor_left = machine.Pin(12, machine.Pin.OUT)
             self.motor_right = machine.Pin(13, machine.Pin.OUT)
+            self.sensor = DistanceService(self._ping, SENSOR_RATE_HZ, SENSOR_MEDIAN_WINDOW,
+                                          max_range_cm=MAX_DISTANCE_CM, stale_after=SENSOR_STALE_S).start()
+            self.actuator = TimedActuator(self._drive_motors, self._stop_motors, MOTOR_COMMAND_DURATION_S,
+                                          on_complete=on_command_complete)
+
+    def _ping(self):
+        # HC-SR04 Messung, läuft im Thread des DistanceService
+        self.trig.value(0)
+        time.sleep_us(2)
+        self.trig.value(1)
+        time.sleep_us(10)
+        self.trig.value(0)
+
+        duration = machine.time_pulse_us(self.echo, 1, 30000)  # Timeout 30ms
+        if duration < 0:
+            return -1  # Kein Echo
+        return (duration / 2) / 29.1
 
     def read_distance(self):
         if USE_HARDWARE:
-            # HC-SR04 Messung
-            self.trig.value(0)
-            time.sleep_us(2)
-            self.trig.value(1)
-            time.sleep_us(10)
-            self.trig.value(0)
-            
-            duration = machine.time_pulse_us(self.echo, 1, 30000)  # Timeout 30ms
-            distance_cm = (duration / 2) / 29.1
-            self.distance = max(distance_cm, 0)
+            distance_cm = self.sensor.read()
+            if distance_cm is None:
+                # Sensor liefert nichts mehr: wie Hindernis behandeln, der Roboter stoppt
+                logging.warning("[WARN] Keine aktuelle Abstandsmessung, Sicherheitsstopp")
+                distance_cm = 0.0
+            self.distance = distance_cm
         else:
             self.distance = random.randint(20, 100)
         return self.distance
 
     def reset(self):
+        self._last_step = time.monotonic()
         return self.read_distance()
 
-    def execute_action(self, action):
+    def _drive_motors(self, action):
         # Actions: 0=Stop, 1=Forward, 2=Left, 3=Right
+        left, right = {1: (1, 1), 2: (0, 1), 3: (1, 0)}.get(action, (0, 0))
+        self.motor_left.value(left)
+        self.motor_right.value(right)
+
+    def _stop_motors(self):
+        self.motor_left.value(0)
+        self.motor_right.value(0)
+
+    def execute_action(self, action):
+        """Setzt den Motorbefehl ab und kehrt sofort zurück, Rückgabe: Befehls-ID (Hardware) oder None"""
         if USE_HARDWARE:
-            if action == 0:
-                self.motor_left.value(0)
-                self.motor_right.value(0)
-            elif action == 1:
-                self.motor_left.value(1)
-                self.motor_right.value(1)
-            elif action == 2:  # Links
-                self.motor_left.value(0)
-                self.motor_right.value(1)
-            elif action == 3:  # Rechts
-                self.motor_left.value(1)
-                self.motor_right.value(0)
-            time.sleep(0.2)
-            self.motor_left.value(0)
-            self.motor_right.value(0)
-        else:
-            # Dummy-Modus: Distance ändert sich zufällig
-            if action == 1:
-                self.distance -= random.randint(5, 15)
-            elif action in [2, 3]:
-                self.distance += random.randint(0, 5)
+            return self.actuator.command(action)
+        # Dummy-Modus: Distance ändert sich zufällig
+        if action == 1:
+            self.distance -= random.randint(5, 15)
+        elif action in [2, 3]:
+            self.distance += random.randint(0, 5)
+        return None
+
+    def outcome(self, dist):
+        """Reward und done für einen gemessenen Abstand (auch für control_loop.py)"""
+        if dist < self.critical_distance:
+            return -10, True
+        return 1, False
 
     def step(self, action):
         self.execute_action(action)
+        if USE_HARDWARE:
+            # Bewegung läuft weiter, gewartet wird nur der Rest des Schrittintervalls
+            self._wait_step_interval()
         dist = self.read_distance()
+        reward, done = self.outcome(dist)
+        return dist, reward, done
 
-        if dist < self.critical_distance:
-            reward = -10
-            done = True
-        else:
-            reward = 1
-            done = False
+    def _wait_step_interval(self):
+        now = time.monotonic()
+        if self._last_step is not None:
+            remaining = self._last_step + self.step_interval - now
+            if remaining > 0:
+                time.sleep(remaining)
+                now += remaining
+        self._last_step = now
 
-        return dist, reward, done
+    def close(self):
+        """Motoren stoppen, Watchdog und Messdienst beenden"""
+        if self.actuator is not None:
+            self.actuator.close()
+        if self.sensor is not None:
+            self.sensor.close()
 
     def render(self):
         logging.info(f"Distance: {self.distance:.1f} cm")
@@ -0,0 +1,161 @@
+"""
+evaluate.py
+- Bewertet die greedy Policy einer gespeicherten Q-Tabelle auf vielen
+  festen, per Seed erzeugten SimEnv-Layouts (LayoutPool, immer lösbar)
+- Alle Layouts eines Stapels laufen vektorisiert im Gleichschritt, Q-Werte
+  werden einmal als (W, H, Aktionen)-Grid nachgeschlagen
+- Kennzahlen: Erfolgsquote, Pfadlänge relativ zum kürzesten Weg (BFS),
+  Durchsatz; mehrere Checkpoints werden auf denselben Layouts verglichen
+Aufruf:
+    python -m scripts.evaluate q_table.qtb [weitere.qtb ...] --layouts 5000 --density 0.2
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from scripts.generate_sim_env import ACTION_DX, ACTION_DY, grid_distances
+from scripts.layouts import LayoutPool
+from scripts.q_learning_agent import QLearningAgent
+from scripts.config import Q_TABLE_FILE
+
+logging.basicConfig(level=logging.INFO)
+
+ACTIONS = [0, 1, 2, 3]
+
+
+def load_agent(filepath: str) -> QLearningAgent:
+    """Agent mit der Q-Tabelle aus filepath (.qtb oder Pickle)"""
+    if not os.path.exists(filepath) and not os.path.exists(os.path.splitext(filepath)[0] + ".pkl"):
+        raise FileNotFoundError(f"Q-Tabelle nicht gefunden: {filepath}")
+    agent = QLearningAgent(ACTIONS)
+    agent.load_q_table(filepath, read_only=True)
+    return agent
+
+
+def table_grid_size(agent: QLearningAgent):
+    """Kleinstes Grid, das alle (x, y)-Zustände der Q-Tabelle enthält"""
+    cells = [json.loads(key) for key in agent._batch_table().keys]
+    cells = [c for c in cells if isinstance(c, list) and len(c) == 2]
+    if not cells:
+        raise ValueError("Q-Tabelle enthält keine (x, y)-Zustände")
+    return tuple(int(v) + 1 for v in np.max(cells, axis=0))
+
+
+def q_grid(agent: QLearningAgent, grid_size) -> np.ndarray:
+    """Q-Werte (W, H, Aktionen) aller Zellen, unbekannte Zustände liefern 0 wie get_q"""
+    if agent.state_encoder is not None:
+        raise ValueError("Bewertung benötigt eine Q-Tabelle auf rohen (x, y)-Zuständen")
+    w, h = grid_size
+    cells = [(x, y) for x in range(w) for y in range(h)]
+    rows = agent._batch_table().rows_of(cells)
+    return agent._batch_q(rows).reshape(w, h, -1)
+
+
+def greedy_rollouts(q: np.ndarray, action_masks: np.ndarray, start_pos, goal_pos, max_steps: int,
+                    rng: np.random.Generator) -> np.ndarray:
+    """
+    Greedy Policy auf N Layouts gleichzeitig. Wie choose_action mit epsilon = 0:
+    beste gültige Aktion, Gleichstand zufällig. Fertige Layouts fallen aus dem Stapel.
+    action_masks: Bitmasken gültiger Aktionen (N, W, H), siehe valid_action_masks
+    Rückgabe: Schritte bis zum Ziel je Layout, -1 = Ziel nicht erreicht
+    """
+    n = len(action_masks)
+    steps = np.full(n, -1, dtype=np.int64)
+    ids = np.arange(n)
+    x = np.full(n, start_pos[0], dtype=np.int64)
+    y = np.full(n, start_pos[1], dtype=np.int64)
+    bits = 1 << np.arange(q.shape[-1])
+
+    for step in range(1, max_steps + 1):
+        valid = (action_masks[ids, x, y][:, None] & bits) != 0
+        scores = np.where(valid, q[x, y], -np.inf)
+        best = scores == scores.max(axis=1, keepdims=True)
+        action = (rng.random(best.shape) * best).argmax(axis=1)
+        x = x + ACTION_DX[action]
+        y = y + ACTION_DY[action]
+
+        done = (x == goal_pos[0]) & (y == goal_pos[1])
+        steps[ids[done]] = step
+        # Ohne gültige Aktion bleibt der Agent stecken (in SimEnv: Strafe, keine Bewegung)
+        keep = ~done & valid.any(axis=1)
+        if not keep.all():
+            ids, x, y = ids[keep], x[keep], y[keep]
+            if len(ids) == 0:
+                break
+    return steps
+
+
+def evaluate(agent: QLearningAgent, pool: LayoutPool, max_steps: int | None = None,
+             batch_size: int = 4096, seed: int = 0) -> dict:
+    """
+    Greedy Policy von agent auf allen Layouts des Pools, Start jeweils pool.start_pos.
+    Pfadlänge: Schritte / kürzester Weg, gemittelt über die erfolgreichen Layouts.
+    """
+    grid_size, goal_pos = pool.grid_size, pool.goal_pos
+    max_steps = max_steps or 4 * (grid_size[0] + grid_size[1])
+    rng = np.random.default_rng(seed)
+
+    start = time.perf_counter()
+    q = q_grid(agent, grid_size)
+    steps = np.concatenate([
+        greedy_rollouts(q, pool.action_masks[i:i + batch_size], pool.start_pos, goal_pos, max_steps, rng)
+        for i in range(0, len(pool), batch_size)
+    ])
+    elapsed = time.perf_counter() - start
+
+    shortest = grid_distances(pool.occupancy, goal_pos)[:, pool.start_pos[0], pool.start_pos[1]]
+    success = steps > 0
+    ratio = steps[success] / np.maximum(shortest[success], 1)
+    return {
+        "layouts": len(pool),
+        "success_rate": float(success.mean()),
+        "path_ratio_mean": float(ratio.mean()) if len(ratio) else float("nan"),
+        "path_ratio_median": float(np.median(ratio)) if len(ratio) else float("nan"),
+        "optimal_rate": float((ratio == 1).mean()) if len(ratio) else 0.0,
+        "mean_steps": float(steps[success].mean()) if success.any() else float("nan"),
+        "layouts_per_s": len(pool) / elapsed,
+        "seconds": elapsed,
+    }
+
+
+def _format_report(name: str, report: dict) -> str:
+    return (f"{name:30s} Erfolg: {report['success_rate']:6.1%} | Pfad/BFS: {report['path_ratio_mean']:5.2f} "
+            f"(Median {report['path_ratio_median']:4.2f}, optimal {report['optimal_rate']:6.1%}) | "
+            f"{report['layouts_per_s']:9.0f} Layouts/s")
+
+
+# ==================== Kommandozeile ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Greedy Policy gespeicherter Q-Tabellen auf festen Layouts bewerten")
+    parser.add_argument("q_tables", nargs="*", default=[Q_TABLE_FILE], help="Q-Tabellen (.qtb oder .pkl)")
+    parser.add_argument("--grid", type=int, nargs=2, default=None, metavar=("W", "H"),
+                        help="Grid-Größe (Standard: aus der ersten Q-Tabelle)")
+    parser.add_argument("--density", type=float, default=0.2, help="Anteil der Zellen mit Hindernissen")
+    parser.add_argument("--layouts", type=int, default=2000, help="Anzahl Layouts")
+    parser.add_argument("--max-steps", type=int, default=None, help="Schrittlimit (Standard: 4 * (W + H))")
+    parser.add_argument("--batch", type=int, default=4096, help="Layouts je Stapel")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="Ergebnisse zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    agents = {path: load_agent(path) for path in args.q_tables}
+    grid_size = tuple(args.grid) if args.grid else table_grid_size(next(iter(agents.values())))
+    pool = LayoutPool(grid_size, int(args.density * grid_size[0] * grid_size[1]), size=args.layouts,
+                      seed=args.seed)
+    reports = {}
+    for path, agent in agents.items():
+        reports[path] = evaluate(agent, pool, args.max_steps, args.batch, args.seed)
+        print(_format_report(path, reports[path]))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"grid": grid_size, "density": args.density, "layouts": args.layouts,
+                       "seed": args.seed, "results": reports}, f, indent=2)
+        logging.info(f"[INFO] Bewertung gespeichert in: {args.json}")
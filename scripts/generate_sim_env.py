@@ -7,8 +7,146 @@ generate_sim_env.py
 import random
 import logging
 
+import numpy as np
+
 logging.basicConfig(level=logging.INFO)
 
+# Bewegungsrichtungen je Aktion: 0=up, 1=down, 2=left, 3=right
+ACTION_DX = np.array([0, 0, -1, 1])
+ACTION_DY = np.array([-1, 1, 0, 0])
+_MOVES = tuple(zip(ACTION_DX.tolist(), ACTION_DY.tolist()))
+# Bitmaske gültiger Aktionen (Bit a = Aktion a) -> Liste der Aktionen
+_MASK_ACTIONS = tuple(tuple(a for a in range(4) if mask >> a & 1) for mask in range(16))
+
+
+def valid_action_masks(occupancy: np.ndarray) -> np.ndarray:
+    """
+    Bitmaske gültiger Aktionen (Bit a = Aktion a) je Zelle, für ein Belegungsgrid
+    (width, height) oder einen Stapel (..., width, height), 1 = Hindernis.
+    """
+    w, h = occupancy.shape[-2:]
+    # Rand aus Hindernissen, damit Nachbarzellen per Slicing statt Einzelprüfung entstehen
+    free = np.zeros(occupancy.shape[:-2] + (w + 2, h + 2), dtype=np.uint8)
+    free[..., 1:-1, 1:-1] = occupancy == 0
+    return (
+        free[..., 1:-1, :-2]                # 0 = up (y-1)
+        | (free[..., 1:-1, 2:] << 1)        # 1 = down (y+1)
+        | (free[..., :-2, 1:-1] << 2)       # 2 = left (x-1)
+        | (free[..., 2:, 1:-1] << 3)        # 3 = right (x+1)
+    )
+
+
+def grid_distances(occupancy: np.ndarray, source) -> np.ndarray:
+    """
+    Kürzeste Schrittzahl jeder Zelle zu source (BFS, vektorisiert pro Front).
+    occupancy: (W, H) oder Stapel (N, W, H), -1 = Hindernis oder nicht erreichbar.
+    """
+    free = occupancy == 0
+    dist = np.full(occupancy.shape, -1, dtype=np.int64)
+    frontier = np.zeros(occupancy.shape, dtype=bool)
+    frontier[..., source[0], source[1]] = True
+    dist[..., source[0], source[1]] = 0
+    d = 0
+    while frontier.any():
+        d += 1
+        neighbours = np.zeros_like(frontier)
+        neighbours[..., 1:, :] |= frontier[..., :-1, :]
+        neighbours[..., :-1, :] |= frontier[..., 1:, :]
+        neighbours[..., :, 1:] |= frontier[..., :, :-1]
+        neighbours[..., :, :-1] |= frontier[..., :, 1:]
+        frontier = neighbours & free & (dist < 0)
+        dist[frontier] = d
+    return dist
+
+
+class FreeCellIndex:
+    """
+    Mögliche Startzellen eines Layouts: Liste für zufälliges Ziehen in O(1)
+    plus Position -> Listenindex für Enthaltensein-Abfragen. Ohne vorgegebene
+    Zellen sind das alle vom Ziel aus erreichbaren Zellen außer dem Ziel (wie
+    im LayoutPool), per BFS erst beim ersten Zugriff bestimmt. Ist das Ziel
+    eingeschlossen (z.B. Zufallslayouts ohne LayoutPool), gelten wie früher alle
+    freien Zellen außer dem Ziel als Startzellen. Die nach Distanz
+    zum Ziel sortierten Zellen für stratifizierte Starts werden ebenfalls erst
+    bei Bedarf berechnet.
+    """
+
+    def __init__(self, free, occupancy: np.ndarray, goal_pos):
+        """
+        free: bool (width, height), True = mögliche Startzelle; None = alle vom Ziel erreichbaren Zellen
+        occupancy: Belegungsgrid des Layouts (für die Distanzen, nicht kopiert)
+        """
+        self.occupancy = occupancy
+        self.goal_pos = goal_pos
+        self._cells = None
+        self._pos = None          # Zelle -> Index in cells, erst bei Bedarf aufgebaut
+        self._by_distance = None  # erreichbare Zellen nach Distanz zum Ziel sortiert
+        if free is not None:
+            self._set_cells(free)
+
+    def _set_cells(self, free: np.ndarray):
+        xs, ys = np.nonzero(free)
+        self._cells = list(zip(xs.tolist(), ys.tolist()))
+
+    @property
+    def cells(self) -> list:
+        if self._cells is None:
+            free = grid_distances(self.occupancy, self.goal_pos) > 0
+            if not free.any():
+                # Ziel eingeschlossen: keine Zelle erreicht es, jede freie Zelle ist Start
+                free = self.occupancy == 0
+                free[self.goal_pos] = False
+            self._set_cells(free)
+        return self._cells
+
+    def invalidate(self):
+        """Belegung hat sich geändert: Startzellen beim nächsten Zugriff neu aus der Erreichbarkeit bestimmen"""
+        self._cells = None
+        self._pos = None
+        self._by_distance = None
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return cell in self._positions()
+
+    def _positions(self) -> dict:
+        if self._pos is None:
+            self._pos = dict(zip(self.cells, range(len(self.cells))))
+        return self._pos
+
+    def sample(self):
+        """Zufällige Startzelle"""
+        cells = self.cells
+        if not cells:
+            raise ValueError("Keine freie Startzelle im Layout")
+        return random.choice(cells)
+
+    def sample_stratum(self, stratum: int, n_strata: int):
+        """
+        Zufällige Startzelle aus Schicht stratum von n_strata gleich großen
+        Schichten nach Distanz zum Ziel (0 = nah). Nur vom Ziel aus erreichbare Zellen,
+        bei eingeschlossenem Ziel alle Startzellen ohne Ordnung.
+        Gibt es weniger Zellen als Schichten, teilen sich benachbarte Schichten eine Zelle.
+        """
+        if not 0 <= stratum < n_strata:
+            raise ValueError(f"Schicht {stratum} außerhalb von 0..{n_strata - 1}")
+        if self._by_distance is None:
+            dist = grid_distances(self.occupancy, self.goal_pos)
+            cells = [c for c in self.cells if dist[c] > 0]
+            self._by_distance = sorted(cells, key=lambda c: dist[c]) if cells else list(self.cells)
+        cells = self._by_distance
+        if not cells:
+            raise ValueError("Keine freie Startzelle im Layout")
+        low = stratum * len(cells) // n_strata
+        high = max((stratum + 1) * len(cells) // n_strata, low + 1)
+        return cells[random.randrange(low, high)]
+
+    def stratified(self, n_strata: int) -> list:
+        """Je eine zufällige Startzelle pro Distanz-Schicht, von nah nach fern"""
+        return [self.sample_stratum(i, n_strata) for i in range(n_strata)]
+
 
 class SimEnv:
     def __init__(
@@ -17,16 +155,22 @@ class SimEnv:
             start_pos=(0, 0),
             obstacles: list | None = None,
             random_obstacles: bool = False,
-            num_random_obstacles: int = 3
+            num_random_obstacles: int = 3,
+            layout_pool=None
             ):
         """
         grid_size: (width, height)
         start_pos: Startposition (x, y)
         obstacles: Liste von (x,y)-Tuples, die feste Hindernisse sind
         random_obstacles: falls True, erzeuge num_random_obstacles zufällige Hindernisse
+        layout_pool: optional LayoutPool (layouts.py), reset zieht dann lösbare
+                     Layouts mit genau dessen Hindernisanzahl statt Rejection Sampling
         """
         if not (isinstance(grid_size, tuple) and len(grid_size) == 2):
             raise ValueError("grid_size muss ein Tuple (width, height) sein")
+        if layout_pool is not None and (tuple(layout_pool.grid_size) != grid_size
+                                        or tuple(layout_pool.start_pos) != tuple(start_pos)):
+            raise ValueError("layout_pool passt nicht zu grid_size/start_pos")
         self.grid_size = grid_size
         self.start_pos = start_pos
         self.goal_pos = (grid_size[0]-1, grid_size[1]-1)
@@ -35,6 +179,16 @@ class SimEnv:
         self._random_obstacles = set()
         self.random_obstacles_flag = bool(random_obstacles)
         self.num_random_obstacles = int(num_random_obstacles)
+        self.layout_pool = layout_pool
+
+        # Belegungsgrid occupancy (uint8, 1 = Hindernis) und Bitmaske gültiger Aktionen
+        # je Zelle action_masks (Bit a = Aktion a), neu berechnet nur wenn sich die
+        # Hindernisse ändern (reset mit Zufallshindernissen). Dazu free_cells
+        # (FreeCellIndex) für zufällige Starts. Einzelne Hindernisse über
+        # set_obstacle ändern; wer self.obstacles direkt verändert, muss danach
+        # _update_grid() aufrufen.
+        self.obstacles = None
+        self._shared_layout = False  # Layout gehört dem LayoutPool, vor Änderungen kopieren
 
         self.reset()
 
@@ -42,6 +196,18 @@ class SimEnv:
         """Setzt die Umgebung auf den Startzustand zurück"""
         self.position = self.start_pos
 
+        if self.random_obstacles_flag or self.obstacles is None:
+            self._generate_obstacles()
+        return self.position
+
+    def _generate_obstacles(self):
+        if self.random_obstacles_flag and self.layout_pool is not None:
+            # Vorberechnetes lösbares Layout, konstante Kosten
+            (self.obstacles, self.occupancy, self.action_masks,
+             self._mask_rows, self.free_cells) = self.layout_pool.sample()
+            self._shared_layout = True
+            return
+
         if self.random_obstacles_flag:
             self._random_obstacles.clear()
             attempts = 0
@@ -56,7 +222,73 @@ class SimEnv:
                 attempts += 1
        
         self.obstacles = set(self._fixed_obstacles) | set(self._random_obstacles)
-        return self.position
+        self._update_grid()
+
+    def _update_grid(self):
+        """Baut Belegungsgrid und Aktionsmasken aus self.obstacles neu auf"""
+        w, h = self.grid_size
+        self.occupancy = np.zeros((w, h), dtype=np.uint8)
+        cells = [(x, y) for x, y in self.obstacles if 0 <= x < w and 0 <= y < h]
+        if cells:
+            self.occupancy[tuple(zip(*cells))] = 1
+        self.action_masks = valid_action_masks(self.occupancy)
+        # Einzelzugriffe über verschachtelte Listen sind schneller als NumPy-Indizierung
+        self._mask_rows = self.action_masks.tolist()
+        # Startzellen: vom Ziel erreichbar (wie LayoutPool), BFS erst beim ersten Start
+        self.free_cells = FreeCellIndex(None, self.occupancy, self.goal_pos)
+        self._shared_layout = False
+
+    def set_obstacle(self, cell, blocked: bool = True):
+        """
+        Setzt oder entfernt ein einzelnes Hindernis. Belegung und Aktionsmasken der
+        Zelle und ihrer Nachbarn werden nur lokal angepasst; free_cells wird
+        invalidiert, da sich die Erreichbarkeit des Ziels überall ändern kann.
+        """
+        x, y = cell
+        w, h = self.grid_size
+        if not (0 <= x < w and 0 <= y < h):
+            raise ValueError(f"Zelle {cell} liegt außerhalb des Grids")
+        if self._shared_layout:
+            # Pool-Layout nicht verändern, sondern für diese Umgebung kopieren
+            self.obstacles = set(self.obstacles)
+            self.occupancy = self.occupancy.copy()
+            self.action_masks = self.action_masks.copy()
+            self._mask_rows = self.action_masks.tolist()
+            self.free_cells = FreeCellIndex(None, self.occupancy, self.goal_pos)
+            self._shared_layout = False
+
+        if blocked:
+            self.obstacles.add(cell)
+            self.occupancy[x, y] = 1
+        else:
+            self.obstacles.discard(cell)
+            self.occupancy[x, y] = 0
+        self.free_cells.invalidate()
+
+        for cx, cy in [(x, y)] + [(x + dx, y + dy) for dx, dy in _MOVES]:
+            if 0 <= cx < w and 0 <= cy < h:
+                mask = 0
+                for action, (dx, dy) in enumerate(_MOVES):
+                    nx, ny = cx + dx, cy + dy
+                    if 0 <= nx < w and 0 <= ny < h and not self.occupancy[nx, ny]:
+                        mask |= 1 << action
+                self.action_masks[cx, cy] = mask
+                self._mask_rows[cx][cy] = mask
+
+    def random_start(self):
+        """Zufällige freie Startzelle (nicht das Ziel) in O(1)"""
+        return self.free_cells.sample()
+
+    def stratified_starts(self, n_strata: int) -> list:
+        """Je eine zufällige Startzelle aus n_strata Distanz-Schichten zum Ziel"""
+        return self.free_cells.stratified(n_strata)
+
+    def _cell_mask(self):
+        """Aktionsmaske der aktuellen Position, None außerhalb des Grids"""
+        x, y = self.position
+        if 0 <= x < self.grid_size[0] and 0 <= y < self.grid_size[1]:
+            return self._mask_rows[x][y]
+        return None
 
     def _is_obstacle(self, coordinate):
         """Bestimmt, ob dieser Koordinat wirklich ein Hindernis ist"""
@@ -64,6 +296,11 @@ class SimEnv:
     
     def get_valid_actions(self):
         """Gibt alle gültigen Aktionen vom aktuellen Standort zurück"""
+        mask = self._cell_mask()
+        if mask is not None:
+            return list(_MASK_ACTIONS[mask])
+
+        # Position außerhalb des Grids: Nachbarn einzeln prüfen
         x, y = self.position
         potential_actions = {
             0: (x, y-1),  # up
@@ -88,13 +325,22 @@ class SimEnv:
 
     def step(self, action):
         """Führt eine Aktion aus und gibt next_state, reward, done zurück"""
-        new_position = self._next_position(action)
+        mask = self._cell_mask()
+        if mask is not None and action in (0, 1, 2, 3):
+            # Ungültige Aktion → Strafe (Gültigkeit aus der vorberechneten Maske)
+            action = int(action)
+            if not mask >> action & 1:
+                return self.position, -10.0, False
+            dx, dy = _MOVES[action]
+            new_position = (self.position[0] + dx, self.position[1] + dy)
+        else:
+            new_position = self._next_position(action)
 
-        # Ungültige Aktion → Strafe
-        if (new_position[0] < 0 or new_position[0] >= self.grid_size[0] or
-            new_position[1] < 0 or new_position[1] >= self.grid_size[1] or
-            self._is_obstacle(new_position)):
-            return self.position, -10.0, False
+            # Ungültige Aktion → Strafe
+            if (new_position[0] < 0 or new_position[0] >= self.grid_size[0] or
+                new_position[1] < 0 or new_position[1] >= self.grid_size[1] or
+                self._is_obstacle(new_position)):
+                return self.position, -10.0, False
 
         self.position = new_position
 
@@ -123,3 +369,130 @@ class SimEnv:
                     row += ". "
             print(row)
         print()
+
+
+class BatchSimEnv:
+    """
+    N gleich große SimEnv-Grids im Gleichschritt.
+    Hindernisse liegen als bool-Belegungsarray (N, width, height) vor,
+    reset/step/get_valid_actions arbeiten vektorisiert über alle N Umgebungen.
+    Rewards entsprechen SimEnv.step.
+    """
+
+    def __init__(
+            self,
+            num_envs: int,
+            grid_size=(5, 5),
+            start_pos=(0, 0),
+            obstacles: list | None = None,
+            random_obstacles: bool = False,
+            num_random_obstacles: int = 3,
+            seed: int | None = None,
+            layout_pool=None
+            ):
+        """layout_pool: optional LayoutPool (layouts.py) für lösbare Zufallslayouts"""
+        if not (isinstance(grid_size, tuple) and len(grid_size) == 2):
+            raise ValueError("grid_size muss ein Tuple (width, height) sein")
+        if layout_pool is not None and (tuple(layout_pool.grid_size) != grid_size
+                                        or tuple(layout_pool.start_pos) != tuple(start_pos)):
+            raise ValueError("layout_pool passt nicht zu grid_size/start_pos")
+        self.num_envs = int(num_envs)
+        self.layout_pool = layout_pool
+        self.grid_size = grid_size
+        self.start_pos = start_pos
+        self.goal_pos = (grid_size[0]-1, grid_size[1]-1)
+        self.random_obstacles_flag = bool(random_obstacles)
+        self.num_random_obstacles = int(num_random_obstacles)
+        self.rng = np.random.default_rng(seed)
+
+        self._fixed = np.zeros(grid_size, dtype=bool)
+        for x, y in obstacles or []:
+            self._fixed[x, y] = True
+        self.occupancy = np.repeat(self._fixed[None], self.num_envs, axis=0)
+        self.positions = np.zeros((self.num_envs, 2), dtype=np.int64)
+        self._env_ids = np.arange(self.num_envs)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        """
+        Setzt die Umgebungen in mask (bool-Array, Standard: alle) zurück.
+        Gibt die Positionen aller Umgebungen als (N, 2)-Array zurück.
+        """
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        ids = np.flatnonzero(mask)
+        self.positions[ids] = self.start_pos
+
+        if self.random_obstacles_flag and len(ids):
+            if self.layout_pool is not None:
+                layouts = self.layout_pool.sample_indices(len(ids), self.rng)
+                self.occupancy[ids] = self.layout_pool.occupancy[layouts] != 0
+            else:
+                self.occupancy[ids] = self._fixed
+                self._place_random_obstacles(ids)
+        return self.positions.copy()
+
+    def _place_random_obstacles(self, ids):
+        """Zieht pro Umgebung num_random_obstacles verschiedene freie Zellen auf einmal"""
+        w, h = self.grid_size
+        blocked = self._fixed.copy()
+        blocked[self.start_pos] = True
+        blocked[self.goal_pos] = True
+        k = min(self.num_random_obstacles, int((~blocked).sum()))
+        if k <= 0:
+            return
+        # Zufällige Rangfolge der freien Zellen, die k kleinsten werden Hindernisse
+        scores = self.rng.random((len(ids), w * h))
+        scores[:, blocked.ravel()] = np.inf
+        cells = np.argpartition(scores, k - 1, axis=1)[:, :k]
+        flat = self.occupancy[ids].reshape(len(ids), -1)
+        np.put_along_axis(flat, cells, True, axis=1)
+        self.occupancy[ids] = flat.reshape(len(ids), w, h)
+
+    def random_starts(self, mask=None):
+        """Setzt die Umgebungen in mask auf zufällige freie Startzellen (nicht das Ziel)"""
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        ids = np.flatnonzero(mask)
+        if len(ids) == 0:
+            return self.positions.copy()
+        free = ~self.occupancy[ids]
+        free[:, self.goal_pos[0], self.goal_pos[1]] = False
+        scores = self.rng.random(free.shape) * free
+        cells = scores.reshape(len(ids), -1).argmax(axis=1)
+        self.positions[ids, 0], self.positions[ids, 1] = np.divmod(cells, self.grid_size[1])
+        return self.positions.copy()
+
+    def _targets(self):
+        """Zielkoordinaten (N, 4) für alle Aktionen und ob sie gültig sind"""
+        nx = self.positions[:, :1] + ACTION_DX
+        ny = self.positions[:, 1:] + ACTION_DY
+        inside = (nx >= 0) & (nx < self.grid_size[0]) & (ny >= 0) & (ny < self.grid_size[1])
+        cx = np.clip(nx, 0, self.grid_size[0] - 1)
+        cy = np.clip(ny, 0, self.grid_size[1] - 1)
+        valid = inside & ~self.occupancy[self._env_ids[:, None], cx, cy]
+        return nx, ny, valid
+
+    def get_valid_actions(self):
+        """bool-Maske (N, 4) der gültigen Aktionen je Umgebung"""
+        return self._targets()[2]
+
+    def step(self, actions):
+        """
+        Führt je Umgebung eine Aktion aus.
+        Rückgabe: positions (N, 2), rewards (N,), dones (N,)
+        """
+        actions = np.asarray(actions)
+        nx, ny, valid = self._targets()
+        moved = valid[self._env_ids, actions]
+
+        self.positions[moved, 0] = nx[moved, actions[moved]]
+        self.positions[moved, 1] = ny[moved, actions[moved]]
+        dones = moved & (self.positions[:, 0] == self.goal_pos[0]) & (self.positions[:, 1] == self.goal_pos[1])
+
+        # Wie SimEnv.step: ungültig -10, Ziel +10, sonst -0.01
+        # (SimEnv vergleicht die Distanz nach dem Positionsupdate, das Shaping ergibt dort stets -0.01)
+        rewards = np.where(moved, -0.01, -10.0)
+        rewards[dones] = 10.0
+        return self.positions.copy(), rewards, dones
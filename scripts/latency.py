@@ -0,0 +1,191 @@
+"""
+latency.py
+- Latenzmessung je Stufe (read_distance, choose_action, learn, MQTT, RAG, LLM, STT/TTS)
+- HDR-artige Histogramme im Prozess: logarithmische Buckets mit linearen
+  Unter-Buckets, fester Speicher, relative Genauigkeit über den ganzen Wertebereich
+- Periodische Zusammenfassung (p50/p90/p99/max je Stufe) über memory.log
+- Abschaltbar ohne Kosten: bei LATENCY_TRACING = False liefert timed() die
+  Funktion unverändert zurück, es bleibt kein Wrapper im Aufrufpfad
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+import time
+
+from scripts.config import LATENCY_TRACING, LATENCY_REPORT_INTERVAL_S
+
+logging.basicConfig(level=logging.INFO)
+
+ENABLED = LATENCY_TRACING.lower() == "true"
+
+
+class LatencyHistogram:
+    """
+    Histogramm über ganzzahlige Mikrosekunden wie HdrHistogram: Bucket k deckt
+    [2^k * half, 2^(k+1) * half) mit half linearen Unter-Buckets ab, der Fehler
+    eines Perzentils ist damit höchstens 10^-significant_figures relativ.
+    """
+
+    def __init__(self, highest_us: int = 3_600_000_000, significant_figures: int = 2):
+        self.sub_bucket_bits = (2 * 10 ** significant_figures - 1).bit_length()
+        self.half = 1 << (self.sub_bucket_bits - 1)
+        self.highest_us = highest_us
+        self.counts = [0] * (self._index(highest_us) + 1)
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.total = 0
+        self.sum_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    def _index(self, value: int) -> int:
+        bucket = max(value.bit_length() - self.sub_bucket_bits, 0)
+        return bucket * self.half + (value >> bucket)
+
+    def _upper_value(self, index: int) -> int:
+        """Größter Wert, der in Unter-Bucket index fällt"""
+        bucket = max(index // self.half - 1, 0)
+        return ((index - bucket * self.half + 1) << bucket) - 1
+
+    def record(self, seconds: float):
+        value = min(max(int(seconds * 1e6), 0), self.highest_us)
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.sum_us += value
+        self.max_us = max(self.max_us, value)
+        self.min_us = value if self.min_us is None else min(self.min_us, value)
+
+    def percentiles(self, *ps: float) -> list:
+        """Perzentile in Sekunden (obere Bucket-Grenze, nie über dem Maximum)"""
+        targets = sorted((max(1, -(-p * self.total // 100)), i) for i, p in enumerate(ps))
+        result = [0.0] * len(ps)
+        if not self.total:
+            return result
+        seen, t = 0, 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            while t < len(targets) and seen >= targets[t][0]:
+                result[targets[t][1]] = min(self._upper_value(index), self.max_us) / 1e6
+                t += 1
+            if t == len(targets):
+                break
+        return result
+
+    @property
+    def mean(self) -> float:
+        return self.sum_us / self.total / 1e6 if self.total else 0.0
+
+
+class LatencyTracker:
+    """
+    Ein Histogramm je Stufe. record() ist threadsicher (Sensor und Motorbefehl
+    laufen im Control-Loop in Threads). Alle report_interval Sekunden wird eine
+    Zusammenfassung geloggt und die Histogramme für das nächste Intervall geleert;
+    dieser Bericht läuft in einem eigenen Thread, record() macht kein Datei-I/O.
+    log: Callable(message), Standard: memory.log.log_event (erst beim ersten Bericht
+    importiert, damit scripts nicht vom memory-Paket abhängt)
+    """
+
+    def __init__(self, report_interval: float = LATENCY_REPORT_INTERVAL_S, log=None):
+        self.report_interval = report_interval
+        self.log = log
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._next_report = time.monotonic() + report_interval
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = LatencyHistogram()
+            hist.record(seconds)
+            now = time.monotonic()
+            due = self.report_interval and now >= self._next_report
+            if due:
+                # Nur ein Bericht je Intervall, auch wenn mehrere Threads gleichzeitig messen
+                self._next_report = now + self.report_interval
+        if due:
+            # Nicht im aufrufenden Thread loggen (z.B. asyncio-Loop des Control-Loops)
+            threading.Thread(target=self.report, name="latency-report").start()
+
+    def timed(self, stage: str, func):
+        """func mit Zeitmessung unter stage"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return wrapper
+
+    def summary(self) -> str:
+        parts = []
+        for stage, hist in sorted(self.stages.items()):
+            if hist.total:
+                p50, p90, p99 = hist.percentiles(50, 90, 99)
+                parts.append(f"{stage}: n={hist.total} p50={1000 * p50:.2f} p90={1000 * p90:.2f} "
+                             f"p99={1000 * p99:.2f} max={hist.max_us / 1000:.2f} ms")
+        return " | ".join(parts)
+
+    def report(self):
+        """Loggt die Zusammenfassung des laufenden Intervalls und beginnt ein neues"""
+        with self._lock:
+            message = self.summary()
+            for hist in self.stages.values():
+                hist.reset()
+            self._next_report = time.monotonic() + self.report_interval
+        if message:
+            logging.info(f"[LATENZ] {message}")
+            if self.log is None:
+                from memory.log import log_event
+                self.log = log_event
+            self.log(f"[LATENZ] {message}")
+
+
+# Gemeinsamer Tracker für alle Module
+tracker = LatencyTracker()
+
+
+def timed(stage: str, func=None):
+    """
+    Zeitmessung für func unter stage, als Wrapper (timed("learn", agent.learn))
+    oder Dekorator (@timed("tts")). Ausgeschaltet wird func selbst zurückgegeben.
+    """
+    if func is None:
+        return lambda f: timed(stage, f)
+    if not ENABLED:
+        return func
+    return tracker.timed(stage, func)
+
+
+def report():
+    """Zusammenfassung sofort loggen, z.B. beim Beenden"""
+    if ENABLED:
+        tracker.report()
+
+
+# ==================== Testlauf ====================
+if __name__ == "__main__":
+    import random
+
+    demo = LatencyTracker(report_interval=0, log=print)
+    for _ in range(100000):
+        demo.record("choose_action", random.lognormvariate(-9, 0.5))
+        demo.record("read_distance", random.uniform(0.001, 0.03))
+    demo.report()
+
+    hist = LatencyHistogram()
+    values = [random.expovariate(1000) for _ in range(100000)]
+    for v in values:
+        hist.record(v)
+    values.sort()
+    for p, estimate in zip((50, 99, 99.9), hist.percentiles(50, 99, 99.9)):
+        exact = values[int(p / 100 * len(values)) - 1]
+        print(f"p{p}: Histogramm {1e6 * estimate:.0f} us | exakt {1e6 * exact:.0f} us")
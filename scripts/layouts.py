@@ -0,0 +1,202 @@
+"""
+layouts.py
+- Lösbare Zufallslayouts (Hindernisse) für SimEnv und BatchSimEnv
+- Hindernisse für viele Kandidaten in einem vektorisierten Zug, Erreichbarkeit
+  Start -> Ziel per Flood Fill über alle Kandidaten gleichzeitig
+- LayoutPool: vorab erzeugte Layouts je Curriculum-Stufe, reset zieht in O(1)
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import random
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+from scripts.generate_sim_env import FreeCellIndex, valid_action_masks
+
+logging.basicConfig(level=logging.INFO)
+
+POOL_CACHE_SIZE = 8  # Anzahl zwischengespeicherter Pools (Curriculum-Stufen)
+_pool_cache = OrderedDict()
+
+
+def reachable(occupancy: np.ndarray, source, target=None) -> np.ndarray:
+    """
+    Flood Fill: bool-Array wie occupancy ((N,) W, H), True = von source aus
+    erreichbare freie Zelle. Mit target endet die Suche, sobald target in
+    allen Layouts erreicht oder nicht mehr erreichbar ist.
+    """
+    free = occupancy == 0
+    reach = np.zeros_like(free)
+    reach[..., source[0], source[1]] = free[..., source[0], source[1]]
+    while True:
+        grown = reach.copy()
+        grown[..., 1:, :] |= reach[..., :-1, :]
+        grown[..., :-1, :] |= reach[..., 1:, :]
+        grown[..., :, 1:] |= reach[..., :, :-1]
+        grown[..., :, :-1] |= reach[..., :, 1:]
+        grown &= free
+        active = (grown != reach).any(axis=(-2, -1))
+        if target is not None:
+            active &= ~grown[..., target[0], target[1]]
+        reach = grown
+        if not active.any():
+            return reach
+
+
+def generate_layouts(grid_size, num_obstacles: int, count: int, start_pos=(0, 0),
+                     obstacles=None, rng: np.random.Generator | None = None,
+                     max_rounds: int = 50) -> np.ndarray:
+    """
+    count lösbare Belegungsgrids (count, W, H) als uint8 (1 = Hindernis) mit
+    festen obstacles plus genau num_obstacles zufälligen Hindernissen.
+    Pro Runde wird ein ganzer Stapel Kandidaten gezogen und geprüft.
+    """
+    rng = rng or np.random.default_rng()
+    w, h = grid_size
+    goal_pos = (w - 1, h - 1)
+    fixed = np.zeros((w, h), dtype=np.uint8)
+    for x, y in obstacles or []:
+        if 0 <= x < w and 0 <= y < h:
+            fixed[x, y] = 1
+    blocked = fixed.astype(bool)
+    blocked[start_pos] = True
+    blocked[goal_pos] = True
+    k = min(int(num_obstacles), int((~blocked).sum()))
+
+    layouts, found = [], 0
+    for _ in range(max_rounds):
+        # Stapelgröße: doppelter Restbedarf, mindestens 32
+        n = max(2 * (count - found), 32)
+        candidates = np.repeat(fixed[None], n, axis=0)
+        if k > 0:
+            # Zufällige Rangfolge der freien Zellen, die k kleinsten werden Hindernisse
+            scores = rng.random((n, w * h))
+            scores[:, blocked.ravel()] = np.inf
+            cells = np.argpartition(scores, k - 1, axis=1)[:, :k]
+            np.put_along_axis(candidates.reshape(n, -1), cells, 1, axis=1)
+        solvable = reachable(candidates, goal_pos, target=start_pos)[:, start_pos[0], start_pos[1]]
+        layouts.append(candidates[solvable])
+        found += int(solvable.sum())
+        if found >= count:
+            return np.concatenate(layouts)[:count]
+    raise ValueError(
+        f"Keine {count} lösbaren Layouts mit {num_obstacles} Hindernissen auf {grid_size} gefunden"
+    )
+
+
+class LayoutPool:
+    """
+    Feste Menge lösbarer Layouts einer Curriculum-Stufe.
+    occupancy, action_masks und goal_reachable liegen als (size, W, H)-Arrays vor;
+    die Python-Strukturen für SimEnv werden je Layout einmalig erzeugt.
+    """
+
+    def __init__(self, grid_size, num_obstacles: int, size: int = 128,
+                 start_pos=(0, 0), obstacles=None, seed: int | None = None):
+        """
+        size: Anzahl Layouts im Pool
+        seed: Zufallsstartwert; ohne seed aus dem random-Modul abgeleitet,
+              damit random.seed() auch die Layouts reproduzierbar macht
+        """
+        self.grid_size = tuple(grid_size)
+        self.start_pos = tuple(start_pos)
+        self.goal_pos = (self.grid_size[0] - 1, self.grid_size[1] - 1)
+        self.num_obstacles = int(num_obstacles)
+        rng = np.random.default_rng(random.getrandbits(32) if seed is None else seed)
+
+        self.occupancy = generate_layouts(self.grid_size, num_obstacles, size,
+                                          self.start_pos, obstacles, rng)
+        self.action_masks = valid_action_masks(self.occupancy)
+        # Vom Ziel aus erreichbare Zellen, z.B. für zufällige Startpositionen
+        self.goal_reachable = reachable(self.occupancy, self.goal_pos)
+        for array in (self.occupancy, self.action_masks, self.goal_reachable):
+            array.setflags(write=False)
+        self._layouts = [None] * len(self.occupancy)
+
+    def __len__(self):
+        return len(self.occupancy)
+
+    def __getstate__(self):
+        # Für Worker-Prozesse nur die Arrays übertragen, die Python-Strukturen entstehen dort neu
+        state = self.__dict__.copy()
+        state["_layouts"] = [None] * len(self.occupancy)
+        return state
+
+    def layout(self, i: int):
+        """
+        (obstacles, occupancy, action_masks, Masken als verschachtelte Liste,
+        FreeCellIndex) von Layout i. Startzellen sind nur vom Ziel aus erreichbare Zellen.
+        """
+        layout = self._layouts[i]
+        if layout is None:
+            xs, ys = np.nonzero(self.occupancy[i])
+            starts = self.goal_reachable[i].copy()
+            starts[self.goal_pos] = False
+            layout = (frozenset(zip(xs.tolist(), ys.tolist())), self.occupancy[i],
+                      self.action_masks[i], self.action_masks[i].tolist(),
+                      FreeCellIndex(starts, self.occupancy[i], self.goal_pos))
+            self._layouts[i] = layout
+        return layout
+
+    def sample(self):
+        """Zufälliges Layout (über das random-Modul wie SimEnv)"""
+        return self.layout(random.randrange(len(self)))
+
+    def sample_indices(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        """n zufällige Layout-Indizes, z.B. für BatchSimEnv"""
+        return rng.integers(0, len(self), n)
+
+
+def layout_pool(grid_size, num_obstacles: int, start_pos=(0, 0), obstacles=None,
+                size: int = 128) -> LayoutPool:
+    """LayoutPool einer Curriculum-Stufe, die letzten POOL_CACHE_SIZE Pools werden wiederverwendet"""
+    key = (tuple(grid_size), int(num_obstacles), tuple(start_pos),
+           tuple(sorted(obstacles or [])), int(size))
+    pool = _pool_cache.get(key)
+    if pool is None:
+        pool = LayoutPool(grid_size, num_obstacles, size, start_pos, obstacles)
+        _pool_cache[key] = pool
+        if len(_pool_cache) > POOL_CACHE_SIZE:
+            _pool_cache.popitem(last=False)
+    else:
+        _pool_cache.move_to_end(key)
+    return pool
+
+
+# ==================== Vergleich ====================
+if __name__ == "__main__":
+    import time
+
+    from scripts.generate_sim_env import SimEnv
+    from scripts.sim_solver import distance_field
+
+    logging.disable(logging.INFO)
+    random.seed(0)
+    grid_size = (40, 40)
+    num_obstacles = grid_size[0] * grid_size[1] // 4
+
+    def measure(env, resets=500):
+        elapsed, counts, solvable = 0.0, [], 0
+        for _ in range(resets):
+            start = time.perf_counter()
+            env.reset()
+            elapsed += time.perf_counter() - start
+            counts.append(len(env.obstacles))
+            solvable += distance_field(env)[env.start_pos] >= 0
+        return elapsed / resets, np.mean(counts), solvable / resets
+
+    start = time.perf_counter()
+    pool = layout_pool(grid_size, num_obstacles)
+    build = time.perf_counter() - start
+    for name, env in [
+        ("Rejection Sampling", SimEnv(grid_size, random_obstacles=True, num_random_obstacles=num_obstacles)),
+        ("LayoutPool", SimEnv(grid_size, random_obstacles=True, num_random_obstacles=num_obstacles,
+                              layout_pool=pool)),
+    ]:
+        per_reset, mean_count, solvable = measure(env)
+        print(f"{name:20s} Hindernisse: {mean_count:6.1f} / {num_obstacles} | lösbar: {solvable:6.1%} | "
+              f"reset: {1e6 * per_reset:7.1f} us")
+    print(f"Pool mit {len(pool)} Layouts erzeugt in {1000 * build:.1f} ms")
@@ -11,6 +11,10 @@ from motors.motor_controller import forward, backward, stop, left, right
 from sensors.ultrasonic_sensor import get_distance
 from config import USE_HARDWARE
 from memory.log import log_event
+from scripts.latency import timed
+
+# Latenzmessung (ausgeschaltet: die Originalfunktionen)
+read_distance = timed("read_distance", get_distance)
 
 def llm_controller(query: str):
     """
@@ -18,7 +22,7 @@ def llm_controller(query: str):
     """
     # ====== Sensorwert einlesen ======
     if USE_HARDWARE:
-        distance = get_distance()
+        distance = read_distance()
     else:
         # Dummy-Wert im Simulationsmodus
         distance = 50
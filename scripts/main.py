@@ -6,17 +6,28 @@ Hauptskript für autonome Roboterplattform
 - Autor: Shivang Soni
 """
 
-import pickle
+import os
+import json
+import asyncio
 import logging
-from time import sleep, time
 from env import RobotEnv
-from q_learning_agent import QLearningAgent
+from scripts.dyna import DynaQAgent
+from scripts.q_learning_agent import QLearningAgent
 from memory.conversation import add_message
 from memory.log import log_event
 
 from ml_models.rag_transformer import interactive_loop
 from scripts.train_sim_env import execute
-from scripts.config import USE_HARDWARE, MAX_RUNNING_TIME
+from scripts.checkpoint import QTableCheckpointer
+from scripts.control_loop import ControlRuntime
+from scripts.latency import timed, report as report_latency
+from scripts.policy import FrozenPolicy, Discretizer
+from scripts.config import (
+    USE_HARDWARE, MAX_RUNNING_TIME, POLICY_FILE, EXPLORATION, CONTROL_RATE_HZ, CHECKPOINT_INTERVAL_S,
+    DYNA_REPLAY_UPDATES, DYNA_PLANNING_STEPS,
+    STATE_ENCODING, MAX_DISTANCE_CM, DISTANCE_BINS, ROBOT_Q_TABLE_FILES,
+    Q_TABLE_MAX_STATES, Q_TABLE_EVICTION, Q_TABLE_SAVE_MIN_VISITS
+)
 import paho.mqtt.client as mqtt
 
 logging.basicConfig(level=logging.INFO)
@@ -31,14 +42,33 @@ mqtt_client.connect("localhost", 1883)  # Broker-Adresse
 mqtt_client.subscribe("esp32/status")
 mqtt_client.loop_start()
 
+@timed("mqtt_publish")
 def send_command_to_motor(command: str):
     mqtt_client.publish("esp32/motors", command)
     logging.info(f"[MQTT] COMMAND gesendet: {command}")
 
+def send_motor_ack(command_id: int, action: int, status: str):
+    """Rückmeldung eines abgeschlossenen Motorbefehls (done, superseded oder aborted)"""
+    mqtt_client.publish("esp32/motors/ack", json.dumps({"id": command_id, "action": action, "status": status}))
+
 if __name__ == "__main__":
     # ================= Q-LEARNING AGENT =================
     actions = [0, 1, 2, 3]  # 0=stop, 1=forward, 2=left, 3=right
-    agent = QLearningAgent(actions=actions, alpha=0.1, gamma=0.9, epsilon=0.2)
+    if STATE_ENCODING == "tiles":
+        # Kontinuierlicher Abstand über Tile Coding (fester Speicher, kein Dyna-Modell)
+        agent = QLearningAgent(actions=actions, alpha=0.1, gamma=0.9, epsilon=0.2, backend="tiles")
+    else:
+        agent = DynaQAgent(
+            actions=actions, alpha=0.1, gamma=0.9, epsilon=0.2,
+            replay_updates=DYNA_REPLAY_UPDATES, planning_steps=DYNA_PLANNING_STEPS
+        )
+    if STATE_ENCODING == "bins":
+        # Rohe Float-Abstände -> feste Anzahl Bins, die Q-Tabelle bleibt begrenzt
+        agent.state_encoder = Discretizer.uniform(0.0, MAX_DISTANCE_CM, DISTANCE_BINS)
+    if Q_TABLE_MAX_STATES and STATE_ENCODING != "tiles":
+        # Lange Läufe: Speicher und Checkpoints bleiben begrenzt, kalte Zustände werden verdrängt
+        agent.bound_q_table(Q_TABLE_MAX_STATES, policy=Q_TABLE_EVICTION,
+                            save_min_visits=Q_TABLE_SAVE_MIN_VISITS)
 
     # ================= HARDWARE-FUNKTIONEN =================
     if USE_HARDWARE:
@@ -50,68 +80,35 @@ if __name__ == "__main__":
         left = lambda: send_command_to_motor("left")
         stop = lambda: send_command_to_motor("stop")
         commands = [forward, backward, left, right, stop]
-        save_loc = "q_table.pkl"
+        save_loc = ROBOT_Q_TABLE_FILES[STATE_ENCODING]
         num_episodes = 50
-        try:
-            with open(save_loc, "rb") as f:
-                agent.q_table = pickle.load(f)
-                logging.info("Q-Tabelle geladen")
-        except FileNotFoundError:
-            logging.warning("Keine Q-Tabelle gefunden, starte neu")
+        agent.load_q_table(save_loc)
+        # Schreibt im Hintergrund, der Loop zieht nur einen Snapshot
+        checkpointer = QTableCheckpointer(save_loc, history=3)
+        # Ohne Exploration: feste greedy Policy, ein Lookup pro Entscheidung
+        # (wie autonomous_drive.drive: ohne POLICY_FILE aus der geladenen Q-Tabelle)
+        policy = None
+        if EXPLORATION.lower() != "true":
+            if os.path.exists(POLICY_FILE):
+                policy = FrozenPolicy.load(POLICY_FILE, encoder=agent.state_encoder,
+                                            encoding=STATE_ENCODING, kind="scalar")
+            else:
+                policy = agent.freeze()
+            logging.info("[INFO] Inferenz-Modus: feste greedy Policy, kein Lernen")
 
         # ================= HAUPT-LOOP =================
+        # Fester Takt: Sensing, Entscheiden, Aktuieren und Speichern laufen als
+        # eigene Coroutinen, langsame Stufen verschieben den Takt nicht
+        runtime = None
         try:
-            start_time = time()  # hier time
-            last_save_time = start_time
-            episode = 0
-            env = RobotEnv()
+            runtime = ControlRuntime(
+                RobotEnv(on_command_complete=send_motor_ack), agent, lambda action: commands[action](),
+                policy=policy,
+                rate_hz=CONTROL_RATE_HZ, checkpointer=checkpointer, save_interval=CHECKPOINT_INTERVAL_S,
+                max_running_time=int(MAX_RUNNING_TIME) * 60
+            )
             interactive_loop(True)
-            done = False
-            total_reward = 0
-            while not done:
-                state = env.reset()
-                # Handlung auswählen
-                action = agent.choose_action(state)
-                # Handlung ausführen -> Zustand und Belohnung erhalten
-                commands[action]()
-                next_state, reward, done = env.step(action)
-                agent.learn(state, action, reward, next_state)
-                # Zustand aktualisieren
-                state = next_state
-                total_reward += reward
-                episode += 1
-                if (episode % 100 == 0):
-                    env.render()
-
-                elapsed_time = time()-start_time
-                # Wenn die Laufzeit die festgelegte Grenze überschreitet
-                if (elapsed_time >= int(MAX_RUNNING_TIME)*60):
-                    logging.info(
-                        "[INFO] Maximale Grenze eines Laufs erreicht"
-                        "...wird beendet"
-                        )
-                    done = True
-                    break
-                # Alle 5 Sekunden die Q Tabelle speichern und reward loggen
-                if (time() - last_save_time >= 10):
-                    # Protokolliere und speichere Nachricht
-                    message = (
-                        f"[INFO] Time elapsed: {elapsed_time}"
-                        f" | Total_reward: {total_reward}"
-                        f" | Episode: {episode}"
-                        )
-                    logging.info(message)
-                    log_event(message)
-                    with open(save_loc, "wb") as f:
-                        try:
-                            pickle.dump(agent.q_table, f)
-                        except Exception as e:
-                            logging.warning(
-                                f"[WARN] Q-Tabelle konnte"
-                                f" nicht gespeichert werden: {e}"
-                                )
-                    
-                    last_save_time = time()
+            asyncio.run(runtime.run())
 
         except KeyboardInterrupt:
             logging.info(
@@ -121,7 +118,16 @@ if __name__ == "__main__":
         except Exception as e:
             logging.error(f"[ERROR] Fehler im Hauptloop: {e}", exc_info=True)
         finally:
+            if runtime is not None:
+                logging.info(f"[INFO] Control-Loop: {runtime.stats.summary()}")
+                log_event(f"[INFO] Control-Loop: {runtime.stats.summary()}")
+                runtime.env.close()
+            report_latency()
             commands[-1]()
             mqtt_client.loop_stop()
+            if policy is None:
+                # Im Inferenz-Modus bleibt die Q-Tabelle unverändert
+                checkpointer.save(agent.q_table)
+            checkpointer.close()
     else:
         execute()
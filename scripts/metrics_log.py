@@ -0,0 +1,158 @@
+"""
+metrics_log.py
+- Append-only Metrik-Log für lange Trainingsläufe (Reward, Schritte, Epsilon, Erfolg je Episode)
+- Spaltenformat: ein Verzeichnis mit einer Binärdatei je Metrik, neue Episoden
+  werden nur angehängt, nie umgeschrieben
+- Lesen per np.memmap ohne Kopie, gleitender Durchschnitt über kumulative
+  Summen und Downsampling für Millionen Episoden (siehe plot.py)
+Autor: Shivang Soni
+
+Verzeichnisaufbau:
+    schema.json   {"version": 1, "columns": {Name: dtype}}
+    <Name>.bin    Werte der Spalte hintereinander (little endian, ohne Header)
+"""
+from __future__ import annotations
+
+import json
+import os
+import logging
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+
+VERSION = 1
+METRIC_COLUMNS = {
+    "reward": "<f4",
+    "steps": "<u4",
+    "epsilon": "<f4",
+    "success": "u1",
+}
+_SCHEMA_FILE = "schema.json"
+
+
+def _column_path(path: str, name: str) -> str:
+    return os.path.join(path, f"{name}.bin")
+
+
+class MetricsLog:
+    """
+    Schreibt Episoden-Metriken gepuffert in die Spaltendateien unter path.
+    Ein bestehendes Log wird fortgesetzt (gleiche Spalten vorausgesetzt).
+    Als Kontextmanager verwendbar, close() schreibt den Puffer.
+    """
+
+    def __init__(self, path: str, columns: dict | None = None, buffer_size: int = 4096):
+        """
+        columns: Spaltenname -> NumPy-dtype (Standard: METRIC_COLUMNS)
+        buffer_size: Episoden im Speicher, bevor in die Dateien geschrieben wird
+        """
+        self.path = path
+        self.columns = dict(columns or METRIC_COLUMNS)
+        self.buffer_size = int(buffer_size)
+        os.makedirs(path, exist_ok=True)
+
+        schema_path = os.path.join(path, _SCHEMA_FILE)
+        if os.path.exists(schema_path):
+            with open(schema_path) as f:
+                schema = json.load(f)
+            if schema.get("version") != VERSION or schema.get("columns") != self.columns:
+                raise ValueError(f"Metrik-Log {path} hat ein anderes Schema: {schema}")
+        else:
+            with open(schema_path, "w") as f:
+                json.dump({"version": VERSION, "columns": self.columns}, f)
+
+        # Nach einem Abbruch mitten im Schreiben alle Spalten auf die gemeinsame Länge kürzen
+        self._written = _common_length(path, self.columns)
+        self._files = {}
+        for name, dtype in self.columns.items():
+            f = open(_column_path(path, name), "ab")
+            f.truncate(self._written * np.dtype(dtype).itemsize)
+            self._files[name] = f
+        self._buffer = {name: [] for name in self.columns}
+
+    def __len__(self):
+        return self._written + len(next(iter(self._buffer.values())))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, **values):
+        """Eine Episode, z.B. append(reward=1.0, steps=12, epsilon=0.1, success=True)"""
+        for name, column in self._buffer.items():
+            column.append(values[name])
+        if len(column) >= self.buffer_size:
+            self.flush()
+
+    def extend(self, **values):
+        """Mehrere Episoden als gleich lange Arrays je Spalte (z.B. aus train_batched)"""
+        for name, column in self._buffer.items():
+            column.extend(np.asarray(values[name]).tolist())
+        if len(column) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        n = len(next(iter(self._buffer.values())))
+        if n == 0:
+            return
+        for name, dtype in self.columns.items():
+            np.asarray(self._buffer[name], dtype=dtype).tofile(self._files[name])
+            self._buffer[name].clear()
+            self._files[name].flush()
+        self._written += n
+
+    def close(self):
+        if self._files:
+            self.flush()
+            for f in self._files.values():
+                f.close()
+            self._files = {}
+
+
+def _common_length(path: str, columns: dict) -> int:
+    lengths = []
+    for name, dtype in columns.items():
+        column_path = _column_path(path, name)
+        size = os.path.getsize(column_path) if os.path.exists(column_path) else 0
+        lengths.append(size // np.dtype(dtype).itemsize)
+    return min(lengths, default=0)
+
+
+def read_metrics(path: str) -> dict:
+    """Alle Spalten als schreibgeschützte np.memmap (bzw. leere Arrays), gleich lang"""
+    with open(os.path.join(path, _SCHEMA_FILE)) as f:
+        columns = json.load(f)["columns"]
+    n = _common_length(path, columns)
+    if n == 0:
+        return {name: np.zeros(0, dtype=dtype) for name, dtype in columns.items()}
+    return {
+        name: np.memmap(_column_path(path, name), dtype=dtype, mode="r", shape=(n,))
+        for name, dtype in columns.items()
+    }
+
+
+def moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """Gleitender Durchschnitt der letzten window Werte (am Anfang über alle bisherigen), O(n)"""
+    cumsum = np.cumsum(values, dtype=np.float64)
+    result = cumsum.copy()
+    result[window:] -= cumsum[:-window]
+    return result / np.minimum(np.arange(1, len(values) + 1), window)
+
+
+def downsample(values: np.ndarray, max_points: int):
+    """
+    Mittelt Blöcke gleicher Größe, sodass höchstens max_points Punkte bleiben.
+    Rückgabe: (x, y) mit x = erste Episode jedes Blocks
+    """
+    n = len(values)
+    step = max(1, -(-n // max_points))
+    if step == 1:
+        return np.arange(n), np.asarray(values, dtype=np.float64)
+    full = n // step * step
+    y = np.asarray(values[:full], dtype=np.float64).reshape(-1, step).mean(axis=1)
+    if full < n:
+        y = np.append(y, np.mean(values[full:], dtype=np.float64))
+    return np.arange(0, n, step), y
@@ -1,40 +1,63 @@
 """
 plot.py
 - Rewards aus Q-Learning Training visualisieren
+- Liest das Metrik-Log aus dem Training per mmap (metrics_log.py), alte
+  rewards.pkl Listen werden weiterhin unterstützt
+- Gleitender Durchschnitt in O(n), lange Läufe werden vor dem Plotten verdichtet
 - MLOps-tauglich: einfache Integration in Training/CI
 Autor: Shivang Soni
 """
 
-import matplotlib.pyplot as plt
+import os
 import pickle
 
-def plot_rewards(file_path: str = "rewards.pkl", window_size: int = 50):
+import matplotlib.pyplot as plt
+import numpy as np
+
+from scripts.config import METRICS_LOG_DIR
+from scripts.metrics_log import read_metrics, moving_average, downsample
+
+
+def plot_rewards(file_path: str = METRICS_LOG_DIR, window_size: int = 50, max_points: int = 10000):
     """
-    Plottet die kumulativen Rewards und deren gleitenden Durchschnitt
-    file_path: Pfad zur Pickle-Datei mit Reward-Liste
+    Plottet die Rewards je Episode und deren gleitenden Durchschnitt
+    file_path: Verzeichnis des Metrik-Logs oder Pickle-Datei mit Reward-Liste
     window_size: Anzahl der letzten Episoden für gleitenden Durchschnitt
+    max_points: höchstens so viele Punkte je Kurve (Blockmittel bei längeren Läufen)
     """
     # Rewards laden
-    with open(file_path, "rb") as f:
-        rewards = pickle.load(f)
-
-    # Gleitender Durchschnitt berechnen
-    average_reward = []
-    for i in range(len(rewards)):
-        start = max(0, i - window_size + 1)
-        avg = sum(rewards[start:i+1]) / (i - start + 1)
-        average_reward.append(avg)
-
-    # Plot erstellen
-    plt.figure(figsize=(10, 5))
-    plt.plot(rewards, label="Cumulative Rewards", alpha=0.7)
-    plt.plot(average_reward, label=f"Average Reward (last {window_size})", linewidth=2)
-    plt.xlabel("Episode")
-    plt.ylabel("Reward")
-    plt.title("Q-Learning Training Performance")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
+    if os.path.isdir(file_path):
+        metrics = read_metrics(file_path)
+    else:
+        with open(file_path, "rb") as f:
+            metrics = {"reward": np.asarray(pickle.load(f), dtype=np.float64)}
+    rewards = metrics["reward"]
+
+    # Gleitender Durchschnitt über kumulative Summen
+    average_reward = moving_average(rewards, window_size)
+
+    # Plot erstellen, zweites Diagramm mit Erfolgsquote und Epsilon, falls geloggt
+    with_success = "success" in metrics
+    fig, axes = plt.subplots(2 if with_success else 1, 1, figsize=(10, 8 if with_success else 5),
+                             sharex=True, squeeze=False)
+    ax = axes[0, 0]
+    ax.plot(*downsample(rewards, max_points), label="Cumulative Rewards", alpha=0.7)
+    ax.plot(*downsample(average_reward, max_points), label=f"Average Reward (last {window_size})", linewidth=2)
+    ax.set_ylabel("Reward")
+    ax.set_title("Q-Learning Training Performance")
+    ax.legend()
+    ax.grid(True)
+
+    if with_success:
+        ax = axes[1, 0]
+        ax.plot(*downsample(moving_average(metrics["success"], window_size), max_points),
+                label=f"Success Rate (last {window_size})")
+        ax.plot(*downsample(metrics["epsilon"], max_points), label="Epsilon")
+        ax.set_ylabel("Rate")
+        ax.legend()
+        ax.grid(True)
+    axes[-1, 0].set_xlabel("Episode")
+    fig.tight_layout()
     plt.show()
 
 # ==================== Testlauf ====================
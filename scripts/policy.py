@@ -0,0 +1,223 @@
+"""
+policy.py
+- Friert eine trainierte Q-Tabelle zu einer festen greedy Policy ein (state -> Aktion)
+- Inferenz ohne Exploration: ein Index-Lookup statt get_q je Aktion,
+  JSON-Serialisierung und random.choice
+- Discretizer bildet rohe Sensorwerte (Abstand in cm) auf Policy-Indizes ab
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+
+import numpy as np
+
+from scripts.q_table import ArrayQTable, serialise_state
+
+logging.basicConfig(level=logging.INFO)
+
+
+class Discretizer:
+    """Teilt einen kontinuierlichen Wert anhand sortierter Grenzen in Bins ein"""
+
+    def __init__(self, edges):
+        self.edges = [float(e) for e in edges]
+
+    @classmethod
+    def uniform(cls, low: float, high: float, n_bins: int) -> "Discretizer":
+        """n_bins gleich breite Bins zwischen low und high (Randbins nehmen den Rest auf)"""
+        return cls(np.linspace(low, high, n_bins + 1)[1:-1])
+
+    @property
+    def n_bins(self) -> int:
+        return len(self.edges) + 1
+
+    def __call__(self, value) -> int:
+        return bisect.bisect_right(self.edges, value)
+
+
+class FrozenPolicy:
+    """
+    Greedy Policy als Lookup-Tabelle. Pro Zustand wird die Rangfolge der
+    Aktionen (nach Q absteigend, Gleichstand -> kleinerer Index) gespeichert,
+    damit auch mit eingeschränkten gültigen Aktionen nur nachgeschlagen wird.
+
+    kind:
+        "scalar" - Zustände sind Zahlen (RobotEnv), Index über den Discretizer
+        "grid"   - Zustände sind (x, y)-Zellen (SimEnv), Index über ranking[x][y]
+        "key"    - alles andere, Index über den JSON-Schlüssel
+    """
+
+    def __init__(self, actions, kind: str, ranking, discretizer: Discretizer | None = None, keys=None,
+                 encoder=None, encoding: str | None = None):
+        self.actions = list(actions)
+        self.kind = kind
+        self.encoding = encoding  # Zustandskodierung der Q-Tabelle (z.B. STATE_ENCODING, "grid")
+        self.discretizer = discretizer
+        self.keys = keys
+        self.encoder = encoder  # Gleicher State-Encoder wie beim Training (wird nicht gespeichert)
+        self._ranking = np.asarray(ranking)
+        self._default = list(range(len(self.actions)))
+
+        # Nachschlagen über verschachtelte Python-Listen ist für Einzelzugriffe schneller als NumPy
+        ranking_list = self._ranking.tolist()
+        if kind == "key":
+            self._lookup = dict(zip(keys, ranking_list))
+        else:
+            self._lookup = ranking_list
+
+    def _action_order(self, state):
+        if self.encoder is not None:
+            state = self.encoder(state)
+        if self.kind == "scalar":
+            return self._lookup[self.discretizer(state)]
+        if self.kind == "grid":
+            x, y = state
+            if 0 <= x < len(self._lookup) and 0 <= y < len(self._lookup[0]):
+                return self._lookup[x][y]
+            return self._default
+        return self._lookup.get(serialise_state(state), self._default)
+
+    def act(self, state, valid_actions=None):
+        """Beste Aktion für state, optional nur unter valid_actions"""
+        order = self._action_order(state)
+        if not valid_actions:
+            return self.actions[order[0]]
+        for i in order:
+            if self.actions[i] in valid_actions:
+                return self.actions[i]
+        return valid_actions[0]
+
+    # ---------------------- Speichern / Laden ----------------------
+    def save(self, filepath: str):
+        """Speichert die Policy als .npz"""
+        meta = {"actions": self.actions, "kind": self.kind}
+        if self.encoding is not None:
+            meta["encoding"] = self.encoding
+        if self.discretizer is not None:
+            meta["edges"] = self.discretizer.edges
+        arrays = {"ranking": self._ranking, "meta": np.array(json.dumps(meta))}
+        if self.keys is not None:
+            arrays["keys"] = np.array(self.keys)
+        np.savez(filepath, **arrays)
+        logging.info(f"[INFO] Policy gespeichert in: {filepath}")
+
+    @classmethod
+    def load(cls, filepath: str, encoder=None, encoding: str | None = None,
+             kind: str | None = None) -> "FrozenPolicy":
+        """
+        encoding, kind: erwartete Kodierung bzw. Art der Policy; passt die Datei
+        nicht dazu (z.B. grid-Policy für den Roboter), folgt ein ValueError.
+        Ältere Dateien ohne gespeicherte Kodierung werden nur über kind geprüft.
+        """
+        with np.load(filepath, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if kind is not None and meta["kind"] != kind:
+                raise ValueError(f"Policy {filepath} ist vom Typ {meta['kind']}, erwartet: {kind}")
+            if encoding is not None and meta.get("encoding", encoding) != encoding:
+                raise ValueError(f"Policy {filepath} wurde mit Kodierung {meta['encoding']} "
+                                 f"kompiliert, erwartet: {encoding}")
+            keys = data["keys"].tolist() if "keys" in data else None
+            discretizer = Discretizer(meta["edges"]) if "edges" in meta else None
+            return cls(meta["actions"], meta["kind"], data["ranking"], discretizer, keys, encoder,
+                       meta.get("encoding"))
+
+
+def _rank(q: np.ndarray) -> np.ndarray:
+    """Aktionsindizes je Zeile nach Q absteigend, stabil bei Gleichstand"""
+    return np.argsort(-q, axis=-1, kind="stable").astype(np.int8)
+
+
+def compile_policy(q_table, actions, discretizer: Discretizer | None = None, encoder=None,
+                   encoding: str | None = None) -> FrozenPolicy:
+    """
+    Kompiliert eine Q-Tabelle (ArrayQTable, DictQTable oder dict) zur FrozenPolicy.
+    Zahlen-Zustände: ohne discretizer wird jeder bekannte Wert ein eigenes Bin
+    (Lookup liefert den nächstgelegenen bekannten Zustand); mit discretizer wird
+    Q pro Bin gemittelt, leere Bins übernehmen das nächste belegte Bin.
+    encoder: State-Encoder, mit dem die Tabelle trainiert wurde (Schlüssel sind dann Merkmale)
+    encoding: Name der Zustandskodierung, wird mit der Policy gespeichert (siehe FrozenPolicy.load)
+    """
+    if not isinstance(q_table, ArrayQTable):
+        q_table = ArrayQTable.from_dict(q_table if isinstance(q_table, dict) else q_table.to_dict(), actions)
+    keys, values, _ = q_table.export_arrays()
+    values = values[:, :len(actions)]
+    states = [json.loads(k) if _is_json(k) else k for k in keys]
+
+    if states and all(isinstance(s, (int, float)) and not isinstance(s, bool) for s in states):
+        points = np.array(states, dtype=np.float64)
+        order = np.argsort(points)
+        points, values = points[order], values[order]
+        if discretizer is None:
+            # Grenzen in der Mitte zwischen benachbarten bekannten Zuständen
+            discretizer = Discretizer((points[1:] + points[:-1]) / 2)
+            return FrozenPolicy(actions, "scalar", _rank(values), discretizer, encoder=encoder, encoding=encoding)
+
+        bins = np.array([discretizer(p) for p in points])
+        sums = np.zeros((discretizer.n_bins, values.shape[1]))
+        np.add.at(sums, bins, values)
+        filled = np.bincount(bins, minlength=discretizer.n_bins) > 0
+        # Leere Bins: Q des nächstgelegenen belegten Bins übernehmen
+        occupied = np.flatnonzero(filled)
+        nearest = occupied[np.abs(np.arange(discretizer.n_bins)[:, None] - occupied).argmin(axis=1)]
+        counts = np.bincount(bins, minlength=discretizer.n_bins)[nearest][:, None]
+        return FrozenPolicy(actions, "scalar", _rank(sums[nearest] / counts), discretizer, encoder=encoder,
+                            encoding=encoding)
+
+    if states and all(_is_cell(s) for s in states):
+        cells = np.array(states, dtype=np.int64)
+        w, h = cells.max(axis=0) + 1
+        grid_q = np.zeros((w, h, values.shape[1]))
+        grid_q[cells[:, 0], cells[:, 1]] = values
+        return FrozenPolicy(actions, "grid", _rank(grid_q), encoder=encoder, encoding=encoding)
+
+    return FrozenPolicy(actions, "key", _rank(values), keys=list(keys), encoder=encoder, encoding=encoding)
+
+
+def _is_json(key: str) -> bool:
+    try:
+        json.loads(key)
+        return True
+    except ValueError:
+        return False
+
+
+def _is_cell(state) -> bool:
+    return (isinstance(state, list) and len(state) == 2
+            and all(isinstance(v, int) and v >= 0 for v in state))
+
+
+# ==================== Export ====================
+if __name__ == "__main__":
+    import argparse
+
+    from scripts.q_learning_agent import QLearningAgent
+    from scripts.config import (
+        Q_TABLE_FILE, POLICY_FILE, STATE_ENCODING, MAX_DISTANCE_CM, DISTANCE_BINS, ROBOT_Q_TABLE_FILES
+    )
+
+    parser = argparse.ArgumentParser(description="Q-Tabelle zu einer festen greedy Policy kompilieren")
+    parser.add_argument("q_table", nargs="?", default=None,
+                        help="Standard: Roboter-Tabelle der Kodierung (ROBOT_Q_TABLE_FILES), bei grid Q_TABLE_FILE")
+    parser.add_argument("policy", nargs="?", default=POLICY_FILE)
+    parser.add_argument("--encoding", choices=sorted(ROBOT_Q_TABLE_FILES) + ["grid"], default=STATE_ENCODING,
+                        help="Zustandskodierung der Tabelle (grid = SimEnv-Tabelle mit (x, y)-Zuständen)")
+    parser.add_argument("--bins", type=int, default=0, help="Anzahl Abstands-Bins (0 = je bekannter Zustand)")
+    parser.add_argument("--max-distance", type=float, default=MAX_DISTANCE_CM, help="Obere Bin-Grenze in cm")
+    args = parser.parse_args()
+    if args.bins and args.encoding == "bins":
+        parser.error("Die Tabelle ist bereits in Abstands-Bins kodiert, --bins ist nicht möglich")
+    if args.bins and args.encoding == "grid":
+        parser.error("--bins gilt nur für Abstands-Tabellen")
+
+    # Agent wie beim Training (autonomous_drive/main.py), damit Schlüssel und Encoder passen
+    agent = QLearningAgent([0, 1, 2, 3], backend="tiles" if args.encoding == "tiles" else "array")
+    if args.encoding == "bins":
+        agent.state_encoder = Discretizer.uniform(0.0, MAX_DISTANCE_CM, DISTANCE_BINS)
+    q_table = args.q_table or (Q_TABLE_FILE if args.encoding == "grid" else ROBOT_Q_TABLE_FILES[args.encoding])
+    agent.load_q_table(q_table, read_only=True)
+    discretizer = Discretizer.uniform(0.0, args.max_distance, args.bins) if args.bins else None
+    compile_policy(agent.q_table, agent.actions, discretizer, encoder=agent.state_encoder,
+                   encoding=args.encoding).save(args.policy)
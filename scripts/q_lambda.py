@@ -0,0 +1,145 @@
+"""
+q_lambda.py
+- Watkins Q(lambda) mit Eligibility Traces
+- Traces liegen dünn besetzt in festen NumPy-Arrays (max_traces Slots),
+  zu kleine Traces werden entfernt, bei vollem Speicher fliegt die kleinste
+- Nach einer explorativen (nicht-greedy) Aktion werden alle Traces gelöscht
+- Seltene Terminal-Rewards (SimEnv +10, RobotEnv -10) wirken so in einem
+  Update auf den ganzen bisherigen Pfad zurück
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import random
+import logging
+
+import numpy as np
+
+from scripts.q_learning_agent import QLearningAgent
+
+logging.basicConfig(level=logging.INFO)
+
+
+class QLambdaAgent(QLearningAgent):
+    def __init__(self, actions, alpha=0.1, gamma=0.9, epsilon=0.2,
+                 trace_lambda=0.9, max_traces=256, min_trace=1e-3):
+        """
+        trace_lambda: Abklingfaktor der Traces (0 = normales Q-Learning)
+        max_traces: maximale Anzahl gleichzeitig gespeicherter Traces
+        min_trace: Traces unterhalb dieses Werts werden entfernt
+        """
+        super().__init__(actions, alpha=alpha, gamma=gamma, epsilon=epsilon, backend="array")
+        self.trace_lambda = trace_lambda
+        self.max_traces = int(max_traces)
+        self.min_trace = min_trace
+
+        self._trace_rows = np.zeros(self.max_traces, dtype=np.int64)
+        self._trace_cols = np.zeros(self.max_traces, dtype=np.int64)
+        self._trace_values = np.zeros(self.max_traces)  # 0 = freier Slot
+        self._slots = {}  # (row, col) -> Slot
+        self._last_choice = None      # (state, action, explorativ)
+        self._last_next_state = None
+        self._trace_evictions = 0     # Stand von q_table.evictions beim Setzen der Traces
+
+    # ---------------------- Traces ----------------------
+    def start_episode(self):
+        self.clear_traces()
+
+    def clear_traces(self):
+        self._trace_values[:] = 0.0
+        self._slots.clear()
+        self._last_next_state = None
+
+    def _set_trace(self, row, col):
+        """Replacing Trace: e(s, a) = 1"""
+        slot = self._slots.get((row, col))
+        if slot is None:
+            if len(self._slots) < self.max_traces:
+                slot = int(np.argmin(self._trace_values > 0))  # erster freier Slot
+            else:
+                slot = int(np.argmin(self._trace_values))      # kleinste Trace verdrängen
+                del self._slots[(int(self._trace_rows[slot]), int(self._trace_cols[slot]))]
+            self._slots[(row, col)] = slot
+            self._trace_rows[slot] = row
+            self._trace_cols[slot] = col
+        self._trace_values[slot] = 1.0
+
+    def _decay_traces(self):
+        active = self._trace_values > 0
+        self._trace_values *= self.gamma * self.trace_lambda
+        dead = np.flatnonzero(active & (self._trace_values < self.min_trace))
+        for slot in dead:
+            del self._slots[(int(self._trace_rows[slot]), int(self._trace_cols[slot]))]
+        self._trace_values[dead] = 0.0
+
+    # ---------------------- Agent ----------------------
+    def choose_action(self, state, valid_actions=None):
+        """Wie QLearningAgent.choose_action, merkt sich zusätzlich, ob exploriert wurde"""
+        if valid_actions is None or len(valid_actions) == 0:
+            valid_actions = self.actions
+
+        q_values = self._q_table.q_values(state, valid_actions)
+        max_q = max(q_values)
+        best_actions = [a for a, q in zip(valid_actions, q_values) if q == max_q]
+
+        if random.random() < self.epsilon:
+            action = random.choice(valid_actions)
+        else:
+            action = random.choice(best_actions)
+        self._last_choice = (state, action, action not in best_actions)
+        return action
+
+    def _was_exploratory(self, state, action) -> bool:
+        if self._last_choice is not None and self._last_choice[:2] == (state, action):
+            return self._last_choice[2]
+        q_values = self._q_table.q_values(state, self.actions)
+        return self._q_table.get_q(state, action) < max(q_values)
+
+    def learn(self, state, action, reward, next_state, valid_next_actions=None):
+        """Watkins Q(lambda) Update über alle aktiven Traces"""
+        # Neue Kette (Episodenwechsel, Sprung im Zustand) oder Exploration -> Traces löschen
+        if self._last_next_state is None or state != self._last_next_state \
+                or self._was_exploratory(state, action):
+            self.clear_traces()
+
+        table = self._batch_table()
+        old_q = table.get_q(state, action)
+        if valid_next_actions is None or len(valid_next_actions) == 0:
+            valid_next_actions = self.actions
+        next_max_q = max(table.q_values(next_state, valid_next_actions))
+        delta = reward + self.gamma * next_max_q - old_q
+
+        row = table.row_of(state, create=True)
+        col = table.column_of(action)
+        if table.evictions != self._trace_evictions:
+            # BoundedQTable hat Zeilen verschoben, gespeicherte Trace-Zeilen sind ungültig
+            self.clear_traces()
+            self._trace_evictions = table.evictions
+        self._set_trace(row, col)
+
+        active = self._trace_values > 0
+        rows, cols = self._trace_rows[active], self._trace_cols[active]
+        table.values[rows, cols] += self.alpha * delta * self._trace_values[active]
+        table.counts[row, col] += 1
+
+        self._decay_traces()
+        self._last_next_state = next_state
+
+
+# ==================== Vergleich ====================
+if __name__ == "__main__":
+    from scripts.train_sim_env import episodes_to_convergence
+
+    logging.disable(logging.INFO)
+    # Grid mit zwei versetzten Wänden, damit der Weg zum Ziel lang ist
+    walls = [(6, y) for y in range(16)] + [(13, y) for y in range(4, 20)]
+    for name, make_agent in [
+        ("Q-Learning", lambda: QLearningAgent([0, 1, 2, 3])),
+        ("Q(lambda=0.9)", lambda: QLambdaAgent([0, 1, 2, 3], trace_lambda=0.9)),
+    ]:
+        results = []
+        for seed in range(5):
+            random.seed(seed)
+            results.append(episodes_to_convergence(make_agent(), (20, 20), obstacles=walls))
+        episodes, steps = np.mean(results, axis=0)
+        print(f"{name:15s} Episoden bis Konvergenz: {episodes:7.1f} | Env-Schritte: {steps:9.0f}")
@@ -6,40 +6,116 @@ Autor: Shivang Soni
 """
 from __future__ import annotations
 
-import json
 import os
 import pickle
 import random
 import logging
 
+import numpy as np
+
+from scripts.q_table import ArrayQTable, BoundedQTable, DictQTable, serialise_state
+from scripts.q_table_io import is_binary_path, load_binary, save_binary
+from scripts.policy import FrozenPolicy, compile_policy
+from scripts.tile_coding import TileCodingQTable
+
 logging.basicConfig(level=logging.INFO)
 
 
+BACKENDS = {
+    "array": ArrayQTable,  # NumPy-Array, Zustandsindex wird einmalig berechnet
+    "dict": DictQTable,    # ursprüngliches dict mit JSON-Schlüsseln
+    "tiles": TileCodingQTable,  # lineare Approximation für kontinuierliche Abstände, fester Speicher
+}
+
+
 class QLearningAgent:
-    def __init__(self, actions, alpha=0.1, gamma=0.9, epsilon=0.2):
+    # Epsilon Decay je Episode (decay_epsilon), als Klassenattribute auch für die Unterklassen
+    epsilon_decay = 0.995
+    min_epsilon = 0.05
+
+    def __init__(self, actions, alpha=0.1, gamma=0.9, epsilon=0.2, backend="array", state_encoder=None,
+                 epsilon_decay=None, min_epsilon=None):
         """
         actions: Liste der möglichen Aktionen
         alpha: Lernrate
         gamma: Discount-Faktor
         epsilon: Explorationsrate (epsilon-greedy)
+        epsilon_decay, min_epsilon: Faktor je Episode und Untergrenze für epsilon (Standard: Klassenwerte)
+        backend: Speicher der Q-Tabelle ("array", "dict" oder "tiles")
+        state_encoder: optional, bildet Zustände vor dem Nachschlagen auf Merkmale ab
         """
-        self.q_table = {}  # Q-Tabelle: state -> action -> Q-Wert
+        if backend not in BACKENDS:
+            raise ValueError(f"Unbekanntes Q-Table-Backend: {backend}")
         self.actions = actions
+        self.backend = backend
+        self._state_encoder = state_encoder
+        self._bounds = None  # Parameter der BoundedQTable, siehe bound_q_table
+        self.q_table = {}  # Q-Tabelle: state -> action -> Q-Wert
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
+        if epsilon_decay is not None:
+            self.epsilon_decay = epsilon_decay
+        if min_epsilon is not None:
+            self.min_epsilon = min_epsilon
+        self.np_rng = np.random.default_rng()  # Zufall für die Batch-Methoden
+
+    @property
+    def q_table(self):
+        return self._q_table
+
+    @q_table.setter
+    def q_table(self, table):
+        """Akzeptiert auch klassische dict-Tabellen (z.B. direkt aus pickle.load)"""
+        table_cls = BACKENDS[self.backend]
+        if isinstance(table, ArrayQTable) and table.actions[:len(self.actions)] != list(self.actions):
+            # Spalten müssen in der Reihenfolge von self.actions liegen (Batch-Methoden)
+            table = table.to_dict()
+        if not isinstance(table, table_cls):
+            if not isinstance(table, dict):
+                table = table.to_dict()
+            table = table_cls.from_dict(table, self.actions)
+        if self._bounds is not None and not isinstance(table, BoundedQTable):
+            table = BoundedQTable.from_table(table, **self._bounds)
+        table.encoder = self._state_encoder
+        self._q_table = table
+
+    def bound_q_table(self, max_states: int, policy: str = "lru",
+                      evict_fraction: float = 0.1, save_min_visits: int = 0):
+        """
+        Begrenzt die Q-Tabelle auf max_states Zustände (BoundedQTable), auch
+        für später geladene Tabellen. Nur mit backend="array".
+        """
+        if self.backend != "array":
+            raise ValueError("bound_q_table benötigt backend='array'")
+        self._bounds = dict(max_states=max_states, policy=policy,
+                            evict_fraction=evict_fraction, save_min_visits=save_min_visits)
+        self.q_table = BoundedQTable.from_table(self._q_table, **self._bounds)
+
+    @property
+    def state_encoder(self):
+        return self._state_encoder
+
+    @state_encoder.setter
+    def state_encoder(self, encoder):
+        """Encoder wechseln, z.B. bei einem neuen Environment (gilt für alle Tabellenzugriffe)"""
+        self._state_encoder = encoder
+        self._q_table.encoder = encoder
 
     def _serialise_state(self, state) -> str:
         """Wandelt jeden Zustand in eine hashbare, JSON-kompatible Zeichenkette um"""
-        try:
-            return json.dumps(state, sort_keys=True)
-        except TypeError:
-            return str(state)
+        return serialise_state(state)
 
     def get_q(self, state, action):
         """Q-Wert für einen Zustand und eine Aktion abrufen"""
-        key = self._serialise_state(state)
-        return self.q_table.get(key, {}).get(action, 0.0)
+        return self._q_table.get_q(state, action)
+
+    def start_episode(self):
+        """Hook am Episodenanfang (z.B. Eligibility Traces zurücksetzen)"""
+
+    def decay_epsilon(self, episodes: int = 1):
+        """Epsilon Decay für stabileres Lernen, einmal je (abgeschlossener) Episode"""
+        self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay ** episodes)
 
     def choose_action(self, state, valid_actions=None):
         """Wählt eine Aktion basierend auf epsilon-greedy nur aus gültigen Aktionen"""
@@ -49,36 +125,120 @@ class QLearningAgent:
         if random.random() < self.epsilon:
             return random.choice(valid_actions)
 
-        q_values = [self.get_q(state, a) for a in valid_actions]
+        q_values = self._q_table.q_values(state, valid_actions)
         max_q = max(q_values)
         best_actions = [a for a, q in zip(valid_actions, q_values) if q == max_q]
         return random.choice(best_actions)
 
     def learn(self, state, action, reward, next_state, valid_next_actions=None):
         """Q-Learning Update"""
-        state_key = self._serialise_state(state)
-        next_state_key = self._serialise_state(next_state)
-
-        old_q = self.get_q(state, action)
+        old_q = self._q_table.get_q(state, action)
         if valid_next_actions is None or len(valid_next_actions) == 0:
             valid_next_actions = self.actions
 
-        next_max_q = max([self.get_q(next_state, a) for a in valid_next_actions])
+        next_max_q = max(self._q_table.q_values(next_state, valid_next_actions))
         new_q = old_q + self.alpha * (reward + self.gamma * next_max_q - old_q)
+        self._q_table.set_q(state, action, new_q)
+
+    def freeze(self, discretizer=None) -> FrozenPolicy:
+        """Kompiliert die aktuelle Q-Tabelle zu einer festen greedy Policy (ohne Exploration)"""
+        return compile_policy(self._q_table, self.actions, discretizer, encoder=self._state_encoder)
 
-        if state_key not in self.q_table:
-            self.q_table[state_key] = {}
-        self.q_table[state_key][action] = new_q
+    # ==================== Batch-Methoden (BatchSimEnv) ====================
+    def _batch_table(self) -> ArrayQTable:
+        if not isinstance(self._q_table, ArrayQTable):
+            raise ValueError("Batch-Methoden benötigen backend='array'")
+        return self._q_table
+
+    def _batch_q(self, rows) -> np.ndarray:
+        """Q-Werte (N, n_actions) der Zeilen, unbekannte Zustände (-1) liefern 0"""
+        table = self._batch_table()
+        q = table.values[rows, :len(self.actions)]
+        q[rows < 0] = 0.0
+        return q
+
+    def choose_actions(self, states, valid_mask=None) -> np.ndarray:
+        """
+        Epsilon-greedy für einen Batch von Zuständen.
+        states: (N, ...) Zustände, valid_mask: bool (N, n_actions), Spalten in Reihenfolge von self.actions
+        Rückgabe: Aktionsindizes (N,) in self.actions
+        """
+        rows = self._batch_table().rows_of(states)
+        q = self._batch_q(rows)
+        n = len(rows)
+        if valid_mask is None:
+            valid_mask = np.ones(q.shape, dtype=bool)
+        # Keine gültige Aktion -> alle Aktionen erlauben (wie choose_action)
+        valid_mask = valid_mask | ~valid_mask.any(axis=1, keepdims=True)
+
+        q = np.where(valid_mask, q, -np.inf)
+        best = q == q.max(axis=1, keepdims=True)
+        explore = self.np_rng.random(n) < self.epsilon
+        candidates = np.where(explore[:, None], valid_mask, best)
+        # Gleichverteilte Wahl unter den Kandidaten
+        scores = self.np_rng.random(q.shape) * candidates
+        return scores.argmax(axis=1)
+
+    def learn_batch(self, states, actions, rewards, next_states, next_valid_mask=None):
+        """
+        Q-Learning Update für einen Batch von Übergängen.
+        Treffen mehrere Übergänge dieselbe (state, action)-Zelle, gewinnt der letzte.
+        """
+        table = self._batch_table()
+        rows = table.rows_of(states, create=True)
+        next_rows = table.rows_of(next_states)
+        self.update_rows(rows, np.asarray(actions), rewards, next_rows, next_valid_mask)
+
+    def update_rows(self, rows, columns, rewards, next_rows, next_valid_mask=None):
+        """
+        Q-Learning Update direkt auf Zeilen-/Spaltenindizes der ArrayQTable
+        (next_rows = -1: unbekannter Folgezustand mit Q = 0).
+        """
+        table = self._batch_table()
+        next_q = self._batch_q(next_rows)
+        if next_valid_mask is not None:
+            next_valid_mask = next_valid_mask | ~next_valid_mask.any(axis=1, keepdims=True)
+            next_q = np.where(next_valid_mask, next_q, -np.inf)
+        next_max_q = next_q.max(axis=1)
+
+        old_q = table.values[rows, columns]
+        table.values[rows, columns] = old_q + self.alpha * (
+            np.asarray(rewards) + self.gamma * next_max_q - old_q
+        )
+        np.add.at(table.counts, (rows, columns), 1)
 
     def save_q_table(self, filepath: str):
-        """Speichert die Q-Tabelle in einer Datei"""
+        """Speichert die Q-Tabelle in einer Datei (.qtb = Binärformat, sonst Pickle)"""
+        table = self._q_table
+        if is_binary_path(filepath):
+            if not isinstance(table, ArrayQTable):
+                table = ArrayQTable.from_dict(table.to_dict(), self.actions)
+            # BoundedQTable: kalte Zustände nur in der Datei weglassen (export_arrays)
+            save_binary(table, filepath)
+            logging.info(f"[INFO] Q-Tabelle gespeichert in directory: {filepath}")
+            return
+
+        if isinstance(table, BoundedQTable):
+            keys, values, _ = table.export_arrays()
+            q_table = {key: dict(zip(table.actions, row)) for key, row in zip(keys, values.tolist())}
+        else:
+            q_table = table.to_dict()
         with open(filepath, 'wb') as f:
-            pickle.dump(self.q_table, f)
+            pickle.dump(q_table, f)
             logging.info(f"[INFO] Q-Tabelle gespeichert in directory: {filepath}")
 
-    def load_q_table(self, filepath: str):
-        """Lädt die Q-Tabelle aus einer Datei"""
-        if os.path.exists(filepath):
+    def load_q_table(self, filepath: str, read_only: bool = False):
+        """
+        Lädt die Q-Tabelle aus einer Datei (.qtb = Binärformat, sonst Pickle).
+        read_only=True: .qtb wird ohne Kopie gemappt, nur für Inferenz (kein learn)
+        """
+        legacy_path = os.path.splitext(filepath)[0] + ".pkl"
+        if is_binary_path(filepath) and os.path.exists(filepath):
+            self.q_table = load_binary(filepath, read_only=read_only)
+            logging.info(f"[INFO] Q-Tabelle geladen aus directory: {filepath}")
+        elif os.path.exists(filepath) or (is_binary_path(filepath) and os.path.exists(legacy_path)):
+            # Alte Pickle-Datei, wird beim nächsten Speichern als .qtb geschrieben
+            filepath = filepath if os.path.exists(filepath) else legacy_path
             with open(filepath, 'rb') as f:
                 self.q_table = pickle.load(f)
                 logging.info(f"[INFO] Q-Tabelle geladen aus directory: {filepath}")
@@ -95,4 +255,4 @@ if __name__ == "__main__":
     action = agent.choose_action(state)
     logging.info(f"[INFO]Gewählte Aktion für state {state}: {action}")
     agent.learn(state, action, reward=5, next_state=next_state)
-    logging.info(f"[INFO]Q-Tabelle nach Update: {agent.q_table}")
+    logging.info(f"[INFO]Q-Tabelle nach Update: {agent.q_table.to_dict()}")
@@ -0,0 +1,411 @@
+"""
+q_table.py
+- Speicher-Backends für die Q-Tabelle des QLearningAgent
+- DictQTable: klassisches dict state_key -> {action: Q-Wert} (JSON-Schlüssel)
+- ArrayQTable: Zustände werden einmalig auf Zeilenindizes abgebildet,
+  Q-Werte liegen in einem dichten NumPy-Array (n_states, n_actions)
+- BoundedQTable: ArrayQTable mit fester Obergrenze, verdrängt kalte Zustände
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import json
+
+import numpy as np
+
+
+def serialise_state(state) -> str:
+    """Wandelt jeden Zustand in eine hashbare, JSON-kompatible Zeichenkette um"""
+    try:
+        return json.dumps(state, sort_keys=True)
+    except TypeError:
+        return str(state)
+
+
+class DictQTable(dict):
+    """
+    Ursprüngliches Format: state_key (JSON-String) -> {action: Q-Wert}.
+    Jeder Zugriff serialisiert den Zustand erneut.
+    """
+    encoder = None  # Optional: Zustand -> kompakter Merkmalsschlüssel (state_encoders.py)
+
+    def _key(self, state) -> str:
+        if self.encoder is not None:
+            state = self.encoder(state)
+        return serialise_state(state)
+
+    def get_q(self, state, action) -> float:
+        return self.get(self._key(state), {}).get(action, 0.0)
+
+    def q_values(self, state, actions) -> list:
+        row = self.get(self._key(state), {})
+        return [row.get(a, 0.0) for a in actions]
+
+    def set_q(self, state, action, value: float):
+        key = self._key(state)
+        if key not in self:
+            self[key] = {}
+        self[key][action] = value
+
+    def to_dict(self) -> dict:
+        return {key: dict(row) for key, row in self.items()}
+
+    @classmethod
+    def from_dict(cls, q_table: dict, actions=None) -> "DictQTable":
+        return cls({key: dict(row) for key, row in q_table.items()})
+
+    def __reduce__(self):
+        # Als einfaches dict pickeln, damit alte Lader kompatibel bleiben
+        return (dict, (self.to_dict(),))
+
+
+class ArrayQTable:
+    """
+    Dichte Q-Tabelle: state_key -> Zeilenindex, Q-Werte in self.values.
+    Rohzustände (z.B. (x, y)-Tuples) werden nach dem ersten Zugriff direkt
+    auf ihre Zeile abgebildet, json.dumps läuft also nur einmal pro Zustand.
+    """
+
+    def __init__(self, actions, capacity: int = 1024):
+        self.actions = list(actions)
+        self._columns = {a: i for i, a in enumerate(self.actions)}
+        self.values = np.zeros((max(1, capacity), len(self.actions)), dtype=np.float64)
+        self.counts = np.zeros(self.values.shape, dtype=np.int64)  # Updates je (state, action)
+        self.keys = []          # Zeilenindex -> state_key
+        self._index = {}        # state_key -> Zeilenindex
+        self._state_rows = {}   # (Typ, Rohzustand) -> Zeilenindex (nur hashbare Zustände)
+        self.encoder = None     # Optional: Zustand -> kompakter Merkmalsschlüssel (state_encoders.py)
+        self.evictions = 0      # Zählt Umsortierungen der Zeilen (BoundedQTable), gespeicherte Indizes veralten
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    # ---------------------- Indizes ----------------------
+    def row_of(self, state, create: bool = False):
+        """Zeilenindex eines Zustands, None falls unbekannt und create=False"""
+        if self.encoder is not None:
+            state = self.encoder(state)
+        # Mit Typ: 1, 1.0 und True sind als dict-Schlüssel gleich, haben aber verschiedene JSON-Schlüssel
+        cache_key = (type(state), state)
+        try:
+            return self._state_rows[cache_key]
+        except KeyError:
+            pass
+        except TypeError:
+            # Nicht hashbarer Zustand (z.B. Liste) -> immer über den JSON-Schlüssel
+            return self._row_of_key(serialise_state(state), create)
+
+        row = self._row_of_key(serialise_state(state), create)
+        if row is not None:
+            self._state_rows[cache_key] = row
+        return row
+
+    def rows_of(self, states, create: bool = False) -> np.ndarray:
+        """Zeilenindizes für einen Batch von Zuständen (z.B. (N, 2)-Array), -1 = unbekannt"""
+        if isinstance(states, np.ndarray):
+            states = map(tuple, states.tolist()) if states.ndim > 1 else states.tolist()
+        rows = [self.row_of(s, create) for s in states]
+        return np.array([-1 if r is None else r for r in rows], dtype=np.int64)
+
+    def _row_of_key(self, key: str, create: bool):
+        row = self._index.get(key)
+        if row is None and create:
+            row = len(self.keys)
+            if row >= self.values.shape[0]:
+                self._grow_rows(max(1024, 2 * self.values.shape[0]))
+            self.keys.append(key)
+            self._index[key] = row
+        return row
+
+    def column_of(self, action) -> int:
+        """Spaltenindex einer Aktion (unbekannte Aktionen bekommen eine neue Spalte)"""
+        return self._column(action)
+
+    def _column(self, action) -> int:
+        col = self._columns.get(action)
+        if col is None:
+            # Unbekannte Aktion: Spalte anhängen (dict-Backend erlaubt das auch)
+            col = len(self.actions)
+            self.actions.append(action)
+            self._columns[action] = col
+            self.values = np.hstack(
+                [self.values, np.zeros((self.values.shape[0], 1), dtype=np.float64)]
+            )
+            self.counts = np.hstack(
+                [self.counts, np.zeros((self.counts.shape[0], 1), dtype=self.counts.dtype)]
+            )
+        return col
+
+    def _grow_rows(self, capacity: int):
+        # Immer float64, auch wenn values aus einer float32-Datei übernommen wurde
+        grown = np.zeros((capacity, self.values.shape[1]), dtype=np.float64)
+        grown[:self.values.shape[0]] = self.values
+        self.values = grown
+        grown = np.zeros((capacity, self.counts.shape[1]), dtype=self.counts.dtype)
+        grown[:self.counts.shape[0]] = self.counts
+        self.counts = grown
+
+    # ---------------------- Q-Werte ----------------------
+    def get_q(self, state, action) -> float:
+        row = self.row_of(state)
+        col = self._columns.get(action)
+        if row is None or col is None:
+            return 0.0
+        return float(self.values[row, col])
+
+    def q_values(self, state, actions) -> list:
+        row = self.row_of(state)
+        if row is None:
+            return [0.0] * len(actions)
+        values = self.values[row].tolist()
+        columns = self._columns
+        return [values[columns[a]] if a in columns else 0.0 for a in actions]
+
+    def set_q(self, state, action, value: float):
+        row = self.row_of(state, create=True)
+        col = self._column(action)
+        self.values[row, col] = value
+        self.counts[row, col] += 1
+
+    # ---------------------- Konvertierung ----------------------
+    def to_dict(self) -> dict:
+        """Exportiert in das klassische Format state_key -> {action: Q-Wert}"""
+        n = len(self.keys)
+        rows = self.values[:n].tolist()
+        return {
+            key: dict(zip(self.actions, row))
+            for key, row in zip(self.keys, rows)
+        }
+
+    def export_arrays(self):
+        """(keys, values, counts) der belegten Zeilen, z.B. für Worker-Prozesse"""
+        n = len(self.keys)
+        return list(self.keys), self.values[:n].copy(), self.counts[:n].copy()
+
+    @classmethod
+    def from_arrays(cls, actions, keys, values, counts=None, copy: bool = True) -> "ArrayQTable":
+        """
+        Gegenstück zu export_arrays.
+        copy=False übernimmt values direkt (z.B. ein mmap-Array) und ist für reines
+        Nachschlagen gedacht; erst wenn die Tabelle wachsen muss, wird in ein neues
+        float64-Array umkopiert.
+        """
+        if not copy:
+            table = cls(actions, capacity=1)
+            table.keys = list(keys)
+            table._index = dict(zip(table.keys, range(len(table.keys))))
+            table.values = values
+            table.counts = np.zeros(values.shape, dtype=np.int64) if counts is None else counts
+            return table
+
+        table = cls(actions, capacity=max(1024, len(keys)))
+        for key in keys:
+            table._row_of_key(key, create=True)
+        table.values[:len(keys), :values.shape[1]] = values
+        if counts is not None:
+            table.counts[:len(keys), :counts.shape[1]] = counts
+        return table
+
+    def merge(self, parts):
+        """
+        Führt Teil-Tabellen (keys, values, counts) in diese Tabelle zusammen.
+        Regel: je (state, action) gewichteter Mittelwert der Teil-Q-Werte,
+        Gewicht = Anzahl Updates im jeweiligen Teil. Zellen ohne Updates
+        in allen Teilen behalten ihren Wert, die Counts werden aufsummiert.
+        """
+        for keys, _, _ in parts:
+            for key in keys:
+                self._row_of_key(key, create=True)
+        n = len(self.keys)
+        weights = np.zeros((n, self.values.shape[1]), dtype=np.int64)
+        weighted_q = np.zeros((n, self.values.shape[1]))
+        for keys, values, counts in parts:
+            rows = np.fromiter((self._index[k] for k in keys), dtype=np.int64, count=len(keys))
+            cols = values.shape[1]
+            weights[rows, :cols] += counts
+            weighted_q[rows, :cols] += counts * values
+
+        visited = weights > 0
+        self.values[:n][visited] = weighted_q[visited] / weights[visited]
+        self.counts[:n] += weights
+
+    @classmethod
+    def from_dict(cls, q_table: dict, actions) -> "ArrayQTable":
+        """Baut eine ArrayQTable aus einer klassischen dict-Q-Tabelle"""
+        table = cls(actions, capacity=max(1024, len(q_table)))
+        for key, row in q_table.items():
+            idx = table._row_of_key(key, create=True)
+            for action, value in row.items():
+                col = table._column(action)  # kann self.values vergrößern, daher zuerst
+                table.values[idx, col] = value
+        return table
+
+    def __reduce__(self):
+        # Als einfaches dict pickeln, damit alte Lader kompatibel bleiben
+        return (dict, (self.to_dict(),))
+
+
+class BoundedQTable(ArrayQTable):
+    """
+    ArrayQTable mit höchstens max_states Zuständen für lange Hardware-Läufe.
+    Pro Zustand werden Zugriffe (visits) und der letzte Zugriff (last_access,
+    logischer Zähler über alle Zugriffe) mitgeführt. Ist die Tabelle voll,
+    werden evict_fraction * max_states kalte Zustände auf einmal entfernt und
+    die übrigen Zeilen nach vorne geschoben; danach erhöht sich self.evictions.
+
+    policy:
+        "lru"   - am längsten nicht benutzte Zustände
+        "value" - aus der länger nicht benutzten Hälfte die mit kleinstem max |Q|
+    """
+
+    def __init__(self, actions, max_states: int, policy: str = "lru",
+                 evict_fraction: float = 0.1, save_min_visits: int = 0):
+        """
+        max_states: Obergrenze der Zustände (Zeilen)
+        policy: Verdrängungsstrategie ("lru" oder "value")
+        evict_fraction: Anteil von max_states, der pro Verdrängung frei wird
+        save_min_visits: compact() entfernt Zustände mit weniger Zugriffen
+        """
+        if policy not in ("lru", "value"):
+            raise ValueError(f"Unbekannte Verdrängungsstrategie: {policy}")
+        self.max_states = int(max_states)
+        self.policy = policy
+        self.evict_batch = max(1, int(evict_fraction * self.max_states))
+        self.save_min_visits = int(save_min_visits)
+        self._tick = 0
+        capacity = min(1024, self.max_states)
+        self.visits = np.zeros(capacity, dtype=np.int64)
+        self.last_access = np.zeros(capacity, dtype=np.int64)
+        super().__init__(actions, capacity=capacity)
+
+    # ---------------------- Indizes ----------------------
+    def row_of(self, state, create: bool = False):
+        row = super().row_of(state, create)
+        if row is not None:
+            self._tick += 1
+            self.visits[row] += 1
+            self.last_access[row] = self._tick
+        return row
+
+    def rows_of(self, states, create: bool = False) -> np.ndarray:
+        if create:
+            # Platz vorab schaffen, damit keine Verdrängung mitten im Batch Zeilen verschiebt
+            if isinstance(states, np.ndarray):
+                states = list(map(tuple, states.tolist())) if states.ndim > 1 else states.tolist()
+            else:
+                states = list(states)
+            if len(states) > self.max_states:
+                raise ValueError("Batch größer als max_states der BoundedQTable")
+            overflow = len(self.keys) + len(states) - self.max_states
+            if overflow > 0:
+                self.evict(max(overflow, self.evict_batch))
+        return super().rows_of(states, create)
+
+    def _row_of_key(self, key: str, create: bool):
+        if create and len(self.keys) >= self.max_states and key not in self._index:
+            self.evict(self.evict_batch)
+        return super()._row_of_key(key, create)
+
+    def _grow_rows(self, capacity: int):
+        capacity = min(capacity, self.max_states)
+        super()._grow_rows(capacity)
+        for name in ("visits", "last_access"):
+            grown = np.zeros(capacity, dtype=np.int64)
+            old = getattr(self, name)
+            grown[:old.shape[0]] = old
+            setattr(self, name, grown)
+
+    # ---------------------- Verdrängung ----------------------
+    def evict(self, n: int) -> int:
+        """Entfernt die n kältesten Zustände, gibt die Anzahl entfernter Zustände zurück"""
+        live = len(self.keys)
+        n = min(int(n), live)
+        if n <= 0:
+            return 0
+        last_access = self.last_access[:live]
+        if self.policy == "lru":
+            victims = np.argpartition(last_access, n - 1)[:n]
+        else:
+            older = np.argsort(last_access, kind="stable")[:max(n, live // 2)]
+            value = np.abs(self.values[older]).max(axis=1)
+            victims = older[np.argpartition(value, n - 1)[:n]]
+        keep = np.ones(live, dtype=bool)
+        keep[victims] = False
+        self._keep_rows(np.flatnonzero(keep))
+        return n
+
+    def compact(self, min_visits: int | None = None) -> int:
+        """
+        Für das Speichern: entfernt Zustände mit weniger als min_visits Zugriffen
+        (Standard: save_min_visits) und gibt ungenutzte Array-Kapazität frei.
+        Gibt die Anzahl entfernter Zustände zurück.
+        """
+        min_visits = self.save_min_visits if min_visits is None else min_visits
+        live = len(self.keys)
+        keep = np.flatnonzero(self.visits[:live] >= min_visits)
+        if len(keep) < live:
+            self._keep_rows(keep)
+        if self.values.shape[0] > 2 * max(live, 1024):
+            n = max(len(self.keys), 1)
+            self.values, self.counts = self.values[:n].copy(), self.counts[:n].copy()
+            self.visits, self.last_access = self.visits[:n].copy(), self.last_access[:n].copy()
+        return live - len(keep)
+
+    def export_arrays(self, min_visits: int | None = None):
+        """
+        (keys, values, counts) als Kopie, ohne Zustände mit weniger als min_visits
+        Zugriffen (Standard: save_min_visits). Die Tabelle selbst bleibt unverändert.
+        """
+        min_visits = self.save_min_visits if min_visits is None else min_visits
+        live = len(self.keys)
+        if min_visits <= 0:
+            return super().export_arrays()
+        keep = np.flatnonzero(self.visits[:live] >= min_visits)
+        return [self.keys[r] for r in keep.tolist()], self.values[keep], self.counts[keep]
+
+    def _keep_rows(self, rows: np.ndarray):
+        """Behält nur die Zeilen rows (aufsteigend), rückt sie nach vorne und baut die Indizes neu"""
+        live, n = len(self.keys), len(rows)
+        for name in ("values", "counts", "visits", "last_access"):
+            array = getattr(self, name)
+            array[:n] = array[rows]
+            array[n:live] = 0
+        remap = np.full(live, -1, dtype=np.int64)
+        remap[rows] = np.arange(n)
+        self.keys = [self.keys[r] for r in rows.tolist()]
+        self._index = dict(zip(self.keys, range(n)))
+        self._state_rows = {
+            state: int(remap[row]) for state, row in self._state_rows.items() if remap[row] >= 0
+        }
+        self.evictions += 1
+
+    # ---------------------- Konvertierung ----------------------
+    @classmethod
+    def from_table(cls, table: ArrayQTable, max_states: int, **kwargs) -> "BoundedQTable":
+        """
+        Übernimmt eine ArrayQTable. Passt sie nicht hinein, bleiben die Zustände
+        mit den meisten Updates erhalten. Die Zugriffe starten mit der Anzahl
+        Updates je Zustand, mindestens aber save_min_visits: übernommene Zustände
+        waren schon gespeichert und fallen beim nächsten Speichern nicht heraus
+        (auch nicht aus Dateien ohne Update-Zähler).
+        """
+        bounded = cls(table.actions, max_states, **kwargs)
+        keys, values, counts = ArrayQTable.export_arrays(table)
+        rows = np.arange(len(keys))
+        if len(keys) > bounded.max_states:
+            rows = np.sort(np.argsort(-counts.sum(axis=1), kind="stable")[:bounded.max_states])
+        if len(rows) > bounded.values.shape[0]:
+            bounded._grow_rows(len(rows))
+        for row in rows.tolist():
+            ArrayQTable._row_of_key(bounded, keys[row], create=True)
+        bounded.values[:len(rows), :values.shape[1]] = values[rows]
+        bounded.counts[:len(rows), :counts.shape[1]] = counts[rows]
+        bounded.visits[:len(rows)] = np.maximum(counts[rows].sum(axis=1), bounded.save_min_visits)
+        return bounded
+
+    @classmethod
+    def from_dict(cls, q_table: dict, actions, max_states: int = 100000, **kwargs) -> "BoundedQTable":
+        return cls.from_table(ArrayQTable.from_dict(q_table, actions), max_states, **kwargs)
@@ -0,0 +1,161 @@
+"""
+q_table_io.py
+- Kompaktes Binärformat (.qtb) für Q-Tabellen
+- Laden per mmap: zum Nachschlagen (read_only) werden die Q-Werte ohne Kopie
+  direkt aus der Datei gelesen, zum Lernen in eine float64-Tabelle kopiert
+- Konverter für bestehende q_table.pkl Dateien
+Autor: Shivang Soni
+
+Dateiaufbau (Version 1, little endian):
+    0   magic        b"QTAB"
+    4   version      uint16
+    6   reserviert   uint16
+    8   header_len   uint32
+    12  header       JSON (n_states, n_actions, actions, Offsets, dtype)
+    ..  keys         state_keys UTF-8, durch "\\n" getrennt
+    ..  values       float32-Matrix (n_states, n_actions), 64-Byte ausgerichtet
+    ..  counts       optional uint32-Matrix (n_states, n_actions) der Updates je
+                     Zelle, 64-Byte ausgerichtet (Header: counts_offset); ältere
+                     Dateien ohne counts werden mit Zählern 0 geladen
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import pickle
+import struct
+import logging
+
+import numpy as np
+
+from scripts.q_table import ArrayQTable
+
+logging.basicConfig(level=logging.INFO)
+
+MAGIC = b"QTAB"
+VERSION = 1
+BINARY_SUFFIX = ".qtb"
+_PREAMBLE = struct.Struct("<4sHHI")
+_ALIGN = 64
+
+
+def is_binary_path(filepath: str) -> bool:
+    """True, wenn der Pfad auf das Binärformat zeigt"""
+    return str(filepath).endswith(BINARY_SUFFIX)
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def save_binary(table: ArrayQTable, filepath: str):
+    """
+    Schreibt eine ArrayQTable im Binärformat.
+    Geschrieben wird in eine temporäre Datei, die danach atomar umbenannt wird.
+    """
+    keys, values, counts = table.export_arrays()
+    write_binary(filepath, table.actions, keys, values, counts)
+
+
+def write_binary(filepath: str, actions, keys, values, counts=None):
+    """Schreibt state_keys, Wertematrix (n_states, n_actions) und optional Update-Zähler im Binärformat"""
+    if any("\n" in key for key in keys):
+        raise ValueError("state_keys mit Zeilenumbruch können nicht gespeichert werden")
+    keys_blob = "\n".join(keys).encode("utf-8")
+    values = np.ascontiguousarray(values, dtype="<f4")
+    if counts is not None:
+        counts = np.ascontiguousarray(np.clip(counts, 0, np.iinfo(np.uint32).max), dtype="<u4")
+
+    # Header-Länge hängt von den Offsets ab -> Offsets mit fester Breite reservieren
+    header = {
+        "n_states": len(keys),
+        "n_actions": values.shape[1],
+        "actions": list(actions),
+        "dtype": "<f4",
+        "keys_offset": 0,
+        "keys_length": len(keys_blob),
+        "values_offset": 0,
+    }
+    if counts is not None:
+        header.update(counts_dtype="<u4", counts_offset=0)
+    header_len = len(json.dumps(header)) + 40
+    header["keys_offset"] = _PREAMBLE.size + header_len
+    header["values_offset"] = _align(header["keys_offset"] + len(keys_blob))
+    if counts is not None:
+        header["counts_offset"] = _align(header["values_offset"] + values.nbytes)
+    header_bytes = json.dumps(header).encode("utf-8").ljust(header_len)
+
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, 0, header_len))
+        f.write(header_bytes)
+        f.write(keys_blob)
+        f.write(b"\0" * (header["values_offset"] - f.tell()))
+        f.write(values.tobytes())
+        if counts is not None:
+            f.write(b"\0" * (header["counts_offset"] - f.tell()))
+            f.write(counts.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, filepath)
+
+
+def load_binary(filepath: str, use_mmap: bool = True, read_only: bool = False) -> ArrayQTable:
+    """
+    Lädt eine Q-Tabelle im Binärformat.
+    read_only=False: Werte werden in eine float64-Tabelle kopiert (zum Weiterlernen).
+    read_only=True: nur Nachschlagen (Bewertung, FrozenPolicy); mit use_mmap=True
+    bleiben die float32-Werte ohne Kopie gemappt und sind schreibgeschützt.
+    """
+    with open(filepath, "rb") as f:
+        magic, version, _, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"Keine Q-Tabellen-Datei: {filepath}")
+        if version != VERSION:
+            raise ValueError(f"Nicht unterstützte Q-Tabellen-Version {version}: {filepath}")
+        header = json.loads(f.read(header_len))
+
+        n_states, n_actions = header["n_states"], header["n_actions"]
+        if use_mmap and n_states:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        else:
+            f.seek(0)
+            buffer = bytearray(f.read())
+
+    start = header["keys_offset"]
+    keys_blob = bytes(buffer[start:start + header["keys_length"]])
+    keys = keys_blob.decode("utf-8").split("\n") if n_states else []
+    values = np.frombuffer(
+        buffer, dtype=header["dtype"], count=n_states * n_actions, offset=header["values_offset"]
+    ).reshape(n_states, n_actions)
+    counts = None
+    if "counts_offset" in header:
+        counts = np.frombuffer(
+            buffer, dtype=header["counts_dtype"], count=n_states * n_actions, offset=header["counts_offset"]
+        ).reshape(n_states, n_actions).astype(np.int64)
+    if not read_only:
+        return ArrayQTable.from_arrays(header["actions"], keys, values, counts)
+    values.flags.writeable = False
+    return ArrayQTable.from_arrays(header["actions"], keys, values, counts, copy=False)
+
+
+def convert_pickle(pickle_path: str, binary_path: str | None = None, actions=(0, 1, 2, 3)) -> str:
+    """Konvertiert eine alte q_table.pkl in das Binärformat und gibt den Zielpfad zurück"""
+    binary_path = binary_path or os.path.splitext(pickle_path)[0] + BINARY_SUFFIX
+    with open(pickle_path, "rb") as f:
+        q_table = pickle.load(f)
+    save_binary(ArrayQTable.from_dict(q_table, actions), binary_path)
+    logging.info(f"[INFO] {len(q_table)} Zustände von {pickle_path} nach {binary_path} konvertiert")
+    return binary_path
+
+
+# ==================== Konverter ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="q_table.pkl in das Binärformat (.qtb) konvertieren")
+    parser.add_argument("pickle_path", nargs="?", default="q_table.pkl")
+    parser.add_argument("binary_path", nargs="?", default=None)
+    args = parser.parse_args()
+    convert_pickle(args.pickle_path, args.binary_path)
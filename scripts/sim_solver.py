@@ -0,0 +1,136 @@
+"""
+sim_solver.py
+- Exakte Lösung bekannter SimEnv-Konfigurationen per dynamischer Programmierung
+- BFS-Distanzfeld zum Ziel und vektorisierte Value Iteration über das ganze Grid
+- Q*-Werte können eine Q-Tabelle vorbelegen (Warmstart) und dienen als Optimalitäts-Baseline
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import logging
+
+import numpy as np
+
+from scripts.generate_sim_env import SimEnv, ACTION_DX, ACTION_DY, grid_distances
+from scripts.q_table import serialise_state
+
+logging.basicConfig(level=logging.INFO)
+
+
+def occupancy_grid(env: SimEnv) -> np.ndarray:
+    """bool-Array (width, height), True = Hindernis"""
+    return env.occupancy.astype(bool)
+
+
+def distance_field(env: SimEnv) -> np.ndarray:
+    """
+    Kürzeste Schrittzahl jeder Zelle zum Ziel (BFS, vektorisiert pro Front).
+    -1 = Hindernis oder vom Ziel aus nicht erreichbar.
+    """
+    return grid_distances(env.occupancy, env.goal_pos)
+
+
+def _transitions(env: SimEnv):
+    """Folgezellen (tx, ty), Rewards und Gültigkeit aller (Zelle, Aktion)-Paare wie in SimEnv.step"""
+    w, h = env.grid_size
+    occupancy = occupancy_grid(env)
+    xs, ys = np.meshgrid(np.arange(w), np.arange(h), indexing="ij")
+    nx = xs[..., None] + ACTION_DX
+    ny = ys[..., None] + ACTION_DY
+    inside = (nx >= 0) & (nx < w) & (ny >= 0) & (ny < h)
+    valid = inside & ~occupancy[np.clip(nx, 0, w - 1), np.clip(ny, 0, h - 1)]
+
+    # Ungültige Aktion: bleibt stehen, -10; Ziel: +10; sonst -0.01 (wie SimEnv.step)
+    tx = np.where(valid, nx, xs[..., None])
+    ty = np.where(valid, ny, ys[..., None])
+    rewards = np.where(valid, -0.01, -10.0)
+    rewards[valid & (tx == env.goal_pos[0]) & (ty == env.goal_pos[1])] = 10.0
+    return tx, ty, rewards, valid, occupancy
+
+
+def optimal_q(env: SimEnv, gamma: float = 0.9, tol: float = 1e-10, max_iter: int = 10000) -> np.ndarray:
+    """
+    Q*-Werte (width, height, 4) per Value Iteration.
+    Gleiche Fixpunktgleichung wie QLearningAgent.learn: Maximum nur über gültige
+    Folgeaktionen, das Ziel hat Q = 0 (wird im Training nie als Zustand gelernt).
+    """
+    tx, ty, rewards, valid, occupancy = _transitions(env)
+    any_valid = valid.any(axis=-1, keepdims=True)
+    # Ohne gültige Aktion zählen alle Aktionen (wie choose_action)
+    greedy_mask = valid | ~any_valid
+    fixed = occupancy.copy()
+    fixed[env.goal_pos] = True
+
+    values = np.zeros(env.grid_size)
+    for _ in range(max_iter):
+        q = rewards + gamma * values[tx, ty]
+        new_values = np.where(greedy_mask, q, -np.inf).max(axis=-1)
+        new_values[fixed] = 0.0
+        delta = np.abs(new_values - values).max()
+        values = new_values
+        if delta < tol:
+            break
+
+    q = rewards + gamma * values[tx, ty]
+    q[fixed] = 0.0
+    return q
+
+
+def seed_agent(agent, env: SimEnv, only_missing: bool = True) -> int:
+    """
+    Belegt die Q-Tabelle des Agenten mit Q* für alle freien Zellen von env.
+    only_missing: bereits gelernte Zustände nicht überschreiben.
+    Gibt die Anzahl gesetzter Zustände zurück.
+    """
+    q = optimal_q(env, gamma=agent.gamma)
+    occupancy = occupancy_grid(env)
+    seeded = 0
+    for x in range(env.grid_size[0]):
+        for y in range(env.grid_size[1]):
+            if occupancy[x, y] or (x, y) == env.goal_pos:
+                continue
+            if only_missing and serialise_state((x, y)) in agent.q_table:
+                continue
+            for action in range(len(ACTION_DX)):
+                agent.q_table.set_q((x, y), action, float(q[x, y, action]))
+            seeded += 1
+    return seeded
+
+
+def greedy_optimality(agent, env: SimEnv) -> float:
+    """
+    Anteil der freien, erreichbaren Zellen, in denen die greedy Aktion des
+    Agenten (unter den gültigen Aktionen) laut Q* optimal ist.
+    """
+    q_star = optimal_q(env, gamma=agent.gamma)
+    _, _, _, valid, _ = _transitions(env)
+    dist = distance_field(env)
+    actions = np.arange(len(ACTION_DX))
+    optimal, total = 0, 0
+    for x, y in zip(*np.nonzero(dist > 0)):
+        cell_valid = actions[valid[x, y]]
+        q_agent = np.array(agent.q_table.q_values((int(x), int(y)), cell_valid.tolist()))
+        greedy = cell_valid[q_agent == q_agent.max()]
+        best = q_star[x, y, cell_valid].max()
+        optimal += bool(np.all(np.isclose(q_star[x, y, greedy], best)))
+        total += 1
+    return optimal / total if total else 1.0
+
+
+# ==================== Testlauf ====================
+if __name__ == "__main__":
+    import time
+
+    from scripts.q_learning_agent import QLearningAgent
+
+    env = SimEnv(grid_size=(40, 40), random_obstacles=True, num_random_obstacles=400)
+    start = time.perf_counter()
+    dist = distance_field(env)
+    q = optimal_q(env)
+    logging.info(f"[INFO] BFS + Value Iteration (40x40): {1000 * (time.perf_counter() - start):.1f} ms")
+    logging.info(f"[INFO] Kürzester Weg vom Start: {dist[env.start_pos]} Schritte")
+
+    agent = QLearningAgent([0, 1, 2, 3])
+    logging.info(f"[INFO] Optimalität vor Warmstart: {greedy_optimality(agent, env):.2%}")
+    seed_agent(agent, env)
+    logging.info(f"[INFO] Optimalität nach Warmstart: {greedy_optimality(agent, env):.2%}")
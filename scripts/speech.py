@@ -9,6 +9,8 @@ import wavio
 import logging
 import time
 
+from scripts.latency import timed
+
 # ===================== Thread Lock & Flag =====================
 speech_lock = threading.Lock()
 is_speaking = False  # globales Flag
@@ -30,6 +32,7 @@ def play_beep():
     play_obj.wait_done()
 
 
+@timed("tts")
 def speak(text: str):
     """
     Wandelt Text in Sprache um und gibt ihn aus.
@@ -76,6 +79,7 @@ def record_audio(duration: int = 5, fs: int = 16000):
     return audio.flatten(), fs
 
 
+@timed("stt")
 def speech_to_text(duration: int = 5):
     """
     Wandelt gesprochene Sprache in Text um
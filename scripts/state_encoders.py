@@ -0,0 +1,107 @@
+"""
+state_encoders.py
+- State-Encoder für SimEnv: rohe (x, y)-Position -> kompakte lokale Merkmale
+- Merkmale: Hindernismaske der Nachbarzellen, Richtung zum Ziel, Distanz-Bucket
+- Unabhängig von Grid-Größe und Layout, die Q-Tabelle bleibt dadurch begrenzt
+  und Wissen überträgt sich auf neue Grids
+- Einbindung: QLearningAgent(..., state_encoder=...) bzw. agent.state_encoder = ...
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+
+from scripts.generate_sim_env import SimEnv
+
+logging.basicConfig(level=logging.INFO)
+
+# Obere Grenzen der Manhattan-Distanz-Buckets; Bucket 0 (Distanz 0) ist nur das Ziel,
+# damit dessen Q-Wert wie bei rohen Positionen 0 bleibt
+DISTANCE_BUCKETS = (1, 2, 4, 8, 16)
+
+
+def _sign(value: int) -> int:
+    return (value > 0) - (value < 0)
+
+
+class LocalFeatureEncoder:
+    """
+    (x, y) -> (Hindernismaske, Zielrichtung x, Zielrichtung y, Distanz-Bucket)
+
+    Hindernismaske: ein Bit pro Nachbarzelle im Quadrat mit Radius radius,
+    gesetzt für Hindernisse und Zellen außerhalb des Grids.
+    Liest env.obstacles bei jedem Aufruf, gilt also auch nach env.reset().
+    """
+
+    def __init__(self, env: SimEnv, radius: int = 1, distance_buckets=DISTANCE_BUCKETS):
+        self.env = env
+        self.radius = int(radius)
+        self.distance_buckets = tuple(distance_buckets)
+        self._offsets = [
+            (dx, dy)
+            for dy in range(-self.radius, self.radius + 1)
+            for dx in range(-self.radius, self.radius + 1)
+            if (dx, dy) != (0, 0)
+        ]
+
+    @property
+    def n_states(self) -> int:
+        """Obergrenze der Anzahl unterschiedlicher Merkmale (= Zeilen der Q-Tabelle)"""
+        return 2 ** len(self._offsets) * 3 * 3 * (len(self.distance_buckets) + 2)
+
+    def __call__(self, state) -> tuple:
+        x, y = state
+        width, height = self.env.grid_size
+        obstacles = self.env.obstacles
+        mask = 0
+        for bit, (dx, dy) in enumerate(self._offsets):
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height) or (nx, ny) in obstacles:
+                mask |= 1 << bit
+
+        gx, gy = self.env.goal_pos
+        distance = abs(gx - x) + abs(gy - y)
+        bucket = bisect.bisect_left(self.distance_buckets, distance) + 1 if distance else 0
+        return (mask, _sign(gx - x), _sign(gy - y), bucket)
+
+
+# ==================== Vergleich ====================
+if __name__ == "__main__":
+    import random
+
+    from scripts.q_learning_agent import QLearningAgent
+    from scripts.train_sim_env import run_episodes, greedy_reaches_goal
+
+    logging.disable(logging.INFO)
+    actions = [0, 1, 2, 3]
+
+    def new_layout(grid_size):
+        return SimEnv(grid_size=grid_size, random_obstacles=True,
+                      num_random_obstacles=grid_size[0] * grid_size[1] // 10)
+
+    for name, encoded in [("Rohe Position", False), ("Lokale Merkmale", True)]:
+        random.seed(0)
+        agent = QLearningAgent(actions)
+        # Vortraining auf wechselnden Grids 5x5 bis 20x20
+        for _ in range(40):
+            size = random.randint(5, 20)
+            env = new_layout((size, size))
+            if encoded:
+                agent.state_encoder = LocalFeatureEncoder(env)
+            run_episodes(agent, env, 200, actions)
+
+        # Neue, ungesehene 40x40-Layouts: Episoden, bis die greedy Policy das Ziel erreicht
+        episodes = []
+        for _ in range(5):
+            env = new_layout((40, 40))
+            env.random_obstacles_flag = False  # Layout bleibt bei reset() erhalten
+            if encoded:
+                agent.state_encoder = LocalFeatureEncoder(env)
+            for episode in range(1, 2001):
+                run_episodes(agent, env, 1, actions, max_steps=320)
+                if greedy_reaches_goal(agent, env, 320):
+                    break
+            episodes.append(episode)
+        print(f"{name:16s} Zustände: {len(agent.q_table):6d} | "
+              f"Episoden bis Ziel auf neuem 40x40-Layout: {sum(episodes) / len(episodes):7.1f}")
@@ -0,0 +1,187 @@
+"""
+sweep.py
+- Hyperparameter-Suche für QLearningAgent: alpha, gamma, epsilon, epsilon_decay
+- Grid- oder Zufallssuche auf festen, per Seed erzeugten SimEnv-Layouts
+- Successive Halving: alle Konfigurationen starten mit kleinem Episodenbudget,
+  nur das beste 1/eta kommt in die nächste Runde mit eta-fachem Budget und
+  trainiert dort weiter (Q-Tabelle wird zwischen den Runden mitgegeben)
+- Auswertungen laufen parallel in einem Prozess-Pool, Ergebnis als CSV-Rangliste
+Aufruf:
+    python -m scripts.sweep --search random --samples 81 --grid 10 --density 0.2
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import csv
+import itertools
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from scripts.generate_sim_env import SimEnv
+from scripts.layouts import LayoutPool
+from scripts.q_learning_agent import QLearningAgent
+from scripts.q_table import ArrayQTable
+from scripts.train_sim_env import run_episodes, greedy_reaches_goal
+from scripts.config import SWEEP_RESULTS_FILE
+
+logging.basicConfig(level=logging.INFO)
+
+ACTIONS = [0, 1, 2, 3]
+
+# Liste = Auswahl (Grid- und Zufallssuche), Tupel (low, high) = gleichverteilt (nur Zufallssuche)
+SEARCH_SPACE = {
+    "alpha": [0.05, 0.1, 0.2, 0.4],
+    "gamma": [0.8, 0.9, 0.95, 0.99],
+    "epsilon": [0.1, 0.2, 0.4],
+    "epsilon_decay": [0.99, 0.995, 0.999],
+}
+
+
+def grid_configs(space: dict = SEARCH_SPACE) -> list:
+    """Alle Kombinationen der Werte-Listen"""
+    names = list(space)
+    for name in names:
+        if isinstance(space[name], tuple):
+            raise ValueError(f"Gridsuche benötigt Werte-Listen, nicht Bereich für {name}")
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def random_configs(space: dict = SEARCH_SPACE, n: int = 50, seed: int = 0) -> list:
+    """n zufällige Konfigurationen"""
+    rng = random.Random(seed)
+    return [
+        {name: rng.uniform(*values) if isinstance(values, tuple) else rng.choice(values)
+         for name, values in space.items()}
+        for _ in range(n)
+    ]
+
+
+def fixed_layouts(grid_size, num_obstacles: int, n_layouts: int = 4, seed: int = 0) -> list:
+    """n_layouts lösbare Layouts als Hindernislisten, für alle Konfigurationen identisch"""
+    pool = LayoutPool(grid_size, num_obstacles, size=n_layouts, seed=seed)
+    return [sorted(pool.layout(i)[0]) for i in range(n_layouts)]
+
+
+def _run_task(task):
+    """
+    Worker: trainiert eine Konfiguration auf einem Layout weiter und bewertet die greedy Policy.
+    Rückgabe: (Erfolgsquote greedy, mittlerer Reward der Episoden, Zustand für die nächste Runde)
+    """
+    config, grid_size, obstacles, episodes, state, seed, eval_seed, n_eval = task
+    random.seed(seed)
+    agent = QLearningAgent(ACTIONS, alpha=config["alpha"], gamma=config["gamma"],
+                           epsilon=config["epsilon"], epsilon_decay=config["epsilon_decay"])
+    if state is not None:
+        keys, values, counts, agent.epsilon = state
+        agent.q_table = ArrayQTable.from_arrays(ACTIONS, keys, values, counts)
+
+    env = SimEnv(grid_size=grid_size, obstacles=obstacles)
+    max_steps = 2 * (grid_size[0] + grid_size[1])
+    rewards = run_episodes(agent, env, episodes, ACTIONS, max_steps)
+
+    # Gleiche Startzellen für alle Konfigurationen: je eine pro Distanz-Schicht zum Ziel
+    random.seed(eval_seed)
+    starts = env.stratified_starts(min(n_eval, len(env.free_cells)))
+    success = np.mean([greedy_reaches_goal(agent, env, max_steps, start) for start in starts])
+    keys, values, counts = agent.q_table.export_arrays()
+    return float(success), float(np.mean(rewards)), (keys, values, counts, agent.epsilon)
+
+
+def successive_halving(configs: list, grid_size, layouts: list, min_episodes: int = 100,
+                       eta: int = 3, max_episodes: int | None = None, n_eval: int = 16,
+                       seed: int = 0, num_workers: int | None = None) -> list:
+    """
+    Bewertet configs mit Successive Halving.
+    min_episodes: Episodenbudget je Layout in der ersten Runde
+    eta: pro Runde bleibt das beste 1/eta, das Budget wächst um den Faktor eta
+    max_episodes: Budget-Obergrenze je Layout (Standard: bis eine Konfiguration übrig ist)
+    Rückgabe: Rangliste (beste zuerst) als Liste von dicts
+    """
+    if eta < 2:
+        raise ValueError("eta muss mindestens 2 sein")
+    num_workers = num_workers or os.cpu_count() or 1
+    results = [dict(config, rung=0, episodes=0, success=0.0, reward=0.0) for config in configs]
+    states = {}
+    alive = list(range(len(configs)))
+    budget, rung = min_episodes, 0
+
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        while True:
+            keys = [(c, l) for c in alive for l in range(len(layouts))]
+            tasks = [
+                (configs[c], grid_size, layouts[l], budget - results[c]["episodes"], states.get((c, l)),
+                 f"{seed}-{c}-{l}-{rung}", f"{seed}-eval-{l}", n_eval)
+                for c, l in keys
+            ]
+            chunksize = max(1, len(tasks) // (4 * num_workers))
+            scores = {c: [] for c in alive}
+            for (c, l), (success, reward, state) in zip(keys, pool.map(_run_task, tasks, chunksize=chunksize)):
+                scores[c].append((success, reward))
+                states[(c, l)] = state
+            for c in alive:
+                success, reward = np.mean(scores[c], axis=0)
+                results[c].update(rung=rung, episodes=budget, success=float(success), reward=float(reward))
+
+            alive.sort(key=lambda c: (results[c]["success"], results[c]["reward"]), reverse=True)
+            best = results[alive[0]]
+            logging.info(f"[RUNDE {rung}] {len(alive)} Konfigurationen, {budget} Episoden je Layout | "
+                         f"beste: Erfolg {best['success']:.2f}, Reward {best['reward']:.2f}")
+            if len(alive) <= 1 or (max_episodes is not None and budget * eta > max_episodes):
+                break
+            # Verlierer fallen raus, ihre Q-Tabellen werden nicht mehr gebraucht
+            for c in alive[max(1, len(alive) // eta):]:
+                for l in range(len(layouts)):
+                    states.pop((c, l), None)
+            alive = alive[:max(1, len(alive) // eta)]
+            budget *= eta
+            rung += 1
+
+    return sorted(results, key=lambda r: (r["rung"], r["success"], r["reward"]), reverse=True)
+
+
+def write_results(ranking: list, filepath: str):
+    """Rangliste als CSV (Rang, Parameter, erreichte Runde, Budget, Erfolg, Reward)"""
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filepath, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["rank"] + list(ranking[0]))
+        writer.writeheader()
+        for rank, row in enumerate(ranking, start=1):
+            writer.writerow(dict(row, rank=rank))
+    logging.info(f"[INFO] Sweep-Ergebnisse gespeichert in: {filepath}")
+
+
+# ==================== Kommandozeile ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Hyperparameter-Sweep mit Successive Halving")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--samples", type=int, default=81, help="Anzahl Konfigurationen bei Zufallssuche")
+    parser.add_argument("--grid", type=int, default=10, help="Kantenlänge des Grids")
+    parser.add_argument("--density", type=float, default=0.2, help="Anteil der Zellen mit Hindernissen")
+    parser.add_argument("--layouts", type=int, default=4, help="Anzahl fester Layouts je Konfiguration")
+    parser.add_argument("--min-episodes", type=int, default=100, help="Episoden je Layout in Runde 0")
+    parser.add_argument("--max-episodes", type=int, default=None, help="Budget-Obergrenze je Layout")
+    parser.add_argument("--eta", type=int, default=3, help="Reduktionsfaktor je Runde")
+    parser.add_argument("--eval-starts", type=int, default=16, help="Startzellen der greedy Bewertung")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=SWEEP_RESULTS_FILE)
+    args = parser.parse_args()
+
+    grid_size = (args.grid, args.grid)
+    configs = grid_configs() if args.search == "grid" else random_configs(n=args.samples, seed=args.seed)
+    layouts = fixed_layouts(grid_size, int(args.density * args.grid * args.grid), args.layouts, args.seed)
+    ranking = successive_halving(configs, grid_size, layouts, args.min_episodes, args.eta,
+                                 args.max_episodes, args.eval_starts, args.seed, args.workers)
+    write_results(ranking, args.output)
+    for rank, row in enumerate(ranking[:10], start=1):
+        print(f"{rank:3d}. alpha={row['alpha']:<6g} gamma={row['gamma']:<6g} epsilon={row['epsilon']:<6g} "
+              f"decay={row['epsilon_decay']:<7g} | Runde {row['rung']} ({row['episodes']} Episoden) | "
+              f"Erfolg {row['success']:.2f} | Reward {row['reward']:.2f}")
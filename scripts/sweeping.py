@@ -0,0 +1,107 @@
+"""
+sweeping.py
+- Prioritized Sweeping für den tabellarischen Agenten
+- Heap von (state, action)-Paaren nach TD-Fehler, Vorgänger-Tracking
+  über das Modell aus dyna.py: ändert sich Q(s), rücken alle bekannten
+  Vorgänger (s_prev, a_prev) mit ihrem neuen TD-Fehler in die Warteschlange
+- Verbreitet den +10 Ziel-Reward von SimEnv in wenigen Schritten über das Grid
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import heapq
+import logging
+
+from scripts.dyna import DynaQAgent
+
+logging.basicConfig(level=logging.INFO)
+
+
+class PrioritizedSweepingAgent(DynaQAgent):
+    def __init__(self, actions, alpha=0.1, gamma=0.9, epsilon=0.2,
+                 planning_steps=16, theta=1e-4, planning_alpha=None,
+                 replay_updates=0, buffer_size=10000):
+        """
+        planning_steps: maximale Anzahl Heap-Updates pro echtem Schritt
+        theta: Mindest-TD-Fehler, ab dem ein Paar in die Warteschlange kommt
+        planning_alpha: Lernrate der Planungs-Updates (Standard: alpha)
+        """
+        self.theta = theta
+        self.planning_alpha = alpha if planning_alpha is None else planning_alpha
+        super().__init__(actions, alpha=alpha, gamma=gamma, epsilon=epsilon,
+                         replay_updates=replay_updates, planning_steps=planning_steps,
+                         buffer_size=buffer_size)
+
+    def _reset_memory(self):
+        super()._reset_memory()
+        self.predecessors = {}  # next_row -> {(row, col), ...}
+        self._heap = []         # (-Priorität, row, col)
+        self._queued = {}       # (row, col) -> aktuelle Priorität im Heap
+
+    def _remember(self, state, action, reward, next_state, valid_next_actions):
+        row, col = super()._remember(state, action, reward, next_state, valid_next_actions)
+        next_row = int(self.model.next_states[row, col])
+        self.predecessors.setdefault(next_row, set()).add((row, col))
+        return row, col
+
+    def _td_error(self, row, col) -> float:
+        """TD-Fehler von (row, col) laut Modell"""
+        values = self._q_table.values
+        next_row = self.model.next_states[row, col]
+        next_q = values[next_row, :len(self.actions)]
+        valid = self.model.next_valid[row, col]
+        next_max_q = next_q[valid].max() if valid.any() else next_q.max()
+        return float(self.model.rewards[row, col] + self.gamma * next_max_q - values[row, col])
+
+    def _push(self, row, col):
+        priority = abs(self._td_error(row, col))
+        if priority <= self.theta or self._queued.get((row, col), 0.0) >= priority:
+            return
+        self._queued[(row, col)] = priority
+        heapq.heappush(self._heap, (-priority, row, col))
+
+    def _pop(self):
+        """Paar mit größtem TD-Fehler; veraltete Heap-Einträge werden übersprungen"""
+        while self._heap:
+            neg_priority, row, col = heapq.heappop(self._heap)
+            if self._queued.get((row, col)) == -neg_priority:
+                del self._queued[(row, col)]
+                return row, col
+        return None
+
+    def _plan(self, row, col):
+        if self.replay_updates > 0:
+            self.update_rows(*self.buffer.sample(self.replay_updates, self.np_rng))
+
+        self._push(row, col)
+        for _ in range(self.planning_steps):
+            item = self._pop()
+            if item is None:
+                break
+            row, col = item
+            table = self._q_table
+            table.values[row, col] += self.planning_alpha * self._td_error(row, col)
+            table.counts[row, col] += 1
+            for prev_row, prev_col in self.predecessors.get(row, ()):
+                self._push(prev_row, prev_col)
+
+
+# ==================== Vergleich ====================
+if __name__ == "__main__":
+    import random
+    import numpy as np
+
+    from scripts.q_learning_agent import QLearningAgent
+    from scripts.train_sim_env import episodes_to_convergence
+
+    logging.disable(logging.INFO)
+    for grid_size in [(10, 10), (20, 20), (40, 40)]:
+        for name, make_agent in [
+            ("Q-Learning", lambda: QLearningAgent([0, 1, 2, 3])),
+            ("Prioritized Sweeping", lambda: PrioritizedSweepingAgent([0, 1, 2, 3], planning_steps=32)),
+        ]:
+            random.seed(0)
+            agent = make_agent()
+            agent.np_rng = np.random.default_rng(0)
+            episodes, steps = episodes_to_convergence(agent, grid_size)
+            print(f"{grid_size} {name:22s} Episoden: {episodes:5d} | Env-Schritte: {steps}")
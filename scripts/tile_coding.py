@@ -0,0 +1,219 @@
+"""
+tile_coding.py
+- Lineare Q-Funktion mit Tile Coding für kontinuierliche Sensorzustände
+  (RobotEnv.read_distance liefert im Hardware-Modus beliebige Floats)
+- Fester Speicher: n_tilings versetzte Kachelungen, ein Gewicht pro Kachel und Aktion
+- Benachbarte Abstände teilen sich Kacheln, Lernen generalisiert dadurch
+- Gleiche Schnittstelle wie die Tabellen aus q_table.py (Backend "tiles")
+Autor: Shivang Soni
+"""
+from __future__ import annotations
+
+import json
+import logging
+
+import numpy as np
+
+from scripts.q_table import serialise_state
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TileCodingQTable:
+    """
+    Q(s, a) = Summe der Gewichte der n_tilings aktiven Kacheln von s.
+    Jede Kachelung teilt [low, high] in n_tiles Kacheln, Kachelung t ist um
+    t / n_tilings Kachelbreiten verschoben. Werte außerhalb von [low, high]
+    werden auf den Rand geklemmt.
+    """
+    encoder = None  # Optional: Zustand -> Skalar (z.B. Vorverarbeitung des Sensorwerts)
+
+    def __init__(self, actions, low: float = 0.0, high: float = 400.0,
+                 n_tilings: int = 8, n_tiles: int = 16):
+        """
+        low, high: Wertebereich des Zustands (HC-SR04: 0 bis 400 cm)
+        n_tilings: Anzahl versetzter Kachelungen
+        n_tiles: Kacheln pro Kachelung
+        """
+        if high <= low:
+            raise ValueError("high muss größer als low sein")
+        self.actions = list(actions)
+        self._columns = {a: i for i, a in enumerate(self.actions)}
+        self.low, self.high = float(low), float(high)
+        self.n_tilings, self.n_tiles = int(n_tilings), int(n_tiles)
+        self._scale = self.n_tiles / (self.high - self.low)
+        self._offsets = np.arange(self.n_tilings) / self.n_tilings
+        self._base = np.arange(self.n_tilings) * (self.n_tiles + 1)
+        self.weights = np.zeros((self.n_tilings * (self.n_tiles + 1), len(self.actions)))
+
+    def __len__(self):
+        """Anzahl unterscheidbarer Zustandsintervalle"""
+        return self.n_tilings * self.n_tiles
+
+    @property
+    def nbytes(self) -> int:
+        return self.weights.nbytes
+
+    # ---------------------- Kacheln ----------------------
+    def _state_value(self, state) -> float:
+        if self.encoder is not None:
+            state = self.encoder(state)
+        return min(max(float(state), self.low), self.high)
+
+    def tiles_of(self, points) -> np.ndarray:
+        """Aktive Gewichtszeilen (N, n_tilings) für ein Array von Zustandswerten"""
+        points = np.clip(np.asarray(points, dtype=np.float64), self.low, self.high)
+        idx = np.floor((points[:, None] - self.low) * self._scale + self._offsets).astype(np.int64)
+        return np.minimum(idx, self.n_tiles) + self._base
+
+    def _tiles(self, state) -> np.ndarray:
+        idx = np.floor((self._state_value(state) - self.low) * self._scale + self._offsets).astype(np.int64)
+        return np.minimum(idx, self.n_tiles) + self._base
+
+    def _column(self, action) -> int:
+        col = self._columns.get(action)
+        if col is None:
+            col = len(self.actions)
+            self.actions.append(action)
+            self._columns[action] = col
+            self.weights = np.hstack([self.weights, np.zeros((self.weights.shape[0], 1))])
+        return col
+
+    # ---------------------- Zugriff ----------------------
+    def get_q(self, state, action) -> float:
+        col = self._columns.get(action)
+        if col is None:
+            return 0.0
+        return float(self.weights[self._tiles(state), col].sum())
+
+    def q_values(self, state, actions) -> list:
+        q = self.weights[self._tiles(state)].sum(axis=0).tolist()
+        columns = self._columns
+        return [q[columns[a]] if a in columns else 0.0 for a in actions]
+
+    def set_q(self, state, action, value: float):
+        """Verschiebt Q(state, action) exakt auf value, verteilt auf die aktiven Kacheln"""
+        tiles = self._tiles(state)
+        col = self._column(action)
+        delta = value - self.weights[tiles, col].sum()
+        self.weights[tiles, col] += delta / self.n_tilings
+
+    # ---------------------- Konvertierung ----------------------
+    def centers(self) -> np.ndarray:
+        """Mitten aller Intervalle, auf denen Q konstant ist"""
+        width = (self.high - self.low) / len(self)
+        return self.low + (np.arange(len(self)) + 0.5) * width
+
+    def to_dict(self) -> dict:
+        """Q-Werte je Intervallmitte im klassischen Format (verlustfrei, siehe from_dict)"""
+        points = self.centers()
+        q = self.weights[self.tiles_of(points)].sum(axis=1).tolist()
+        return {
+            serialise_state(float(p)): dict(zip(self.actions, row))
+            for p, row in zip(points.tolist(), q)
+        }
+
+    @classmethod
+    def from_dict(cls, q_table: dict, actions, **kwargs) -> "TileCodingQTable":
+        """
+        Passt die Gewichte per kleinsten Quadraten an eine klassische Q-Tabelle
+        mit Zahlen-Zuständen an. Eine mit to_dict exportierte Tabelle wird exakt
+        wiederhergestellt, alte Tabellen mit rohen Abständen werden geglättet.
+        """
+        table = cls(actions, **kwargs)
+        if not q_table:
+            return table
+        points = []
+        for key in q_table:
+            state = json.loads(key)
+            if isinstance(state, bool) or not isinstance(state, (int, float)):
+                raise ValueError(f"Tile Coding benötigt Zahlen-Zustände, nicht {key}")
+            points.append(state)
+        for row in q_table.values():
+            for action in row:
+                table._column(action)
+
+        targets = np.array([[row.get(a, 0.0) for a in table.actions] for row in q_table.values()])
+        tiles = table.tiles_of(points)
+        n_weights = table.weights.shape[0]
+        # Normalgleichungen (Phi^T Phi) w = Phi^T Q, Phi ist dünn besetzt (n_tilings Einsen je Zeile)
+        pairs = (tiles[:, :, None] * n_weights + tiles[:, None, :]).ravel()
+        gram = np.bincount(pairs, minlength=n_weights * n_weights).reshape(n_weights, n_weights)
+        rhs = np.zeros(table.weights.shape)
+        np.add.at(rhs, tiles.ravel(), np.repeat(targets, table.n_tilings, axis=0))
+        table.weights = np.linalg.lstsq(gram.astype(np.float64), rhs, rcond=None)[0]
+        return table
+
+    def __reduce__(self):
+        # Als einfaches dict pickeln wie die übrigen Backends
+        return (dict, (self.to_dict(),))
+
+
+# ==================== Benchmark ====================
+if __name__ == "__main__":
+    import random
+    import time
+    import tracemalloc
+
+    from scripts.q_learning_agent import QLearningAgent
+    from scripts.policy import Discretizer
+
+    class NoisyDistanceEnv:
+        """Wie RobotEnv, aber mit kontinuierlichem Abstand und Messrauschen (Hardware-Verhalten)"""
+
+        def __init__(self):
+            self.critical_distance = 10
+
+        def reset(self):
+            self.distance = random.uniform(20, 100)
+            return self.read_distance()
+
+        def read_distance(self):
+            return max(self.distance + random.gauss(0, 1.0), 0.0)
+
+        def step(self, action):
+            if action == 1:
+                self.distance -= random.uniform(5, 15)
+            elif action in [2, 3]:
+                self.distance += random.uniform(0, 5)
+            dist = self.read_distance()
+            if dist < self.critical_distance:
+                return dist, -10, True
+            # Stehen bleiben bringt keinen Fortschritt
+            return dist, (0 if action == 0 else 1), False
+
+    def run(agent, episodes, learn=True):
+        env, steps, rewards = NoisyDistanceEnv(), 0, []
+        for _ in range(episodes):
+            state, total = env.reset(), 0
+            for _ in range(50):
+                action = agent.choose_action(state)
+                next_state, reward, done = env.step(action)
+                if learn:
+                    agent.learn(state, action, reward, next_state)
+                state, total, steps = next_state, total + reward, steps + 1
+                if done:
+                    break
+            rewards.append(total)
+        return steps, float(np.mean(rewards))
+
+    logging.disable(logging.INFO)
+    actions = [0, 1, 2, 3]
+    for name, make_agent in [
+        ("Rohe Floats (dict)", lambda: QLearningAgent(actions, backend="dict")),
+        ("Bins (40 x 10 cm)", lambda: QLearningAgent(
+            actions, state_encoder=Discretizer.uniform(0.0, 400.0, 40))),
+        ("Tile Coding 8x16", lambda: QLearningAgent(actions, backend="tiles")),
+    ]:
+        random.seed(0)
+        tracemalloc.start()
+        agent = make_agent()
+        start = time.perf_counter()
+        steps, _ = run(agent, 2000)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        agent.epsilon = 0.0
+        _, greedy_reward = run(agent, 200, learn=False)
+        print(f"{name:20s} Zustände: {len(agent.q_table):6d} | Peak-Speicher: {peak / 1024:8.1f} KiB | "
+              f"Schritte/s: {steps / elapsed:8.0f} | greedy Reward/Episode: {greedy_reward:6.1f}")
@@ -2,91 +2,424 @@ import random
 import logging
 import os
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 
-from scripts.generate_sim_env import SimEnv
+from scripts.generate_sim_env import SimEnv, BatchSimEnv
 from scripts.q_learning_agent import QLearningAgent
+from scripts.dyna import DynaQAgent
+from scripts.sweeping import PrioritizedSweepingAgent
+from scripts.q_lambda import QLambdaAgent
+from scripts.sim_solver import seed_agent
+from scripts.layouts import layout_pool
+from scripts.curriculum import CurriculumScheduler
+from scripts.q_table import ArrayQTable
+from scripts.metrics_log import MetricsLog
+from scripts.config import Q_TABLE_FILE, LOCAL_Q_TABLE_FILE, METRICS_LOG_DIR
 
 logging.basicConfig(level=logging.INFO)
 
+# Lernverfahren für train(), alle mit der Schnittstelle des QLearningAgent
+AGENT_KINDS = {
+    "q": QLearningAgent,
+    "dyna": DynaQAgent,
+    "sweeping": PrioritizedSweepingAgent,
+    "qlambda": QLambdaAgent,
+}
+
 
 def random_start(env: SimEnv):
-    """Wählt eine zufällige freie Startposition im Grid."""
-    free_positions = [
-        (x, y)
-        for x in range(env.grid_size[0])
-        for y in range(env.grid_size[1])
-        if (x, y) not in env.obstacles and (x, y) != env.goal_pos
-    ]
-    return random.choice(free_positions)
+    """Wählt eine zufällige freie Startposition im Grid (Index in env.free_cells, O(1))."""
+    return env.random_start()
+
+
+def run_episodes(agent: QLearningAgent, env: SimEnv, num_episodes, actions, max_steps=50, start_strata=0,
+                 on_episode=None, metrics=None):
+    """
+    Spielt num_episodes Episoden in env und gibt die Rewards pro Episode zurück.
+    start_strata > 0: Starts reihum aus start_strata Distanz-Schichten zum Ziel
+    (nahe und ferne Starts gleich oft) statt gleichverteilt über alle freien Zellen.
+    on_episode: optional Callback (start, done) nach jeder Episode, True bricht vorzeitig ab
+    metrics: optional MetricsLog, erhält Reward, Schritte, Epsilon und Erfolg je Episode
+    """
+    episode_rewards = []
+
+    for episode in range(num_episodes):
+        env.reset()
+        if start_strata:
+            env.position = env.free_cells.sample_stratum(episode % start_strata, start_strata)
+        else:
+            env.position = random_start(env)
+        state = start = env.position
+        total_reward = 0
+        done = False
+        agent.start_episode()
+
+        # Epsilon Decay für stabileres Lernen
+        agent.decay_epsilon()
+
+        steps = 0
+        for step in range(max_steps):
+            valid_actions = env.get_valid_actions() or actions
+            # Agent wählt nur gültige Aktionen
+            action = agent.choose_action(state, valid_actions)
+
+            next_state, reward, done = env.step(action)
+            valid_next_actions = env.get_valid_actions()
+            agent.learn(state, action, reward, next_state, valid_next_actions)
+
+            total_reward += reward
+            state = next_state
+            steps += 1
+
+            if done:
+                break
+
+        episode_rewards.append(total_reward)
+        if metrics is not None:
+            metrics.append(reward=total_reward, steps=steps, epsilon=agent.epsilon, success=done)
+        if on_episode is not None and on_episode(start, done):
+            break
+
+    return episode_rewards
+
+
+def greedy_reaches_goal(agent: QLearningAgent, env: SimEnv, max_steps, start=None) -> bool:
+    """Erreicht die greedy Policy vom Startpunkt (bzw. von start) aus das Ziel?"""
+    epsilon, agent.epsilon = agent.epsilon, 0.0
+    state = env.reset()
+    if start is not None:
+        env.position = state = start
+    done = False
+    for _ in range(max_steps):
+        state, _, done = env.step(agent.choose_action(state, env.get_valid_actions()))
+        if done:
+            break
+    agent.epsilon = epsilon
+    return done
+
+
+def episodes_to_convergence(agent: QLearningAgent, grid_size, obstacles=None, max_episodes=5000):
+    """
+    Trainiert vom Startpunkt aus, bis die greedy Policy das Ziel erreicht.
+    Rückgabe: (Episoden, Umgebungsschritte)
+    """
+    env = SimEnv(grid_size=grid_size, obstacles=obstacles)
+    eval_env = SimEnv(grid_size=grid_size, obstacles=obstacles)
+    max_steps = 4 * (grid_size[0] + grid_size[1])
+    steps = 0
+    for episode in range(max_episodes):
+        state = env.reset()
+        agent.start_episode()
+        for _ in range(max_steps):
+            action = agent.choose_action(state, env.get_valid_actions())
+            next_state, reward, done = env.step(action)
+            agent.learn(state, action, reward, next_state, env.get_valid_actions())
+            state = next_state
+            steps += 1
+            if done:
+                break
+        if greedy_reaches_goal(agent, eval_env, max_steps):
+            return episode + 1, steps
+    return max_episodes, steps
 
 
 def train(grid_size=(5, 5), random_obstacles=True, max_obstacles=3,
-          num_episodes=1000, num_samples=50):
+          num_episodes=1000, num_samples=50, agent_kind="q", warm_start=False,
+          state_encoder=None, solvable=True, adaptive=False, scheduler=None,
+          metrics_log=METRICS_LOG_DIR):
     """
     Training mit Curriculum Learning: Die Anzahl der Hindernisse steigt schrittweise.
+    agent_kind: Lernverfahren aus AGENT_KINDS ("q", "dyna", "sweeping", "qlambda")
+    warm_start: noch unbekannte Zustände mit der exakten Lösung des
+                hindernisfreien Grids vorbelegen (sim_solver.seed_agent)
+    state_encoder: Fabrik env -> Encoder (z.B. state_encoders.LocalFeatureEncoder),
+                   die Q-Tabelle lernt dann auf Merkmalen statt (x, y) und landet
+                   in LOCAL_Q_TABLE_FILE
+    solvable: Zufallslayouts aus einem LayoutPool je Curriculum-Stufe (genaue
+              Hindernisanzahl, Ziel immer erreichbar) statt Rejection Sampling
+    adaptive: Stufe wechseln, sobald sie gelernt ist (CurriculumScheduler); Obergrenze je
+              Stufe ist das Budget aller Samples mit gleicher Hindernisanzahl
+              (num_episodes * Anzahl). False = feste num_episodes je Sample
+    scheduler: eigener CurriculumScheduler (z.B. andere Schwellen), sonst Standardwerte
+    metrics_log: Verzeichnis des Metrik-Logs (je Episode angehängt, siehe plot.py), None = aus
     """
     actions = [0, 1, 2, 3]
-    agent = QLearningAgent(actions)
-    q_table_file = "q_table.pkl"
+    if agent_kind not in AGENT_KINDS:
+        raise ValueError(f"Unbekannter agent_kind: {agent_kind}")
+    if warm_start and state_encoder is not None:
+        raise ValueError("warm_start benötigt rohe (x, y)-Zustände, nicht mit state_encoder kombinierbar")
+    agent = AGENT_KINDS[agent_kind](actions)
+    q_table_file = LOCAL_Q_TABLE_FILE if state_encoder is not None else Q_TABLE_FILE
+
+    # Q-Tabelle laden, falls vorhanden (alte q_table.pkl wird übernommen)
+    agent.load_q_table(q_table_file)
 
-    # Q-Tabelle laden, falls vorhanden
-    if os.path.exists(q_table_file):
-        agent.load_q_table(q_table_file)
-        logging.info("[INFO] Q-Tabelle geladen.")
+    if warm_start:
+        seeded = seed_agent(agent, SimEnv(grid_size=grid_size))
+        logging.info(f"[INFO] Warmstart: {seeded} Zustände mit Q* vorbelegt")
 
     all_sample_rewards = []
+    max_steps = 50
+    if adaptive:
+        scheduler = scheduler or CurriculumScheduler(max_obstacles, num_samples)
+        levels = scheduler.levels
+    else:
+        levels = [int((sample / num_samples) * max_obstacles) for sample in range(num_samples)]
+    episodes_total = 0
+    metrics = MetricsLog(metrics_log) if metrics_log else None
 
-    for sample in range(num_samples):
+    for sample, num_random_obstacles in enumerate(levels):
         # Curriculum: Hindernisse steigen progressiv von 0 bis max_obstacles
-        num_random_obstacles = int((sample / num_samples) * max_obstacles)
         env = SimEnv(
             grid_size=grid_size,
             random_obstacles=random_obstacles,
-            num_random_obstacles=num_random_obstacles
+            num_random_obstacles=num_random_obstacles,
+            layout_pool=layout_pool(grid_size, num_random_obstacles) if solvable and random_obstacles else None
         )
         logging.info(f"[SAMPLE {sample}] Neues Environment mit {env.num_random_obstacles} Hindernissen")
+        if state_encoder is not None:
+            agent.state_encoder = state_encoder(env)
 
-        sample_rewards = []
+        if adaptive:
+            budget = scheduler.budget(num_episodes)
 
-        for episode in range(num_episodes):
-            state = env.reset()
-            env.position = random_start(env)
-            total_reward = 0
+            def adaptive_on_episode(start, done, env=env):
+                return scheduler.record(agent.q_table, start, env.goal_pos, max_steps, done)
+
+            sample_rewards = run_episodes(agent, env, budget, actions, max_steps,
+                                          on_episode=adaptive_on_episode, metrics=metrics)
+        else:
+            sample_rewards = run_episodes(agent, env, num_episodes, actions, max_steps, metrics=metrics)
+        episodes_total += len(sample_rewards)
+
+        avg_reward = np.mean(sample_rewards)
+        logging.info(f"[SAMPLE {sample}] Durchschnittlicher Reward pro Episode: {avg_reward:.2f}")
+        all_sample_rewards.append(avg_reward)
+        if adaptive:
+            status = ("gelernt" if scheduler.converged() else
+                      "stagniert" if scheduler.stalled() else "Episodenbudget erschöpft")
+            logging.info(f"[SAMPLE {sample}] Stufe {status} nach {len(sample_rewards)} Episoden "
+                         f"(Erfolgsquote {scheduler.success_rate:.2f}, Q-Änderung {scheduler.q_delta:.3f})")
+            scheduler.advance()
+
+    if metrics is not None:
+        metrics.close()
+        logging.info(f"[INFO] Metriken von {len(metrics)} Episoden in {metrics_log}")
+
+    # Gesamt-Performance
+    overall_avg = np.mean(all_sample_rewards)
+    logging.info(f"Gesamt-Durchschnitts-Reward über alle Samples: {overall_avg:.2f}")
+    logging.info(f"[INFO] {episodes_total} Episoden in {len(levels)} Curriculum-Stufen "
+                 f"(Budget {num_episodes * num_samples})")
+
+    # Q-Tabelle speichern
+    agent.save_q_table(q_table_file)
+    logging.info(f"[INFO] Q-Tabelle gespeichert in {q_table_file}")
+
+
+def train_batched(grid_size=(5, 5), random_obstacles=True, max_obstacles=3,
+                  num_episodes=1000, num_samples=50, num_envs=256, max_steps=50, solvable=True,
+                  metrics_log=METRICS_LOG_DIR):
+    """
+    Wie train(), aber num_envs Umgebungen laufen im Gleichschritt (BatchSimEnv).
+    Pro Sample werden num_episodes Episoden über alle Umgebungen verteilt.
+    """
+    actions = [0, 1, 2, 3]
+    agent = QLearningAgent(actions)
+    q_table_file = Q_TABLE_FILE
+
+    # Q-Tabelle laden, falls vorhanden (alte q_table.pkl wird übernommen)
+    agent.load_q_table(q_table_file)
+
+    all_sample_rewards = []
+    num_envs = min(num_envs, num_episodes)
+    metrics = MetricsLog(metrics_log) if metrics_log else None
+
+    for sample in range(num_samples):
+        num_random_obstacles = int((sample / num_samples) * max_obstacles)
+        env = BatchSimEnv(
+            num_envs,
+            grid_size=grid_size,
+            random_obstacles=random_obstacles,
+            num_random_obstacles=num_random_obstacles,
+            layout_pool=layout_pool(grid_size, num_random_obstacles) if solvable and random_obstacles else None
+        )
+        logging.info(f"[SAMPLE {sample}] {num_envs} Environments mit {env.num_random_obstacles} Hindernissen")
 
-            # Epsilon Decay für stabileres Lernen
-            agent.epsilon = max(0.05, agent.epsilon * 0.995)
+        states = env.random_starts()
+        valid = env.get_valid_actions()
+        steps = np.zeros(num_envs, dtype=np.int64)
+        total_rewards = np.zeros(num_envs)
+        # Jede Umgebung startet nur so viele Episoden, wie noch offen sind
+        started = num_envs
+        active = np.ones(num_envs, dtype=bool)
+        sample_rewards = []
 
-            for step in range(50):
-                valid_actions = env.get_valid_actions() or actions
-                # Agent wählt nur gültige Aktionen
-                action = agent.choose_action(state, valid_actions)
+        while active.any():
+            action_idx = agent.choose_actions(states, valid)
+            next_states, rewards, dones = env.step(action_idx)
+            valid_next = env.get_valid_actions()
 
-                next_state, reward, done = env.step(action)
-                valid_next_actions = env.get_valid_actions()
-                agent.learn(state, action, reward, next_state, valid_next_actions)
+            ids = np.flatnonzero(active)
+            agent.learn_batch(
+                states[ids], action_idx[ids], rewards[ids], next_states[ids], valid_next[ids]
+            )
+            total_rewards[ids] += rewards[ids]
+            steps += active
 
-                total_reward += reward
-                state = next_state
+            finished = active & (dones | (steps >= max_steps))
+            # Epsilon Decay pro abgeschlossener Episode
+            agent.decay_epsilon(int(finished.sum()))
+            sample_rewards.extend(total_rewards[finished].tolist())
+            if metrics is not None and finished.any():
+                metrics.extend(reward=total_rewards[finished], steps=steps[finished],
+                               epsilon=np.full(int(finished.sum()), agent.epsilon), success=dones[finished])
 
-                if done:
-                    break
+            # Fertige Umgebungen neu starten, solange Episoden übrig sind
+            restart = np.flatnonzero(finished)
+            remaining = num_episodes - started
+            active[restart[remaining:]] = False
+            restart = restart[:max(remaining, 0)]
+            started += len(restart)
+            if len(restart):
+                mask = np.zeros(num_envs, dtype=bool)
+                mask[restart] = True
+                env.reset(mask)
+                next_states = env.random_starts(mask)
+                valid_next = env.get_valid_actions()
+                steps[restart] = 0
+                total_rewards[restart] = 0.0
 
-            sample_rewards.append(total_reward)
+            states = next_states
+            valid = valid_next
 
         avg_reward = np.mean(sample_rewards)
         logging.info(f"[SAMPLE {sample}] Durchschnittlicher Reward pro Episode: {avg_reward:.2f}")
         all_sample_rewards.append(avg_reward)
 
-    # Gesamt-Performance
+    if metrics is not None:
+        metrics.close()
+        logging.info(f"[INFO] Metriken von {len(metrics)} Episoden in {metrics_log}")
+
+    overall_avg = np.mean(all_sample_rewards)
+    logging.info(f"Gesamt-Durchschnitts-Reward über alle Samples: {overall_avg:.2f}")
+
+    agent.save_q_table(q_table_file)
+    logging.info(f"[INFO] Q-Tabelle gespeichert in {q_table_file}")
+
+
+class _WorkerMetrics:
+    """Sammelt die Metriken eines Workers je Spalte, der Hauptprozess schreibt sie ins MetricsLog"""
+
+    def __init__(self):
+        self.columns = {}
+
+    def append(self, **values):
+        for name, value in values.items():
+            self.columns.setdefault(name, []).append(value)
+
+
+def _parallel_worker(task):
+    """
+    Worker-Prozess für train_parallel: trainiert eine lokale Kopie der
+    Q-Tabelle und gibt nur die geänderten Zeilen (keys, values, counts) zurück.
+    Die Kopie startet ohne Counts, counts zählt also nur die Updates dieses Blocks.
+    """
+    (keys, values, epsilon, seed, env_kwargs, num_episodes, actions,
+     agent_kind, state_encoder, with_metrics) = task
+    random.seed(seed)
+    agent = AGENT_KINDS[agent_kind](actions)
+    agent.q_table = ArrayQTable.from_arrays(actions, keys, values)
+    agent.epsilon = epsilon
+
+    env = SimEnv(**env_kwargs)
+    if state_encoder is not None:
+        agent.state_encoder = state_encoder(env)
+    metrics = _WorkerMetrics() if with_metrics else None
+    rewards = run_episodes(agent, env, num_episodes, actions, metrics=metrics)
+
+    keys, values, counts = agent.q_table.export_arrays()
+    changed = np.flatnonzero(counts.any(axis=1))
+    part = ([keys[i] for i in changed], values[changed], counts[changed])
+    return part, rewards, metrics.columns if metrics is not None else None
+
+
+def train_parallel(grid_size=(5, 5), random_obstacles=True, max_obstacles=3,
+                   num_episodes=1000, num_samples=50, num_workers=None, syncs_per_sample=1,
+                   agent_kind="q", state_encoder=None, solvable=True, metrics_log=METRICS_LOG_DIR):
+    """
+    Wie train(), aber die Episoden jedes Samples werden auf einen Prozess-Pool verteilt.
+    Jeder Worker lernt auf einer lokalen Kopie der Q-Tabelle; nach jedem Block
+    (syncs_per_sample Blöcke pro Sample) werden die Kopien per
+    Update-gewichtetem Mittel (ArrayQTable.merge) zusammengeführt.
+    agent_kind, state_encoder, metrics_log: wie bei train(). state_encoder muss
+    picklebar sein (z.B. eine Klasse); Modelle von "dyna"/"sweeping" leben nur
+    je Worker und Block, zusammengeführt wird allein die Q-Tabelle.
+    """
+    actions = [0, 1, 2, 3]
+    if agent_kind not in AGENT_KINDS:
+        raise ValueError(f"Unbekannter agent_kind: {agent_kind}")
+    agent = AGENT_KINDS[agent_kind](actions)
+    q_table_file = LOCAL_Q_TABLE_FILE if state_encoder is not None else Q_TABLE_FILE
+    num_workers = num_workers or os.cpu_count() or 1
+
+    # Q-Tabelle laden, falls vorhanden (alte q_table.pkl wird übernommen)
+    agent.load_q_table(q_table_file)
+
+    all_sample_rewards = []
+    metrics = MetricsLog(metrics_log) if metrics_log else None
+
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        for sample in range(num_samples):
+            num_random_obstacles = int((sample / num_samples) * max_obstacles)
+            env_kwargs = dict(
+                grid_size=grid_size,
+                random_obstacles=random_obstacles,
+                num_random_obstacles=num_random_obstacles,
+                layout_pool=layout_pool(grid_size, num_random_obstacles) if solvable and random_obstacles else None
+            )
+            logging.info(f"[SAMPLE {sample}] {num_workers} Worker mit {num_random_obstacles} Hindernissen")
+
+            sample_rewards = []
+            block_sizes = [num_episodes // syncs_per_sample] * syncs_per_sample
+            block_sizes[-1] += num_episodes - sum(block_sizes)
+
+            for block in block_sizes:
+                # Episoden des Blocks gleichmäßig auf die Worker verteilen
+                chunks = [block // num_workers + (i < block % num_workers) for i in range(num_workers)]
+                keys, values, _ = agent.q_table.export_arrays()
+                tasks = [
+                    (keys, values, agent.epsilon, random.randrange(2**32), env_kwargs, n, actions,
+                     agent_kind, state_encoder, metrics is not None)
+                    for n in chunks if n > 0
+                ]
+                parts = []
+                for part, rewards, columns in pool.map(_parallel_worker, tasks):
+                    parts.append(part)
+                    sample_rewards.extend(rewards)
+                    if columns:
+                        metrics.extend(**columns)
+                agent.q_table.merge(parts)
+                # Epsilon so weiterführen, als wären die Episoden seriell gelaufen
+                agent.decay_epsilon(block)
+
+            avg_reward = np.mean(sample_rewards)
+            logging.info(f"[SAMPLE {sample}] Durchschnittlicher Reward pro Episode: {avg_reward:.2f}")
+            all_sample_rewards.append(avg_reward)
+
+    if metrics is not None:
+        metrics.close()
+        logging.info(f"[INFO] Metriken von {len(metrics)} Episoden in {metrics_log}")
+
     overall_avg = np.mean(all_sample_rewards)
     logging.info(f"Gesamt-Durchschnitts-Reward über alle Samples: {overall_avg:.2f}")
 
-    # Q-Tabelle speichern
     agent.save_q_table(q_table_file)
     logging.info(f"[INFO] Q-Tabelle gespeichert in {q_table_file}")
 
 
-def execute():
+def execute(state_encoder=None):
+    """state_encoder: siehe train(), z.B. LocalFeatureEncoder für eine gridunabhängige Q-Tabelle"""
     max_grid_size = (40, 40)
     grid_size = (random.randint(5, max_grid_size[0]), random.randint(5, max_grid_size[1]))
     max_obstacles = grid_size[0] * grid_size[1] // 4
@@ -96,7 +429,8 @@ def execute():
         random_obstacles=True,
         max_obstacles=max_obstacles,
         num_episodes=1000,
-        num_samples=100
+        num_samples=100,
+        state_encoder=state_encoder
     )
 
 
@@ -0,0 +1,77 @@
+"""
+Batch-Methoden des Agenten (choose_actions, learn_batch, update_rows) gegen
+die skalaren choose_action/learn auf einem kleinen festen Grid
+"""
+import numpy as np
+
+from scripts.generate_sim_env import BatchSimEnv, SimEnv
+from scripts.q_learning_agent import QLearningAgent
+from scripts.q_table import ArrayQTable
+
+ACTIONS = [0, 1, 2, 3]
+GRID = (4, 4)
+OBSTACLES = [(1, 2), (2, 1)]
+STARTS = [(0, 0), (0, 1), (0, 2), (0, 3)]
+
+
+def _agent(seed: int = 0) -> QLearningAgent:
+    """Agent ohne Exploration mit zufälligen, paarweise verschiedenen Q-Werten für alle Zellen"""
+    rng = np.random.default_rng(seed)
+    table = ArrayQTable(ACTIONS)
+    for x in range(GRID[0]):
+        for y in range(GRID[1]):
+            for action, value in zip(ACTIONS, rng.random(len(ACTIONS))):
+                table.set_q((x, y), action, float(value))
+    agent = QLearningAgent(ACTIONS, epsilon=0.0)
+    agent.q_table = table
+    return agent
+
+
+def _batch_env() -> BatchSimEnv:
+    env = BatchSimEnv(len(STARTS), grid_size=GRID, obstacles=OBSTACLES, seed=0)
+    env.positions[:] = STARTS
+    return env
+
+
+def test_batch_masks_match_scalar_env():
+    batch, env = _batch_env(), SimEnv(grid_size=GRID, obstacles=OBSTACLES)
+    for i, start in enumerate(STARTS):
+        env.position = start
+        assert np.flatnonzero(batch.get_valid_actions()[i]).tolist() == env.get_valid_actions()
+
+
+def test_choose_actions_matches_choose_action():
+    agent, batch, env = _agent(), _batch_env(), SimEnv(grid_size=GRID, obstacles=OBSTACLES)
+    chosen = agent.choose_actions(batch.positions, batch.get_valid_actions())
+    for start, index in zip(STARTS, chosen):
+        env.position = start
+        assert agent.actions[index] == agent.choose_action(start, env.get_valid_actions())
+
+
+def test_learn_batch_matches_learn():
+    batched, scalar = _agent(), _agent()
+    batch, env = _batch_env(), SimEnv(grid_size=GRID, obstacles=OBSTACLES)
+    # Immer nach rechts: von (0, 2) ungültig (Hindernis), Folgezustände überschneiden keine anderen Starts
+    actions = np.full(len(STARTS), 3)
+    next_states, rewards, _ = batch.step(actions)
+    batched.learn_batch(np.array(STARTS), actions, rewards, next_states, batch.get_valid_actions())
+
+    for start, next_state, reward in zip(STARTS, next_states, rewards):
+        env.position = start
+        expected_state, expected_reward, _ = env.step(3)
+        assert tuple(next_state) == expected_state
+        assert reward == expected_reward
+        scalar.learn(start, 3, expected_reward, expected_state, env.get_valid_actions())
+
+    for start in STARTS:
+        assert batched.q_table.q_values(start, ACTIONS) == scalar.q_table.q_values(start, ACTIONS)
+
+
+def test_update_rows_with_unknown_next_state():
+    batched, scalar = _agent(), _agent()
+    table = batched.q_table
+    rows = table.rows_of([(0, 0)])
+    batched.update_rows(rows, np.array([table.column_of(1)]), [0.5], np.array([-1]))
+    scalar.learn((0, 0), 1, 0.5, (9, 9))
+    assert batched.q_table.get_q((0, 0), 1) == scalar.q_table.get_q((0, 0), 1)
+    assert batched.q_table.counts[rows[0], 1] == scalar.q_table.counts[rows[0], 1]
@@ -0,0 +1,114 @@
+"""
+Regressionstests für BoundedQTable, das Binärformat der Q-Tabelle und FrozenPolicy
+"""
+import numpy as np
+import pytest
+
+from scripts.checkpoint import snapshot_table
+from scripts.q_table import ArrayQTable, BoundedQTable
+from scripts.q_table_io import load_binary, save_binary
+
+ACTIONS = [0, 1, 2, 3]
+
+
+def _table(n_states: int, updates: int = 0) -> ArrayQTable:
+    table = ArrayQTable(ACTIONS)
+    for s in range(n_states):
+        table.row_of(s, create=True)
+        for _ in range(updates):
+            table.set_q(s, 0, float(s))
+    return table
+
+
+def test_reloaded_states_survive_save_min_visits():
+    bounded = BoundedQTable.from_table(_table(50), max_states=100, save_min_visits=2)
+    keys, _, _ = bounded.export_arrays()
+    assert len(keys) == 50
+    assert bounded.compact() == 0
+    assert len(bounded) == 50
+
+
+def test_visits_seeded_from_counts():
+    bounded = BoundedQTable.from_table(_table(5, updates=3), max_states=10)
+    assert bounded.visits[:5].tolist() == [3] * 5
+
+
+def test_binary_roundtrip_keeps_counts(tmp_path):
+    path = str(tmp_path / "q.qtb")
+    save_binary(_table(20, updates=4), path)
+    loaded = load_binary(path)
+    assert loaded.counts[:20, 0].tolist() == [4] * 20
+    assert loaded.values[:20, 0].tolist() == [float(s) for s in range(20)]
+
+
+def test_snapshot_does_not_shrink_live_table():
+    bounded = BoundedQTable(ACTIONS, max_states=100, save_min_visits=3)
+    for s in range(10):
+        bounded.set_q(s, 0, 1.0)        # ein Zugriff
+    for _ in range(3):
+        bounded.set_q(0, 1, 2.0)        # Zustand 0 ist warm
+    _, keys, values, counts = snapshot_table(bounded)
+    assert keys == ["0"]
+    assert len(bounded) == 10
+    assert np.array_equal(values[0, :2], [1.0, 2.0])
+
+
+def test_loaded_table_learns_in_float64(tmp_path):
+    path = str(tmp_path / "q.qtb")
+    save_binary(_table(3, updates=1), path)
+    table = load_binary(path)
+    assert table.values.dtype == np.float64
+    table.set_q(1, 2, 0.1 + 1e-12)
+    assert table.get_q(1, 2) == 0.1 + 1e-12
+
+
+def test_read_only_load_stays_mapped(tmp_path):
+    path = str(tmp_path / "q.qtb")
+    save_binary(_table(3, updates=1), path)
+    table = load_binary(path, read_only=True)
+    assert table.values.dtype == np.float32
+    assert not table.values.flags.writeable
+    table.row_of(100, create=True)      # Wachsen kopiert nach float64
+    assert table.values.dtype == np.float64
+
+
+def test_equal_hashing_states_keep_their_own_rows():
+    table = ArrayQTable(ACTIONS)
+    table.set_q(1, 0, 1.0)
+    table.set_q(1.0, 0, 2.0)
+    table.set_q(True, 0, 3.0)
+    assert sorted(table.keys) == ["1", "1.0", "true"]
+    assert [table.get_q(s, 0) for s in (1, 1.0, True)] == [1.0, 2.0, 3.0]
+
+
+def test_policy_load_rejects_other_encoding(tmp_path):
+    from scripts.policy import FrozenPolicy, compile_policy
+
+    path = str(tmp_path / "policy.npz")
+    compile_policy(_table(3, updates=1), ACTIONS, encoding="raw").save(path)
+    assert FrozenPolicy.load(path, encoding="raw", kind="scalar").act(1.2) in ACTIONS
+    with pytest.raises(ValueError):
+        FrozenPolicy.load(path, encoding="bins")
+
+    grid = ArrayQTable(ACTIONS)
+    grid.set_q((0, 1), 2, 1.0)
+    compile_policy(grid, ACTIONS, encoding="grid").save(path)
+    with pytest.raises(ValueError):
+        FrozenPolicy.load(path, kind="scalar")
+
+
+def test_merge_weights_parts_by_updates():
+    table = _table(2)
+    table.set_q(0, 1, 5.0)
+    counts_before = table.counts[:2].copy()
+    parts = [
+        (["0"], np.array([[1.0, 0.0, 0.0, 0.0]]), np.array([[1, 0, 0, 0]])),
+        (["0", "7"], np.array([[4.0, 0.0, 0.0, 0.0], [2.0, 0.0, 0.0, 0.0]]),
+         np.array([[3, 0, 0, 0], [2, 0, 0, 0]])),
+    ]
+    table.merge(parts)
+    assert table.get_q(0, 0) == (1.0 * 1 + 4.0 * 3) / 4
+    assert table.get_q(0, 1) == 5.0     # in keinem Teil aktualisiert
+    assert table.get_q(7, 0) == 2.0     # neuer Zustand aus einem Teil
+    assert table.counts[0, 0] == counts_before[0, 0] + 4
+    assert table.counts[table.row_of(7), 0] == 2
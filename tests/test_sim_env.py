@@ -0,0 +1,81 @@
+"""
+Tests für SimEnv: Startzellen (FreeCellIndex) und Aktionsmasken
+"""
+import random
+
+import numpy as np
+import pytest
+
+from scripts.generate_sim_env import SimEnv
+from scripts.layouts import LayoutPool
+
+
+def test_enclosed_goal_falls_back_to_free_cells():
+    env = SimEnv(grid_size=(3, 3), obstacles=[(1, 2), (2, 1)])
+    random.seed(0)
+    starts = {env.random_start() for _ in range(200)}
+    assert starts == {(0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (0, 2)}
+    assert len(env.stratified_starts(3)) == 3
+
+
+def test_random_layouts_without_pool_always_give_a_start():
+    random.seed(1)
+    env = SimEnv(grid_size=(5, 5), random_obstacles=True, num_random_obstacles=6)
+    for _ in range(500):
+        env.reset()
+        x, y = env.random_start()
+        assert (x, y) not in env.obstacles and (x, y) != env.goal_pos
+
+
+def test_no_free_cell_raises_clear_error():
+    env = SimEnv(grid_size=(2, 1), obstacles=[(0, 0)])
+    with pytest.raises(ValueError):
+        env.random_start()
+
+
+def _brute_force_actions(env, cell):
+    x, y = cell
+    targets = [(x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)]
+    return [a for a, (nx, ny) in enumerate(targets)
+            if 0 <= nx < env.grid_size[0] and 0 <= ny < env.grid_size[1] and (nx, ny) not in env.obstacles]
+
+
+def _assert_masks_match(env):
+    for x in range(env.grid_size[0]):
+        for y in range(env.grid_size[1]):
+            env.position = (x, y)
+            assert env.get_valid_actions() == _brute_force_actions(env, (x, y))
+
+
+def test_action_masks_match_obstacles():
+    env = SimEnv(grid_size=(4, 3), obstacles=[(1, 1), (3, 0)])
+    _assert_masks_match(env)
+    env.position = (0, 1)
+    assert env.step(3) == ((0, 1), -10.0, False)    # (1, 1) ist Hindernis
+
+
+def test_set_obstacle_updates_masks_and_start_cells():
+    env = SimEnv(grid_size=(3, 3))
+    assert len(env.free_cells) == 8
+    env.set_obstacle((1, 1))
+    _assert_masks_match(env)
+    assert (1, 1) not in env.free_cells and len(env.free_cells) == 7
+
+    # Ziel einschließen: Fallback auf alle freien Zellen, danach wieder Erreichbarkeit
+    env.set_obstacle((2, 1))
+    env.set_obstacle((1, 2))
+    assert set(env.free_cells.cells) == {(0, 0), (1, 0), (2, 0), (0, 1), (0, 2)}
+    env.set_obstacle((2, 1), blocked=False)
+    _assert_masks_match(env)
+    assert set(env.free_cells.cells) == {(0, 0), (1, 0), (2, 0), (0, 1), (2, 1), (0, 2)}
+
+
+def test_set_obstacle_does_not_touch_pool_layout():
+    pool = LayoutPool((4, 4), num_obstacles=2, size=4, seed=0)
+    env = SimEnv(grid_size=(4, 4), random_obstacles=True, num_random_obstacles=2, layout_pool=pool)
+    occupancy = pool.occupancy.copy()
+    cell = next(c for c in env.free_cells.cells if c != (0, 0))
+    env.set_obstacle(cell)
+    assert np.array_equal(pool.occupancy, occupancy)
+    assert cell not in env.free_cells
+    _assert_masks_match(env)